@@ -1,4 +1,81 @@
 
-from .rerun import Rerun
+from .async_stream import AsyncRecordingStream
+from .broadcast import Broadcaster, broadcast
+from .cache import RrdCache
+from .chunked import stream_rrd
+from .compression import CompressionStats
+from .encoding import EncodingStats, ImageEncoder
+from .filtering import RrdFilter, filter_rrd
+from .incremental import IncrementalRecording
+from .memoize import MemoStats, memoize_rrd
+from .metrics import MetricsRegistry, StreamHooks, StreamInfo, timed_producer
+from .multiplex import MultiplexHub, install_multiplex
+from .pool import ProducerPool, in_process_pool
+from .proxy import UrlProxy
+from .replay import ReplayBuffer
+from .rerun import Rerun, append_sources
+from .rrd import RrdIndex, RrdSlice
+from .scheduler import StreamScheduler, scheduled
+from .streaming import (
+    ChunkCoalescer,
+    CoalescingStats,
+    LatestChunk,
+    StaticChunk,
+    async_wait_for_capacity,
+    backpressure,
+    coalesce_chunks,
+    latest,
+    static,
+    wait_for_capacity,
+)
+from .tail import async_follow_rrd, follow_rrd
+from .tee import RrdTee, TeeRecording
+from .tempfiles import TempRrdManager, temp_rrd
 
-__all__ = ['Rerun']
+__all__ = [
+    'Rerun',
+    'RrdCache',
+    'RrdFilter',
+    'RrdIndex',
+    'RrdSlice',
+    'RrdTee',
+    'ReplayBuffer',
+    'AsyncRecordingStream',
+    'Broadcaster',
+    'ImageEncoder',
+    'IncrementalRecording',
+    'MemoStats',
+    'MetricsRegistry',
+    'MultiplexHub',
+    'ProducerPool',
+    'ChunkCoalescer',
+    'CoalescingStats',
+    'CompressionStats',
+    'EncodingStats',
+    'LatestChunk',
+    'StaticChunk',
+    'StreamHooks',
+    'StreamInfo',
+    'StreamScheduler',
+    'TeeRecording',
+    'TempRrdManager',
+    'UrlProxy',
+    'append_sources',
+    'async_follow_rrd',
+    'async_wait_for_capacity',
+    'backpressure',
+    'broadcast',
+    'coalesce_chunks',
+    'filter_rrd',
+    'follow_rrd',
+    'in_process_pool',
+    'install_multiplex',
+    'latest',
+    'memoize_rrd',
+    'scheduled',
+    'static',
+    'stream_rrd',
+    'temp_rrd',
+    'timed_producer',
+    'wait_for_capacity',
+]
@@ -0,0 +1,97 @@
+"""Support for `async def` producers that stream RRD data to a `Rerun` component."""
+
+from __future__ import annotations
+
+import asyncio
+import functools
+import uuid
+from concurrent.futures import Executor
+from typing import Any, Callable, TypeVar
+
+import rerun as rr
+
+T = TypeVar("T")
+
+
+class AsyncRecordingStream:
+    """
+    A recording whose encoded output can be drained from an async generator.
+
+    `@rr.thread_local_stream` ties a recording to the worker thread running a synchronous
+    producer, which does not work for coroutines sharing the event loop thread. Instead, each
+    async producer creates its own `AsyncRecordingStream`, logs to it with `await rec.log(...)`
+    and yields `await rec.read()`. Encoding and draining run on `executor`, so the event loop
+    stays free to serve other streams:
+
+        async def producer(img):
+            rec = AsyncRecordingStream("my_app")
+            await rec.log("image", rr.Image(img))
+            yield await rec.read()
+    """
+
+    def __init__(
+        self,
+        application_id: str,
+        *,
+        recording_id: str | None = None,
+        executor: Executor | None = None,
+    ):
+        """
+        Parameters:
+            application_id: The application ID of the recording.
+            recording_id: The recording ID. If None, a random ID is used so concurrent producers never share a recording.
+            executor: The executor blocking Rerun calls are offloaded to. If None, the event loop's default executor is used.
+        """
+        self.recording = rr.new_recording(
+            application_id,
+            recording_id=recording_id or str(uuid.uuid4()),
+        )
+        self.stream = rr.binary_stream(recording=self.recording)
+        self.executor = executor
+        # Rerun keeps the current time per thread, so it is re-applied on whichever executor
+        # thread ends up running each `log` call.
+        self._times: dict[str, tuple[Callable[..., None], Any]] = {}
+
+    async def run(self, fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        """
+        Runs a blocking function on the executor and returns its result.
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self.executor, functools.partial(fn, *args, **kwargs)
+        )
+
+    async def log(self, entity_path: str, *args: Any, **kwargs: Any) -> None:
+        """
+        Calls `rr.log` for this recording on the executor.
+        """
+        await self.run(self._log, entity_path, dict(self._times), args, kwargs)
+
+    def _log(self, entity_path: str, times: dict, args: tuple, kwargs: dict) -> None:
+        for timeline, (set_time, value) in times.items():
+            set_time(timeline, value, recording=self.recording)
+        rr.log(entity_path, *args, recording=self.recording, **kwargs)
+
+    async def send_blueprint(self, blueprint: Any, **kwargs: Any) -> None:
+        """
+        Calls `rr.send_blueprint` for this recording on the executor.
+        """
+        await self.run(rr.send_blueprint, blueprint, recording=self.recording, **kwargs)
+
+    def set_time_sequence(self, timeline: str, sequence: int) -> None:
+        """
+        Sets the sequence time used by subsequent `log` calls.
+        """
+        self._times[timeline] = (rr.set_time_sequence, sequence)
+
+    def set_time_seconds(self, timeline: str, seconds: float) -> None:
+        """
+        Sets the time in seconds used by subsequent `log` calls.
+        """
+        self._times[timeline] = (rr.set_time_seconds, seconds)
+
+    async def read(self) -> bytes:
+        """
+        Returns everything encoded since the previous read, without blocking the event loop.
+        """
+        return await self.run(self.stream.read)
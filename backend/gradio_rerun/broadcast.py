@@ -0,0 +1,410 @@
+"""Fan-out of one streaming producer to many `Rerun` components."""
+
+from __future__ import annotations
+
+import asyncio
+import functools
+import inspect
+import threading
+from collections import deque
+from typing import Any, AsyncIterator, Callable, Iterator
+
+from .replay import ReplayBuffer
+from .streaming import Buffer, LatestChunk, Producer, byte_view
+
+_EMPTY = object()
+
+
+class _Subscriber:
+    """
+    The queue of chunks published to one viewer but not yet consumed by it.
+    """
+
+    def __init__(self, max_bytes: int | None):
+        self.max_bytes = max_bytes
+        self.chunks: deque[bytes] = deque()
+        self.queued_bytes = 0
+        self.closed = False
+        self.lagged = False
+        self.error: BaseException | None = None
+        self._lock = threading.Lock()
+        self._ready = threading.Event()
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._async_ready: asyncio.Event | None = None
+
+    def put(self, chunk: bytes) -> bool:
+        """
+        Queues `chunk`, returning False if the subscriber fell too far behind and was closed.
+        """
+        with self._lock:
+            if self.closed:
+                return False
+            if self.max_bytes is not None and self.queued_bytes + len(chunk) > self.max_bytes:
+                self._drop_superseded(chunk)
+                if self.queued_bytes + len(chunk) > self.max_bytes:
+                    # Skipping arbitrary chunks would corrupt the recording, so end the stream.
+                    self.closed = True
+                    self.lagged = True
+                    self.chunks.clear()
+                    self.queued_bytes = 0
+            if not self.closed:
+                self.chunks.append(chunk)
+                self.queued_bytes += len(chunk)
+        self._notify()
+        return not self.lagged
+
+    def _drop_superseded(self, chunk: bytes):
+        if not isinstance(chunk, LatestChunk):
+            return
+        kept: deque[bytes] = deque()
+        for queued in self.chunks:
+            if isinstance(queued, LatestChunk) and queued.key == chunk.key:
+                self.queued_bytes -= len(queued)
+            else:
+                kept.append(queued)
+        self.chunks = kept
+
+    def close(self, error: BaseException | None = None):
+        with self._lock:
+            self.closed = True
+            self.error = error
+        self._notify()
+
+    def _notify(self):
+        self._ready.set()
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._async_ready.set)
+
+    def _take(self) -> Any:
+        with self._lock:
+            if self.chunks:
+                chunk = self.chunks.popleft()
+                self.queued_bytes -= len(chunk)
+                return chunk
+            if self.closed:
+                if self.error is not None:
+                    raise self.error
+                return None
+            self._ready.clear()
+            if self._async_ready is not None:
+                self._async_ready.clear()
+            return _EMPTY
+
+    def get(self) -> bytes | None:
+        """
+        Blocks until the next chunk is available. Returns None once the stream has ended.
+        """
+        while True:
+            chunk = self._take()
+            if chunk is not _EMPTY:
+                return chunk
+            self._ready.wait()
+
+    async def async_get(self) -> bytes | None:
+        """
+        Like `get`, but waits without blocking the event loop.
+        """
+        if self._loop is None:
+            self._async_ready = asyncio.Event()
+            self._loop = asyncio.get_running_loop()
+        while True:
+            chunk = self._take()
+            if chunk is not _EMPTY:
+                return chunk
+            await self._async_ready.wait()
+
+
+class _Channel:
+    """
+    One running producer and the viewers subscribed to it.
+    """
+
+    def __init__(self, broadcaster: Broadcaster, name: str, replay: ReplayBuffer):
+        self.broadcaster = broadcaster
+        self.name = name
+        self.subscribers: set[_Subscriber] = set()
+        self.replay = replay
+        self.chunks = 0
+        self.bytes = 0
+        self.stopping = threading.Event()
+        self._lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+
+    def start(self, producer: Producer, args: tuple, kwargs: dict):
+        if inspect.isasyncgenfunction(producer):
+            target = functools.partial(asyncio.run, self._run_async(producer, args, kwargs))
+        else:
+            target = functools.partial(self._run, producer, args, kwargs)
+        self._thread = threading.Thread(
+            target=target, name=f"gradio_rerun-broadcast-{self.name}", daemon=True
+        )
+        self._thread.start()
+
+    def join(self, subscriber: _Subscriber):
+        with self._lock:
+            # Late joiners need the stream header and store info before any other data.
+            for chunk in self.replay.snapshot():
+                subscriber.put(chunk)
+            self.subscribers.add(subscriber)
+
+    def leave(self, subscriber: _Subscriber) -> bool:
+        """
+        Removes `subscriber` and returns True if it was the last one.
+        """
+        with self._lock:
+            self.subscribers.discard(subscriber)
+            return not self.subscribers
+
+    def _run(self, producer: Callable[..., Iterator[bytes]], args: tuple, kwargs: dict):
+        error = None
+        try:
+            chunks = producer(*args, **kwargs)
+            try:
+                for chunk in chunks:
+                    self._publish(chunk)
+                    if self.stopping.is_set():
+                        break
+            finally:
+                chunks.close()
+        except Exception as e:
+            error = e
+        finally:
+            self._finish(error)
+
+    async def _run_async(
+        self, producer: Callable[..., AsyncIterator[bytes]], args: tuple, kwargs: dict
+    ):
+        error = None
+        try:
+            chunks = producer(*args, **kwargs)
+            try:
+                async for chunk in chunks:
+                    self._publish(chunk)
+                    if self.stopping.is_set():
+                        break
+            finally:
+                await chunks.aclose()
+        except Exception as e:
+            error = e
+        finally:
+            self._finish(error)
+
+    def _publish(self, chunk: Buffer | None):
+        if chunk is None:
+            return
+        if not isinstance(chunk, bytes):
+            # Shared by every subscriber and the replay buffer, so it must not change under them.
+            chunk = bytes(byte_view(chunk))
+        if len(chunk) == 0:
+            return
+        lagged = 0
+        with self._lock:
+            self.replay.append(chunk)
+            self.chunks += 1
+            self.bytes += len(chunk)
+            for subscriber in list(self.subscribers):
+                if not subscriber.put(chunk):
+                    self.subscribers.discard(subscriber)
+                    lagged += 1
+            if not self.subscribers:
+                self.stopping.set()
+        if lagged:
+            self.broadcaster._lagged(lagged)
+
+    def _finish(self, error: BaseException | None):
+        self.broadcaster._finished(self)
+        with self._lock:
+            for subscriber in self.subscribers:
+                subscriber.close(error)
+            self.subscribers.clear()
+
+
+class Broadcaster:
+    """
+    Runs each streaming producer once per channel and fans its chunks out to every subscriber.
+
+    When many viewers watch the same live feed, giving each session its own generator multiplies
+    the logging and encoding work by the number of viewers. Instead, the first subscriber to a
+    channel starts the producer on a background thread, every chunk it yields is copied into
+    a queue per subscriber, and the producer is stopped once the last subscriber leaves.
+    Subscribers that join late, or reload the page, first receive the channel's `ReplayBuffer`
+    snapshot: the stream header, store info, static data and latest state of every
+    `LatestChunk` key, plus a bounded amount of recent history. They then continue with the
+    live data.
+
+    A subscriber that falls more than `max_queue_bytes` behind has its stream ended instead of
+    slowing down the others. Queued `LatestChunk`s with the same key are dropped first.
+    """
+
+    def __init__(
+        self,
+        max_queue_bytes: int | None = 64 * 1024 * 1024,
+        replay_max_bytes: int | None = 32 * 1024 * 1024,
+        replay_history_bytes: int | None = 8 * 1024 * 1024,
+    ):
+        """
+        Parameters:
+            max_queue_bytes: Maximum number of bytes queued for one subscriber before it is disconnected. If None, queues are unbounded.
+            replay_max_bytes: Maximum number of bytes retained per channel for late joiners. See `ReplayBuffer`.
+            replay_history_bytes: Maximum number of bytes of plain chunks retained per channel for late joiners. Use 0 to only replay the first, static and latest chunks.
+        """
+        self.max_queue_bytes = max_queue_bytes
+        self.replay_max_bytes = replay_max_bytes
+        self.replay_history_bytes = replay_history_bytes
+        self.lagged_subscribers = 0
+        self._channels: dict[str, _Channel] = {}
+        self._lock = threading.Lock()
+
+    def _join(
+        self, channel: str, producer: Producer, args: tuple, kwargs: dict
+    ) -> tuple[_Channel, _Subscriber]:
+        subscriber = _Subscriber(self.max_queue_bytes)
+        with self._lock:
+            running = self._channels.get(channel)
+            start = running is None or running.stopping.is_set()
+            if start:
+                running = _Channel(
+                    self,
+                    channel,
+                    ReplayBuffer(
+                        max_bytes=self.replay_max_bytes,
+                        max_history_bytes=self.replay_history_bytes,
+                    ),
+                )
+                self._channels[channel] = running
+            running.join(subscriber)
+        if start:
+            running.start(producer, args, kwargs)
+        return running, subscriber
+
+    def _leave(self, running: _Channel, subscriber: _Subscriber):
+        subscriber.close()
+        with self._lock:
+            if running.leave(subscriber):
+                running.stopping.set()
+                if self._channels.get(running.name) is running:
+                    del self._channels[running.name]
+
+    def _finished(self, running: _Channel):
+        with self._lock:
+            if self._channels.get(running.name) is running:
+                del self._channels[running.name]
+
+    def _lagged(self, count: int):
+        with self._lock:
+            self.lagged_subscribers += count
+
+    def subscribe(
+        self, channel: str, producer: Producer, *args: Any, **kwargs: Any
+    ) -> Iterator[bytes]:
+        """
+        Yields the chunks of `channel`, starting `producer(*args, **kwargs)` if the channel is not running yet.
+
+        The arguments are only used by the subscriber that starts the producer; later subscribers
+        share its output. Return the result from a Gradio event handler whose output is a
+        streaming `Rerun` component:
+
+            def watch():
+                yield from broadcaster.subscribe("camera", camera_feed)
+
+        Parameters:
+            channel: Name identifying the shared stream.
+            producer: Generator or async generator function yielding RRD chunks.
+        """
+        running, subscriber = self._join(channel, producer, args, kwargs)
+        try:
+            while True:
+                chunk = subscriber.get()
+                if chunk is None:
+                    return
+                yield chunk
+        finally:
+            self._leave(running, subscriber)
+
+    async def async_subscribe(
+        self, channel: str, producer: Producer, *args: Any, **kwargs: Any
+    ) -> AsyncIterator[bytes]:
+        """
+        Like `subscribe`, but waits for chunks without blocking the event loop.
+        """
+        running, subscriber = self._join(channel, producer, args, kwargs)
+        try:
+            while True:
+                chunk = await subscriber.async_get()
+                if chunk is None:
+                    return
+                yield chunk
+        finally:
+            self._leave(running, subscriber)
+
+    def channels(self) -> list[str]:
+        with self._lock:
+            return list(self._channels)
+
+    def stats(self) -> dict[str, dict[str, int]]:
+        """
+        Returns the number of subscribers and the chunks and bytes published so far for every running channel.
+        """
+        with self._lock:
+            channels = list(self._channels.values())
+        return {
+            running.name: {
+                "subscribers": len(running.subscribers),
+                "chunks": running.chunks,
+                "bytes": running.bytes,
+                "replay_bytes": running.replay.size_bytes,
+            }
+            for running in channels
+        }
+
+
+_default_broadcaster = Broadcaster()
+
+
+def broadcast(
+    channel: str | Callable[..., str],
+    broadcaster: Broadcaster | None = None,
+) -> Callable[[Producer], Producer]:
+    """
+    Decorates a streaming producer so that all concurrent calls share one run of it.
+
+    Every call of the decorated function subscribes to `channel` instead of starting a new
+    producer, so the producer's cost scales with the number of channels rather than viewers:
+
+        @broadcast("camera")
+        @rr.thread_local_stream("camera")
+        def camera_feed():
+            ...
+
+        demo.load(camera_feed, None, viewer)
+
+    Parameters:
+        channel: Name of the shared stream, or a function of the producer's arguments returning it, e.g. to share one stream per camera.
+        broadcaster: The `Broadcaster` to run the producer on. If None, a process-wide default is used.
+    """
+
+    def decorator(fn: Producer) -> Producer:
+        target = broadcaster or _default_broadcaster
+
+        def channel_for(args, kwargs) -> str:
+            return channel(*args, **kwargs) if callable(channel) else channel
+
+        if inspect.isasyncgenfunction(fn):
+
+            @functools.wraps(fn)
+            async def wrapper(*args, **kwargs):
+                async for chunk in target.async_subscribe(
+                    channel_for(args, kwargs), fn, *args, **kwargs
+                ):
+                    yield chunk
+
+        else:
+
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                yield from target.subscribe(channel_for(args, kwargs), fn, *args, **kwargs)
+
+        wrapper.broadcaster = target  # type: ignore[attr-defined]
+        return wrapper
+
+    return decorator
@@ -0,0 +1,204 @@
+"""Size-bounded on-disk cache for RRD blobs."""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import shutil
+import tempfile
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Iterable
+
+
+class RrdCache:
+    """
+    A content-addressed, size-bounded cache of RRD files on disk.
+
+    Identical blobs are stored once (keyed by their SHA-256 digest) and entries are evicted in
+    least-recently-used order whenever the byte or entry budget is exceeded. The cache directory
+    is rescanned on construction so the budget also holds across restarts.
+    """
+
+    def __init__(
+        self,
+        cache_dir: str | Path,
+        *,
+        max_bytes: int | None = 1024**3,
+        max_entries: int | None = 256,
+    ):
+        """
+        Parameters:
+            cache_dir: Directory the cached RRD files are written to. Created if it does not exist.
+            max_bytes: Maximum total size of all cached files in bytes. If None, the size is unbounded.
+            max_entries: Maximum number of cached files. If None, the number of files is unbounded.
+        """
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: OrderedDict[str, int] = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self._load()
+
+    def _load(self):
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        found = []
+        for path in self.cache_dir.glob("*.rrd"):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            found.append((stat.st_mtime, path.stem, stat.st_size))
+        for _, key, size in sorted(found):
+            self._entries[key] = size
+            self._size += size
+        with self._lock:
+            self._evict()
+
+    def path_for(self, key: str) -> Path:
+        return self.cache_dir / f"{key}.rrd"
+
+    def get(self, key: str) -> str | None:
+        """
+        Returns the path of the cached file for `key` and marks it as recently used, or None if it is not cached.
+        """
+        with self._lock:
+            if key not in self._entries:
+                self.misses += 1
+                return None
+            path = self.path_for(key)
+            try:
+                os.utime(path)
+            except FileNotFoundError:
+                # Removed behind our back, e.g. by clearing the Gradio cache.
+                self._size -= self._entries.pop(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return str(path)
+
+    def put(self, data: bytes | bytearray | memoryview, key: str | None = None) -> str:
+        """
+        Stores `data` and returns the path of the cached file.
+
+        Parameters:
+            data: The encoded RRD data, as any object supporting the buffer protocol. It is hashed and written without being copied.
+            key: The key to store the data under. If None, the SHA-256 digest of `data` is used so identical blobs share one file.
+        Returns:
+            The path of the cached file.
+        """
+        if not isinstance(data, bytes):
+            view = memoryview(data)
+            data = view if view.c_contiguous else view.tobytes()
+        if key is None:
+            key = hashlib.sha256(data).hexdigest()
+        return self.put_stream([data], key)
+
+    def put_stream(
+        self,
+        chunks: Iterable[bytes | bytearray | memoryview],
+        key: str,
+        *,
+        replace: bool = False,
+    ) -> str:
+        """
+        Stores the concatenation of `chunks` under `key` without holding all of it in memory.
+
+        Parameters:
+            chunks: The encoded RRD data, in order. Any objects supporting the buffer protocol are accepted.
+            key: The key to store the data under.
+            replace: If True, a file already cached under `key` is overwritten once the new data has been written completely. If False, the cached file is returned and `chunks` is not consumed.
+        Returns:
+            The path of the cached file.
+        """
+        if not replace:
+            cached = self.get(key)
+            if cached is not None:
+                return cached
+
+        path = self.path_for(key)
+        size = 0
+        fd, tmp_name = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                for chunk in chunks:
+                    size += f.write(chunk)
+            os.replace(tmp_name, path)
+        except BaseException:
+            Path(tmp_name).unlink(missing_ok=True)
+            raise
+
+        with self._lock:
+            if key in self._entries:
+                self._size -= self._entries.pop(key)
+            self._entries[key] = size
+            self._size += size
+            self._evict()
+        return str(path)
+
+    def put_file(self, path: str | Path, key: str) -> str:
+        """
+        Moves the file at `path` into the cache under `key`, replacing any file already cached for it.
+
+        The file is renamed if it is on the same filesystem as the cache directory, e.g. a
+        temporary file created in it, and copied otherwise.
+        """
+        target = self.path_for(key)
+        shutil.move(path, target)
+        size = target.stat().st_size
+        with self._lock:
+            if key in self._entries:
+                self._size -= self._entries.pop(key)
+            self._entries[key] = size
+            self._size += size
+            self._evict()
+        return str(target)
+
+    def _evict(self):
+        # Never evict the most recent entry, even if it alone exceeds the budget.
+        while len(self._entries) > 1 and (
+            (self.max_bytes is not None and self._size > self.max_bytes)
+            or (self.max_entries is not None and len(self._entries) > self.max_entries)
+        ):
+            key, size = self._entries.popitem(last=False)
+            self._size -= size
+            self.evictions += 1
+            self.path_for(key).unlink(missing_ok=True)
+
+    def clear(self):
+        """
+        Removes every cached file.
+        """
+        with self._lock:
+            for key in self._entries:
+                self.path_for(key).unlink(missing_ok=True)
+            self._entries.clear()
+            self._size = 0
+
+    @property
+    def size_bytes(self) -> int:
+        return self._size
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._entries
+
+    def stats(self) -> dict[str, int]:
+        """
+        Returns the hit, miss and eviction counters together with the current size of the cache.
+        """
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "entries": len(self._entries),
+            "bytes": self._size,
+        }
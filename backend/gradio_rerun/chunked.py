@@ -0,0 +1,96 @@
+"""Stream large local RRD files in memory-mapped chunks."""
+
+from __future__ import annotations
+
+import mmap
+import os
+from pathlib import Path
+from typing import Iterator
+
+from .rrd import RrdIndex
+
+_MADV_DONTNEED = getattr(mmap, "MADV_DONTNEED", None)
+
+
+def _aligned_bounds(
+    path: Path, size: int, chunk_size: int
+) -> Iterator[tuple[int, int]]:
+    # Cut between messages, so that every chunk ends with a complete message. A message larger
+    # than `chunk_size` becomes a chunk of its own.
+    index = RrdIndex.load(path)
+    start = cut = 0
+    for offset, length in zip(index.offsets, index.lengths):
+        end = offset + length
+        if end - start > chunk_size and cut > start:
+            yield start, cut
+            start = cut
+        cut = end
+    if start < size:
+        yield start, size
+
+
+def _fixed_bounds(size: int, chunk_size: int) -> Iterator[tuple[int, int]]:
+    for start in range(0, size, chunk_size):
+        yield start, min(start + chunk_size, size)
+
+
+def _drop_pages(mapped: mmap.mmap, start: int, stop: int):
+    if _MADV_DONTNEED is None:
+        return
+    start -= start % mmap.PAGESIZE
+    try:
+        mapped.madvise(_MADV_DONTNEED, start, stop - start)
+    except OSError:
+        pass
+
+
+def stream_rrd(
+    path: Path | str,
+    *,
+    chunk_size: int = 4 * 1024 * 1024,
+    align_to_messages: bool = False,
+) -> Iterator[memoryview]:
+    """
+    Yields the contents of a local RRD file in chunks, for use in a streaming `Rerun` producer.
+
+    Returning the path of a large recording makes the viewer download all of it before showing
+    anything. Streaming it instead lets the viewer show the start of the recording while the
+    rest is still being transferred:
+
+        def open_recording(path):
+            yield from stream_rrd(path)
+
+    The file is memory-mapped and every chunk is a view into the mapping, so no data is copied
+    into Python objects. Pages of a chunk are unmapped once the next chunk is requested, which
+    keeps the memory use of the process flat regardless of the size of the file.
+
+    Parameters:
+        path: The RRD file to stream. It must not be truncated while it is being streamed.
+        chunk_size: Maximum number of bytes per chunk, unless a single message is larger.
+        align_to_messages: If True, chunks are cut between messages, so each chunk ends with a complete message. This uses the message index of `RrdIndex`, which is built on first use.
+    """
+    path = Path(path)
+    with open(path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        if size == 0:
+            return
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    view = memoryview(mapped)
+    try:
+        if align_to_messages:
+            bounds = _aligned_bounds(path, size, chunk_size)
+        else:
+            bounds = _fixed_bounds(size, chunk_size)
+        for start, stop in bounds:
+            yield view[start:stop]
+            # The consumer has taken the chunk; reading it again faults the pages back in
+            # from the page cache.
+            _drop_pages(mapped, start, stop)
+    finally:
+        view.release()
+        try:
+            mapped.close()
+        except BufferError:
+            # Chunks that are still queued for sending keep the mapping alive; it is closed
+            # once the last of them is released.
+            pass
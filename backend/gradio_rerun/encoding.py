@@ -0,0 +1,256 @@
+"""Encode the images of streaming producers on a thread pool before they are logged."""
+
+from __future__ import annotations
+
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import Executor, Future, ThreadPoolExecutor
+from typing import Literal
+
+import cv2
+import numpy as np
+import rerun as rr
+
+_MEDIA_TYPES = {"jpeg": "image/jpeg", "png": "image/png"}
+
+
+class EncodingStats:
+    """
+    Aggregate size reduction and encoding time over all frames of an `ImageEncoder`.
+    """
+
+    def __init__(self):
+        self.frames = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.encode_seconds = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def ratio(self) -> float:
+        """Size of the raw pixels divided by the size of the encoded images."""
+        return self.bytes_in / self.bytes_out if self.bytes_out else 1.0
+
+    def _add(self, bytes_in: int, bytes_out: int, encode_seconds: float):
+        with self._lock:
+            self.frames += 1
+            self.bytes_in += bytes_in
+            self.bytes_out += bytes_out
+            self.encode_seconds += encode_seconds
+
+    def as_dict(self) -> dict[str, float]:
+        return {
+            "frames": self.frames,
+            "bytes_in": self.bytes_in,
+            "bytes_out": self.bytes_out,
+            "ratio": self.ratio,
+            "encode_seconds": self.encode_seconds,
+        }
+
+
+def _encode(
+    image: np.ndarray,
+    format: str,
+    quality: int,
+    png_compression: int,
+    max_size: int | None,
+    color: str,
+) -> bytes:
+    # OpenCV releases the GIL while it resizes and encodes, so frames are encoded in parallel.
+    height, width = image.shape[:2]
+    if max_size is not None and max(height, width) > max_size:
+        scale = max_size / max(height, width)
+        image = cv2.resize(
+            image,
+            (max(1, round(width * scale)), max(1, round(height * scale))),
+            interpolation=cv2.INTER_AREA,
+        )
+    channels = 1 if image.ndim == 2 else image.shape[2]
+    if format == "jpeg" and channels == 4:
+        # JPEG has no alpha channel.
+        image = cv2.cvtColor(
+            image, cv2.COLOR_RGBA2BGR if color == "rgb" else cv2.COLOR_BGRA2BGR
+        )
+    elif color == "rgb" and channels == 3:
+        image = cv2.cvtColor(image, cv2.COLOR_RGB2BGR)
+    elif color == "rgb" and channels == 4:
+        image = cv2.cvtColor(image, cv2.COLOR_RGBA2BGRA)
+    if format == "jpeg":
+        ok, data = cv2.imencode(".jpg", image, [cv2.IMWRITE_JPEG_QUALITY, quality])
+    else:
+        ok, data = cv2.imencode(
+            ".png", image, [cv2.IMWRITE_PNG_COMPRESSION, png_compression]
+        )
+    if not ok:
+        raise ValueError(
+            f"Could not encode an image of shape {image.shape} and dtype {image.dtype} as {format}"
+        )
+    return data.tobytes()
+
+
+_default_executor: ThreadPoolExecutor | None = None
+_default_executor_lock = threading.Lock()
+
+
+def _get_default_executor() -> ThreadPoolExecutor:
+    global _default_executor
+    with _default_executor_lock:
+        if _default_executor is None:
+            _default_executor = ThreadPoolExecutor(
+                max_workers=os.cpu_count() or 1,
+                thread_name_prefix="gradio_rerun-encode",
+            )
+        return _default_executor
+
+
+class ImageEncoder:
+    """
+    Encodes NumPy images as JPEG or PNG on a thread pool and logs them as `rr.EncodedImage`, in order.
+
+    Logging `rr.Image` sends the raw pixels of every frame to the viewer, and the producer
+    does nothing else while they are serialized. With an encoder, `log` hands the frame to a
+    worker thread and returns right away, so the producer computes the next frame while the
+    previous ones are encoded. Encoded frames are logged from the producer's thread, in the
+    order they were passed to `log`, the next time `log` or `flush` is called:
+
+        @rr.thread_local_stream("rerun_example_streaming_blur")
+        def streaming_repeated_blur(img):
+            stream = rr.binary_stream()
+            encoder = ImageEncoder(quality=80)
+            blur = img
+            for i in range(100):
+                blur = cv2.GaussianBlur(blur, (5, 5), 0)
+                encoder.log("image/blurred", blur, sequence={"iteration": i})
+                yield stream.read()
+            encoder.flush()
+            yield stream.read()
+
+    Since frames are logged later than `log` is called, the time of each frame is passed to
+    `log` instead of being set with `rr.set_time_sequence` beforehand. The timelines keep the
+    values of the last frame that was logged, so set them again before logging anything else.
+    """
+
+    def __init__(
+        self,
+        format: Literal["jpeg", "png"] = "jpeg",
+        *,
+        quality: int = 90,
+        png_compression: int = 1,
+        max_size: int | None = None,
+        color: Literal["rgb", "bgr"] = "rgb",
+        max_pending: int = 8,
+        executor: Executor | None = None,
+        recording: rr.RecordingStream | None = None,
+        stats: EncodingStats | None = None,
+    ):
+        """
+        Parameters:
+            format: "jpeg" for lossy encoding of uint8 images, or "png" for lossless encoding of uint8 and uint16 images.
+            quality: JPEG quality from 0 to 100.
+            png_compression: PNG compression level from 0 (fastest) to 9 (smallest).
+            max_size: If set, images whose width or height is larger are scaled down to fit, keeping their aspect ratio.
+            color: Channel order of the images passed to `log`: "rgb" as used by Gradio and Rerun, or "bgr" as returned by most OpenCV functions.
+            max_pending: Maximum number of frames being encoded at once. `log` waits for the oldest frame to be logged once this many are pending.
+            executor: The executor that encodes frames. If None, a process-wide thread pool with one thread per CPU is used.
+            recording: The recording to log to. If None, the current recording of the producer's thread is used, e.g. the one created by `@rr.thread_local_stream`.
+            stats: Counters to accumulate into. If None, a new `EncodingStats` is created.
+        """
+        if format not in _MEDIA_TYPES:
+            raise ValueError(f'format must be "jpeg" or "png", got {format!r}')
+        if color not in ("rgb", "bgr"):
+            raise ValueError(f'color must be "rgb" or "bgr", got {color!r}')
+        if max_pending < 1:
+            raise ValueError(f"max_pending must be at least 1, got {max_pending!r}")
+        self.format = format
+        self.quality = quality
+        self.png_compression = png_compression
+        self.max_size = max_size
+        self.color = color
+        self.max_pending = max_pending
+        self.recording = recording
+        self.stats = stats or EncodingStats()
+        self._executor = executor
+        self._pending: deque[
+            tuple[str, Future[bytes], dict[str, int] | None, dict[str, float] | None]
+        ] = deque()
+
+    def _encode(self, image: np.ndarray) -> bytes:
+        start = time.perf_counter()
+        data = _encode(
+            image,
+            self.format,
+            self.quality,
+            self.png_compression,
+            self.max_size,
+            self.color,
+        )
+        self.stats._add(image.nbytes, len(data), time.perf_counter() - start)
+        return data
+
+    def log(
+        self,
+        entity_path: str,
+        image: np.ndarray,
+        *,
+        sequence: dict[str, int] | None = None,
+        seconds: dict[str, float] | None = None,
+    ):
+        """
+        Queues `image` for encoding and logs every frame whose encoding has finished, in order.
+
+        The image must not be modified until it has been logged. Results of OpenCV functions
+        are new arrays, so they can be passed as they are.
+
+        Parameters:
+            entity_path: The entity to log the image to.
+            image: A height x width, height x width x 3 or height x width x 4 array.
+            sequence: Values of sequence timelines to log the frame at, as with `rr.set_time_sequence`.
+            seconds: Values of timelines in seconds to log the frame at, as with `rr.set_time_seconds`.
+        """
+        executor = self._executor or _get_default_executor()
+        while len(self._pending) >= self.max_pending:
+            self._log_next()
+        self._pending.append(
+            (entity_path, executor.submit(self._encode, image), sequence, seconds)
+        )
+        while self._pending and self._pending[0][1].done():
+            self._log_next()
+
+    def _log_next(self):
+        entity_path, future, sequence, seconds = self._pending.popleft()
+        data = future.result()
+        for timeline, value in (sequence or {}).items():
+            rr.set_time_sequence(timeline, value, recording=self.recording)
+        for timeline, value in (seconds or {}).items():
+            rr.set_time_seconds(timeline, value, recording=self.recording)
+        rr.log(
+            entity_path,
+            rr.EncodedImage(contents=data, media_type=_MEDIA_TYPES[self.format]),
+            recording=self.recording,
+        )
+
+    def flush(self):
+        """
+        Waits for every queued frame to be encoded and logs it.
+        """
+        while self._pending:
+            self._log_next()
+
+    def cancel(self):
+        """
+        Discards every frame that has not been logged yet, e.g. when the producer is stopped.
+        """
+        while self._pending:
+            _, future, _, _ = self._pending.popleft()
+            future.cancel()
+
+    def __enter__(self) -> ImageEncoder:
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.flush()
+        else:
+            self.cancel()
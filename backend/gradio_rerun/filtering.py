@@ -0,0 +1,202 @@
+"""Server-side entity and time-range filtering of RRD files."""
+
+from __future__ import annotations
+
+import fnmatch
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Literal
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import rerun as rr
+import rerun.dataframe as rdf
+
+_INT64_MIN = -(2**63)
+_INT64_MAX = 2**63 - 1
+
+
+@dataclass(frozen=True)
+class RrdFilter:
+    """
+    Selects the entities and time range of a recording that are sent to the viewer.
+
+    For example, `RrdFilter(entities=["image/blurred"], timeline="iteration", start=50)` only
+    ships the blurred image from iteration 50 onwards.
+    """
+
+    entities: tuple[str, ...] = ("**",)
+    """
+    Patterns matched against entity paths, segment by segment as in Rerun's entity path
+    filters. `*` matches within a single segment, so `"image/*"` selects `image/blurred` but not
+    `image/blurred/edges`, and a `**` segment matches any number of segments, so `"image/**"`
+    selects `image` and everything below it. A leading `/` is optional.
+    """
+    timeline: str | None = None
+    """Timeline to filter on. If None, the first timeline of the recording is kept unfiltered."""
+    start: int | float | None = None
+    """Inclusive lower bound on `timeline`. If None, the range is unbounded below."""
+    end: int | float | None = None
+    """Inclusive upper bound on `timeline`. If None, the range is unbounded above."""
+    time_kind: Literal["sequence", "seconds", "nanos"] = "sequence"
+    """How `start` and `end` are interpreted."""
+
+    def matches(self, entity_path: str) -> bool:
+        parts = _segments(entity_path)
+        return any(
+            _match_segments(_segments(pattern), parts) for pattern in self.entities
+        )
+
+
+def _segments(path: str) -> tuple[str, ...]:
+    return tuple(part for part in path.split("/") if part)
+
+
+def _match_segments(pattern: tuple[str, ...], parts: tuple[str, ...]) -> bool:
+    if not pattern:
+        return not parts
+    if pattern[0] == "**":
+        # Matches the remaining pattern at this segment or at any segment below it.
+        return any(
+            _match_segments(pattern[1:], parts[i:]) for i in range(len(parts) + 1)
+        )
+    return (
+        bool(parts)
+        and fnmatch.fnmatchcase(parts[0], pattern[0])
+        and _match_segments(pattern[1:], parts[1:])
+    )
+
+
+def filter_rrd(path: str | Path, spec: RrdFilter) -> bytes:
+    """
+    Decodes the RRD file at `path`, keeps only the data selected by `spec` and re-encodes it.
+
+    The result contains static data and the filtered timeline of the matching entities. Other
+    timelines and the blueprint are not carried over.
+
+    Parameters:
+        path: The RRD file to filter. It must contain exactly one recording.
+        spec: The entities and time range to keep.
+    Returns:
+        The encoded RRD data.
+    """
+    recording = rdf.load_recording(path)
+    schema = recording.schema()
+    timeline = spec.timeline
+    if timeline is None:
+        index_columns = schema.index_columns()
+        if not index_columns:
+            raise ValueError(f"{path} has no timelines to index by")
+        timeline = index_columns[0].name
+
+    columns = [
+        column
+        for column in schema.component_columns()
+        if spec.matches(column.entity_path)
+    ]
+    # Indicator components hold no data and cannot be queried. They are re-created for every
+    # row that is kept, so that the viewer still picks the same visualizers.
+    indicators: dict[str, list[str]] = {}
+    for column in columns:
+        if _is_indicator(column.component_name):
+            indicators.setdefault(column.entity_path, []).append(column.component_name)
+    columns = [column for column in columns if not _is_indicator(column.component_name)]
+
+    output = rr.new_recording(
+        recording.application_id(), recording_id=recording.recording_id()
+    )
+    stream = rr.binary_stream(recording=output)
+    native = rr.RecordingStream.to_native(output)
+
+    static = [column for column in columns if column.is_static]
+    temporal = [column for column in columns if not column.is_static]
+    if static:
+        view = recording.view(index=timeline, contents=_contents(static))
+        table = view.select_static(columns=static).read_all()
+        _send(table, static, None, indicators, native)
+    if temporal:
+        view = recording.view(index=timeline, contents=_contents(temporal))
+        if spec.start is not None or spec.end is not None:
+            view = _filter_range(view, spec)
+        table = view.select(columns=[rdf.IndexColumnSelector(timeline), *temporal])
+        _send(table.read_all(), temporal, timeline, indicators, native)
+
+    return stream.read()
+
+
+def _contents(columns: list) -> dict[str, list[str]]:
+    contents: dict[str, list[str]] = {}
+    for column in columns:
+        contents.setdefault(column.entity_path, []).append(column.component_name)
+    return contents
+
+
+def _is_indicator(component_name: str) -> bool:
+    return component_name.endswith("Indicator")
+
+
+def _filter_range(view, spec: RrdFilter):
+    if spec.time_kind == "seconds":
+        return view.filter_range_seconds(
+            float("-inf") if spec.start is None else float(spec.start),
+            float("inf") if spec.end is None else float(spec.end),
+        )
+    start = _INT64_MIN if spec.start is None else int(spec.start)
+    end = _INT64_MAX if spec.end is None else int(spec.end)
+    if spec.time_kind == "nanos":
+        return view.filter_range_nanos(start, end)
+    return view.filter_range_sequence(start, end)
+
+
+def _component_key(component_name: str):
+    # Rerun 0.21 identifies the components of a chunk by descriptor instead of by name.
+    descriptor = getattr(rr, "ComponentDescriptor", None)
+    return component_name if descriptor is None else descriptor(component_name)
+
+
+def _indicator_column(rows: int) -> pa.Array:
+    # One null per row, as logged by the archetype the indicator belongs to.
+    offsets = pa.array(range(rows + 1), type=pa.int32())
+    return pa.ListArray.from_arrays(offsets, pa.nulls(rows))
+
+
+def _send(
+    table: pa.Table,
+    columns: list,
+    timeline: str | None,
+    indicators: dict[str, list[str]],
+    native,
+) -> None:
+    # Component columns follow the index column (if any) in the order they were selected.
+    first = 0 if timeline is None else 1
+    by_entity: dict[str, dict[str, pa.Array]] = {}
+    for i, column in enumerate(columns, start=first):
+        by_entity.setdefault(column.entity_path, {})[column.component_name] = (
+            table.column(i).combine_chunks()
+        )
+
+    times = None if timeline is None else table.column(0).combine_chunks()
+    for entity_path, components in by_entity.items():
+        # Only keep the rows in which this entity actually has data.
+        mask = None
+        for array in components.values():
+            valid = pc.is_valid(array)
+            mask = valid if mask is None else pc.or_(mask, valid)
+        if not pc.any(mask).as_py():
+            continue
+        # Columns are sent as chunks of list arrays, one list per row, exactly as they were
+        # read; `rr.send_columns` would need each component's Python type to rebuild them.
+        components = {
+            _component_key(name): pc.filter(array, mask)
+            for name, array in components.items()
+        }
+        rows = pc.sum(pc.cast(mask, pa.int64())).as_py()
+        for name in indicators.get(entity_path, []):
+            components[_component_key(name)] = _indicator_column(rows)
+        timelines = {} if times is None else {timeline: pc.filter(times, mask)}
+        rr.bindings.send_arrow_chunk(
+            entity_path,
+            timelines=timelines,
+            components=components,
+            recording=native,
+        )
@@ -0,0 +1,115 @@
+"""Growing recordings for `Rerun(incremental=True)` components refreshed with `every=`."""
+
+from __future__ import annotations
+
+import os
+import threading
+import uuid
+from pathlib import Path
+from typing import Any
+
+import rerun as rr
+
+_static_paths: set[Path] = set()
+_static_paths_lock = threading.Lock()
+
+
+def _serve_in_place(path: str | Path) -> Path:
+    """
+    Lets Gradio serve `path` directly instead of copying it into its cache.
+
+    Gradio copies every returned file into a directory named after a hash of its contents, so a
+    file that grows between ticks would get a new URL (and a full copy) each time. Registered
+    static files keep their URL, which is what lets the viewer request only the new bytes.
+    """
+    import gradio as gr
+
+    path = Path(path).resolve()
+    with _static_paths_lock:
+        # Gradio checks every registered path for every file it sends, so files in a directory
+        # that is already served in place are not registered one by one.
+        if not any(
+            path == static or static in path.parents for static in _static_paths
+        ):
+            gr.set_static_paths([path])
+            _static_paths.add(path)
+    return path
+
+
+class IncrementalRecording:
+    """
+    A recording that is appended to an RRD file each time it is flushed.
+
+    Return `flush()` from the `every=` callable of a `Rerun(incremental=True)` component. Each
+    tick the viewer only downloads the bytes appended since the previous tick, so the cost of a
+    refresh is proportional to the new data rather than the whole history:
+
+        recording = IncrementalRecording("dashboard")
+
+        def refresh():
+            rr.set_time_seconds("time", time.time(), recording=recording.recording)
+            recording.log("cpu", rr.Scalar(psutil.cpu_percent()))
+            return recording.flush()
+
+        Rerun(refresh, every=2, incremental=True)
+    """
+
+    def __init__(
+        self,
+        application_id: str,
+        *,
+        recording_id: str | None = None,
+        directory: str | Path | None = None,
+    ):
+        """
+        Parameters:
+            application_id: The application ID of the recording.
+            recording_id: The recording ID. If None, a random ID is used.
+            directory: Where the RRD file is written. If None, a subdirectory of the Gradio cache is used. Every file in the directory is served in place, so use one that holds nothing else.
+        """
+        if directory is None:
+            from gradio.utils import get_upload_folder
+
+            directory = Path(get_upload_folder()) / "rrd_incremental"
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        recording_id = recording_id or str(uuid.uuid4())
+        self.recording = rr.new_recording(application_id, recording_id=recording_id)
+        self.stream = rr.binary_stream(recording=self.recording)
+        _serve_in_place(directory)
+        self.path = (directory / f"{application_id}-{recording_id}.rrd").resolve()
+        self.path.touch()
+        self._lock = threading.Lock()
+
+    def log(self, entity_path: str, *args: Any, **kwargs: Any) -> None:
+        """
+        Calls `rr.log` for this recording.
+        """
+        rr.log(entity_path, *args, recording=self.recording, **kwargs)
+
+    def send_blueprint(self, blueprint: Any, **kwargs: Any) -> None:
+        """
+        Calls `rr.send_blueprint` for this recording.
+        """
+        rr.send_blueprint(blueprint, recording=self.recording, **kwargs)
+
+    def flush(self) -> Path:
+        """
+        Appends everything logged since the previous flush to the file and returns its path.
+        """
+        with self._lock:
+            data = self.stream.read()
+            if data:
+                with open(self.path, "ab") as f:
+                    f.write(data)
+        return self.path
+
+    def close(self):
+        """
+        Deletes the file. Viewers that already loaded it keep their data.
+        """
+        with self._lock:
+            try:
+                os.unlink(self.path)
+            except FileNotFoundError:
+                pass
@@ -0,0 +1,241 @@
+"""Cache the recordings produced by event handlers, keyed by their inputs."""
+
+from __future__ import annotations
+
+import functools
+import hashlib
+import inspect
+import os
+import pickle
+import tempfile
+import threading
+from pathlib import Path
+from typing import Any, Callable
+
+from .cache import RrdCache
+from .chunked import stream_rrd
+from .incremental import _serve_in_place
+from .streaming import byte_view, is_buffer
+from .tempfiles import _mark_delivered
+
+
+class MemoStats:
+    """
+    Hit and miss counters of a function decorated with `memoize_rrd`.
+    """
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.uncacheable = 0
+        self.bytes_served = 0
+        self.bytes_stored = 0
+        self._lock = threading.Lock()
+
+    @property
+    def hit_rate(self) -> float:
+        """Fraction of calls answered from the cache."""
+        calls = self.hits + self.misses
+        return self.hits / calls if calls else 0.0
+
+    def _add(self, **counts: int):
+        with self._lock:
+            for name, count in counts.items():
+                setattr(self, name, getattr(self, name) + count)
+
+    def as_dict(self) -> dict[str, float]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "uncacheable": self.uncacheable,
+            "hit_rate": self.hit_rate,
+            "bytes_served": self.bytes_served,
+            "bytes_stored": self.bytes_stored,
+        }
+
+
+def _update_hash(h, value: Any, request_type: type):
+    if value is None or isinstance(value, (bool, int, float, str)):
+        h.update(repr(value).encode())
+    elif isinstance(value, request_type):
+        # Differs between sessions, but does not change the result.
+        h.update(b"<request>")
+    elif isinstance(value, Path):
+        h.update(f"Path({value})".encode())
+    elif isinstance(value, (list, tuple)):
+        h.update(f"{type(value).__name__}[{len(value)}]".encode())
+        for item in value:
+            _update_hash(h, item, request_type)
+    elif isinstance(value, dict):
+        h.update(f"dict[{len(value)}]".encode())
+        for name in sorted(value, key=repr):
+            _update_hash(h, name, request_type)
+            _update_hash(h, value[name], request_type)
+    else:
+        try:
+            # Bytes and NumPy arrays, e.g. images, are hashed by their contents without being
+            # copied when they are contiguous.
+            view = memoryview(value)
+        except TypeError:
+            h.update(pickle.dumps(value))
+            return
+        h.update(f"{type(value).__name__}{view.format}{view.shape}".encode())
+        h.update(byte_view(view))
+
+
+def _hash_inputs(fn: Callable, args: tuple, kwargs: dict) -> str:
+    from gradio import Request
+
+    h = hashlib.sha256(f"{fn.__module__}.{fn.__qualname__}".encode())
+    _update_hash(h, args, Request)
+    _update_hash(h, kwargs, Request)
+    return h.hexdigest()
+
+
+def _spool(cache: RrdCache):
+    fd, name = tempfile.mkstemp(dir=cache.cache_dir, suffix=".tmp")
+    return os.fdopen(fd, "wb"), name
+
+
+_default_cache: RrdCache | None = None
+_default_cache_lock = threading.Lock()
+
+
+def _get_default_cache() -> RrdCache:
+    global _default_cache
+    with _default_cache_lock:
+        if _default_cache is None:
+            from gradio.utils import get_upload_folder
+
+            _default_cache = RrdCache(Path(get_upload_folder()) / "rrd_memo")
+        return _default_cache
+
+
+def memoize_rrd(
+    cache: RrdCache | None = None,
+    *,
+    key: Callable[..., str] | None = None,
+    chunk_size: int = 4 * 1024 * 1024,
+    stats: MemoStats | None = None,
+) -> Callable[[Callable], Callable]:
+    """
+    Decorates an event handler so that the recording it produces is cached by its inputs.
+
+    Calling the handler again with the same inputs returns the cached recording instead of
+    logging and encoding it again. Handlers that return a path or RRD bytes get the path of the
+    cached file. Streaming producers, both generators and async generators, have their chunks
+    written to the cache as they are yielded; a later call with the same inputs streams the
+    cached file at full speed. Apply it on top of `@rr.thread_local_stream`:
+
+        @memoize_rrd()
+        @rr.thread_local_stream("rerun_example_cube_rrd")
+        def create_cube_rrd(x, y, z):
+            ...
+
+    Only complete results are cached: a stream that is cancelled or raises is not stored. Other
+    return values, such as URLs or lists of sources, are passed through uncached.
+
+    Parameters:
+        cache: The cache to store recordings in. If None, a process-wide cache bounded to 1 GiB and 256 recordings is created in the Gradio cache directory.
+        key: Computes the cache key from the handler's arguments. If None, the arguments are hashed by value; NumPy arrays and other buffers are hashed by their contents, and `gr.Request` arguments are ignored.
+        chunk_size: Size of the chunks a cached stream is replayed in.
+        stats: Counters to accumulate into. If None, a new `MemoStats` is created. Available as `.memo_stats` on the decorated function.
+    """
+    if stats is None:
+        stats = MemoStats()
+
+    def decorator(fn: Callable) -> Callable:
+        def cache_key(args: tuple, kwargs: dict) -> str:
+            if key is not None:
+                return hashlib.sha256(
+                    f"{fn.__module__}.{fn.__qualname__}:{key(*args, **kwargs)}".encode()
+                ).hexdigest()
+            return _hash_inputs(fn, args, kwargs)
+
+        def lookup(args: tuple, kwargs: dict) -> tuple[RrdCache, str, str | None]:
+            target = cache if cache is not None else _get_default_cache()
+            # Returned paths are served from the cache directory instead of being copied into
+            # Gradio's cache.
+            _serve_in_place(target.cache_dir)
+            memo_key = cache_key(args, kwargs)
+            path = target.get(memo_key)
+            if path is not None:
+                stats._add(hits=1, bytes_served=Path(path).stat().st_size)
+            else:
+                stats._add(misses=1)
+            return target, memo_key, path
+
+        if inspect.isasyncgenfunction(fn):
+
+            @functools.wraps(fn)
+            async def wrapper(*args, **kwargs):
+                target, memo_key, path = lookup(args, kwargs)
+                if path is not None:
+                    for chunk in stream_rrd(path, chunk_size=chunk_size):
+                        yield chunk
+                    return
+                f, tmp_name = _spool(target)
+                try:
+                    async for chunk in fn(*args, **kwargs):
+                        if chunk is not None:
+                            f.write(byte_view(chunk))
+                        yield chunk
+                    f.close()
+                    stats._add(bytes_stored=Path(tmp_name).stat().st_size)
+                    target.put_file(tmp_name, memo_key)
+                finally:
+                    f.close()
+                    Path(tmp_name).unlink(missing_ok=True)
+
+        elif inspect.isgeneratorfunction(fn):
+
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                target, memo_key, path = lookup(args, kwargs)
+                if path is not None:
+                    yield from stream_rrd(path, chunk_size=chunk_size)
+                    return
+                f, tmp_name = _spool(target)
+                try:
+                    for chunk in fn(*args, **kwargs):
+                        if chunk is not None:
+                            f.write(byte_view(chunk))
+                        yield chunk
+                    f.close()
+                    stats._add(bytes_stored=Path(tmp_name).stat().st_size)
+                    target.put_file(tmp_name, memo_key)
+                finally:
+                    f.close()
+                    Path(tmp_name).unlink(missing_ok=True)
+
+        else:
+
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                target, memo_key, path = lookup(args, kwargs)
+                if path is not None:
+                    return path
+                value = fn(*args, **kwargs)
+                if is_buffer(value):
+                    path = target.put(value, memo_key)
+                elif isinstance(value, Path) or (
+                    isinstance(value, str)
+                    and not value.startswith(("http://", "https://"))
+                ):
+                    with open(value, "rb") as f:
+                        path = target.put_stream(
+                            iter(lambda: f.read(chunk_size), b""), memo_key
+                        )
+                    # The cached copy is returned instead, so a managed temporary file is
+                    # no longer needed.
+                    _mark_delivered(value)
+                else:
+                    stats._add(uncacheable=1)
+                    return value
+                stats._add(bytes_stored=Path(path).stat().st_size)
+                return path
+
+        wrapper.memo_stats = stats  # type: ignore[attr-defined]
+        return wrapper
+
+    return decorator
@@ -0,0 +1,325 @@
+"""Instrumentation hooks and an aggregate metrics registry for `Rerun` components."""
+
+from __future__ import annotations
+
+import bisect
+import functools
+import inspect
+import threading
+import time
+from collections import defaultdict, deque
+from dataclasses import dataclass, field
+from typing import Iterable
+
+from .streaming import Producer, _current_session_hash
+
+_BYTE_BUCKETS = tuple(float(4**i * 1024) for i in range(9))  # 1 KiB to 64 MiB
+_SECOND_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+@dataclass
+class StreamInfo:
+    """
+    What is known about one stream of a `Rerun` component so far.
+    """
+
+    stream_id: str
+    component: str
+    started_at: float
+    """`time.monotonic()` when the producer started, or when the first chunk arrived if the producer is not decorated with `timed_producer`."""
+    first_chunk_at: float | None = None
+    last_chunk_at: float | None = None
+    finished_at: float | None = None
+    chunks: int = 0
+    bytes: int = 0
+    max_chunk_bytes: int = 0
+    max_chunk_interval: float = 0.0
+    """Longest time between two consecutive chunks, in seconds."""
+
+    @property
+    def time_to_first_chunk(self) -> float | None:
+        if self.first_chunk_at is None:
+            return None
+        return self.first_chunk_at - self.started_at
+
+    @property
+    def duration(self) -> float:
+        end = self.finished_at if self.finished_at is not None else time.monotonic()
+        return end - self.started_at
+
+
+class StreamHooks:
+    """
+    Callbacks invoked by a `Rerun` component. Subclass it and override the methods you need.
+
+    Hooks run synchronously on the thread serving the stream, so they should return quickly.
+    """
+
+    def stream_started(self, stream: StreamInfo):
+        pass
+
+    def chunk_sent(self, stream: StreamInfo, nbytes: int, interval: float | None):
+        """
+        Called for every chunk after compression. `interval` is the time since the previous chunk, or None for the first one.
+        """
+
+    def stream_finished(self, stream: StreamInfo):
+        pass
+
+    def postprocessed(self, component: str, kind: str, nbytes: int, seconds: float):
+        """
+        Called after a non-streaming value was processed. `kind` is "bytes" or "sources".
+        """
+
+
+class _Histogram:
+    def __init__(self, buckets: tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+@dataclass
+class _ComponentMetrics:
+    streams_started: int = 0
+    streams_finished: int = 0
+    chunks: int = 0
+    bytes: int = 0
+    postprocess_calls: int = 0
+    postprocess_bytes: int = 0
+    chunk_bytes: _Histogram = field(default_factory=lambda: _Histogram(_BYTE_BUCKETS))
+    chunk_interval: _Histogram = field(default_factory=lambda: _Histogram(_SECOND_BUCKETS))
+    time_to_first_chunk: _Histogram = field(
+        default_factory=lambda: _Histogram(_SECOND_BUCKETS)
+    )
+    stream_duration: _Histogram = field(default_factory=lambda: _Histogram(_SECOND_BUCKETS))
+    postprocess_seconds: _Histogram = field(
+        default_factory=lambda: _Histogram(_SECOND_BUCKETS)
+    )
+
+
+class MetricsRegistry(StreamHooks):
+    """
+    Aggregates stream and postprocess metrics per component and exports them in the Prometheus text format.
+
+    Pass it to one or more components as `Rerun(metrics=registry)` and serve `registry.export()`
+    from a route, e.g. `/metrics`. Additional `StreamHooks` added with `add_hook` receive every
+    callback as well, for example to log slow producers.
+    """
+
+    def __init__(self, hooks: Iterable[StreamHooks] = (), namespace: str = "gradio_rerun"):
+        """
+        Parameters:
+            hooks: Additional hooks that are called after the registry has recorded each event.
+            namespace: Prefix of the exported metric names.
+        """
+        self.namespace = namespace
+        self.hooks = list(hooks)
+        self._components: defaultdict[str, _ComponentMetrics] = defaultdict(
+            _ComponentMetrics
+        )
+        self._active: dict[str, StreamInfo] = {}
+        self._lock = threading.Lock()
+
+    def add_hook(self, hook: StreamHooks):
+        self.hooks.append(hook)
+
+    def active_streams(self) -> list[StreamInfo]:
+        with self._lock:
+            return list(self._active.values())
+
+    def stream_started(self, stream: StreamInfo):
+        with self._lock:
+            self._active[stream.stream_id] = stream
+            self._components[stream.component].streams_started += 1
+        for hook in self.hooks:
+            hook.stream_started(stream)
+
+    def chunk_sent(self, stream: StreamInfo, nbytes: int, interval: float | None):
+        with self._lock:
+            metrics = self._components[stream.component]
+            metrics.chunks += 1
+            metrics.bytes += nbytes
+            metrics.chunk_bytes.observe(nbytes)
+            if interval is None:
+                metrics.time_to_first_chunk.observe(stream.time_to_first_chunk)
+            else:
+                metrics.chunk_interval.observe(interval)
+        for hook in self.hooks:
+            hook.chunk_sent(stream, nbytes, interval)
+
+    def stream_finished(self, stream: StreamInfo):
+        with self._lock:
+            self._active.pop(stream.stream_id, None)
+            metrics = self._components[stream.component]
+            metrics.streams_finished += 1
+            metrics.stream_duration.observe(stream.duration)
+        for hook in self.hooks:
+            hook.stream_finished(stream)
+
+    def postprocessed(self, component: str, kind: str, nbytes: int, seconds: float):
+        with self._lock:
+            metrics = self._components[component]
+            metrics.postprocess_calls += 1
+            metrics.postprocess_bytes += nbytes
+            metrics.postprocess_seconds.observe(seconds)
+        for hook in self.hooks:
+            hook.postprocessed(component, kind, nbytes, seconds)
+
+    def export(self) -> str:
+        """
+        Returns all metrics in the Prometheus text exposition format.
+        """
+        ns = self.namespace
+        lines: list[str] = []
+
+        def metric(name: str, kind: str, help: str):
+            lines.append(f"# HELP {ns}_{name} {help}")
+            lines.append(f"# TYPE {ns}_{name} {kind}")
+
+        with self._lock:
+            components = {
+                name: metrics for name, metrics in sorted(self._components.items())
+            }
+            active = defaultdict(int)
+            for stream in self._active.values():
+                active[stream.component] += 1
+
+            counters = (
+                ("streams_started_total", "streams_started", "Streams started."),
+                ("streams_finished_total", "streams_finished", "Streams finished."),
+                ("stream_chunks_total", "chunks", "Chunks sent to viewers."),
+                ("stream_bytes_total", "bytes", "Bytes sent to viewers, after compression."),
+                ("postprocess_total", "postprocess_calls", "Non-streaming values processed."),
+                ("postprocess_bytes_total", "postprocess_bytes", "Bytes of non-streaming values processed."),
+            )
+            for name, attr, help in counters:
+                metric(name, "counter", help)
+                for component, metrics in components.items():
+                    lines.append(
+                        f'{ns}_{name}{{component="{_escape(component)}"}} {getattr(metrics, attr)}'
+                    )
+
+            metric("active_streams", "gauge", "Streams currently running.")
+            for component in components:
+                lines.append(
+                    f'{ns}_active_streams{{component="{_escape(component)}"}} {active[component]}'
+                )
+
+            histograms = (
+                ("chunk_bytes", "chunk_bytes", "Size of the chunks sent to viewers."),
+                ("chunk_interval_seconds", "chunk_interval", "Time between consecutive chunks of a stream."),
+                ("time_to_first_chunk_seconds", "time_to_first_chunk", "Time from the start of a stream to its first chunk."),
+                ("stream_duration_seconds", "stream_duration", "Duration of finished streams."),
+                ("postprocess_seconds", "postprocess_seconds", "Time spent processing non-streaming values."),
+            )
+            for name, attr, help in histograms:
+                metric(name, "histogram", help)
+                for component, metrics in components.items():
+                    _render_histogram(
+                        lines, f"{ns}_{name}", component, getattr(metrics, attr)
+                    )
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _render_histogram(lines: list[str], name: str, component: str, histogram: _Histogram):
+    label = f'component="{_escape(component)}"'
+    cumulative = 0
+    for bound, count in zip(histogram.buckets, histogram.counts):
+        cumulative += count
+        lines.append(f'{name}_bucket{{{label},le="{bound:g}"}} {cumulative}')
+    lines.append(f'{name}_bucket{{{label},le="+Inf"}} {histogram.count}')
+    lines.append(f"{name}_sum{{{label}}} {histogram.sum:g}")
+    lines.append(f"{name}_count{{{label}}} {histogram.count}")
+
+
+_producer_starts: dict[str, deque[float]] = {}
+_producer_starts_lock = threading.Lock()
+# Only set once a component with metrics exists, so nothing accumulates when metrics are off.
+_track_producer_starts = False
+
+
+def _enable_producer_timing():
+    global _track_producer_starts
+    _track_producer_starts = True
+
+
+def _mark_producer_start() -> tuple[str, float] | None:
+    if not _track_producer_starts:
+        return None
+    session_hash = _current_session_hash()
+    if session_hash is None:
+        return None
+    start = time.monotonic()
+    with _producer_starts_lock:
+        _producer_starts.setdefault(session_hash, deque(maxlen=16)).append(start)
+    return session_hash, start
+
+
+def _discard_producer_start(mark: tuple[str, float] | None):
+    if mark is None:
+        return
+    session_hash, start = mark
+    with _producer_starts_lock:
+        starts = _producer_starts.get(session_hash)
+        if starts and start in starts:
+            starts.remove(start)
+            if not starts:
+                del _producer_starts[session_hash]
+
+
+def _pop_producer_start(session_hash: str) -> float | None:
+    with _producer_starts_lock:
+        starts = _producer_starts.get(session_hash)
+        if not starts:
+            return None
+        start = starts.popleft()
+        if not starts:
+            del _producer_starts[session_hash]
+        return start
+
+
+def timed_producer(fn: Producer) -> Producer:
+    """
+    Decorates a streaming producer so `StreamInfo.time_to_first_chunk` is measured from the moment it starts.
+
+    Without it, a `Rerun` component only learns about a stream when its first chunk arrives, so
+    the time spent before the first `yield` is not visible.
+    """
+    # A producer that stops before its first chunk never starts a stream, so its start time
+    # is removed again rather than being attributed to the next stream of the session.
+    if inspect.isasyncgenfunction(fn):
+
+        @functools.wraps(fn)
+        async def wrapper(*args, **kwargs):
+            mark = _mark_producer_start()
+            try:
+                async for chunk in fn(*args, **kwargs):
+                    mark = None
+                    yield chunk
+            finally:
+                _discard_producer_start(mark)
+
+    else:
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            mark = _mark_producer_start()
+            try:
+                for chunk in fn(*args, **kwargs):
+                    mark = None
+                    yield chunk
+            finally:
+                _discard_producer_start(mark)
+
+    return wrapper
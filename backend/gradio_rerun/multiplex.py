@@ -0,0 +1,247 @@
+"""Share one HTTP connection between the streams of all multiplexed viewers on a page."""
+
+from __future__ import annotations
+
+import asyncio
+import struct
+import threading
+import time
+from collections import deque
+from typing import Any, AsyncIterator
+
+from .streaming import Buffer
+
+# Frame kind, length of the stream ID and length of the payload, followed by the UTF-8 stream ID
+# and the payload. An end frame has an empty payload and closes the stream.
+FRAME_HEADER = struct.Struct("<BHI")
+FRAME_DATA = 0
+FRAME_END = 1
+
+MULTIPLEX_ROUTE = "/gradio_rerun/mux/{session_hash}"
+
+
+def encode_frame_header(kind: int, stream_id: str, size: int) -> bytes:
+    stream_id_bytes = stream_id.encode()
+    return FRAME_HEADER.pack(kind, len(stream_id_bytes), size) + stream_id_bytes
+
+
+class _Session:
+    def __init__(self):
+        self.streams: dict[str, list[Buffer | None]] = {}
+        # Streams with queued chunks, in the order they are served.
+        self.ready: deque[str] = deque()
+        self.created_at = time.monotonic()
+        self.attached = False
+        self.closed = False
+        self.closed_at = 0.0
+        self.lock = threading.Lock()
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._wakeup: asyncio.Event | None = None
+
+    def put(self, stream_id: str, chunk: Buffer | None):
+        with self.lock:
+            if self.closed:
+                return
+            pending = self.streams.setdefault(stream_id, [])
+            pending.append(chunk)
+            if stream_id not in self.ready:
+                self.ready.append(stream_id)
+            loop, wakeup = self._loop, self._wakeup
+        if loop is not None and wakeup is not None:
+            try:
+                loop.call_soon_threadsafe(wakeup.set)
+            except RuntimeError:
+                # The connection's event loop has already shut down.
+                pass
+
+    def pop(self) -> tuple[str, Buffer | None] | None:
+        # One chunk per stream in turn, so a fast producer cannot starve the other viewers.
+        with self.lock:
+            while self.ready:
+                stream_id = self.ready.popleft()
+                pending = self.streams.get(stream_id)
+                if not pending:
+                    continue
+                chunk = pending.pop(0)
+                if chunk is None:
+                    del self.streams[stream_id]
+                elif pending:
+                    self.ready.append(stream_id)
+                return stream_id, chunk
+            return None
+
+    def attach(self, loop: asyncio.AbstractEventLoop, wakeup: asyncio.Event):
+        with self.lock:
+            self.attached = True
+            self.closed = False
+            self._loop, self._wakeup = loop, wakeup
+
+    def close(self, wakeup: asyncio.Event | None = None):
+        """
+        Closes the session. If `wakeup` is given, only if the connection that attached with it is still the current one.
+        """
+        with self.lock:
+            if wakeup is not None and self._wakeup is not wakeup:
+                # The page has reconnected; the new connection owns the queued streams.
+                return
+            self.closed = True
+            self.closed_at = time.monotonic()
+            self.streams.clear()
+            self.ready.clear()
+            self._loop = self._wakeup = None
+
+
+class MultiplexHub:
+    """
+    Queues the chunks of every multiplexed stream until the page's shared connection sends them.
+
+    Each browser session reads all of its streams from one long-lived response, in which every
+    chunk is wrapped in a frame naming the stream it belongs to. Streams with queued chunks are
+    served round-robin, one chunk at a time.
+    """
+
+    def __init__(self, unclaimed_timeout: float = 60.0):
+        """
+        Parameters:
+            unclaimed_timeout: Seconds to keep queuing chunks for a session whose page has not opened the shared connection. After that, its chunks are discarded.
+        """
+        self.unclaimed_timeout = unclaimed_timeout
+        self._sessions: dict[str, _Session] = {}
+        self._lock = threading.Lock()
+
+    def _session(self, session_hash: str) -> _Session:
+        with self._lock:
+            session = self._sessions.get(session_hash)
+            if session is None:
+                self._prune()
+                session = self._sessions[session_hash] = _Session()
+            return session
+
+    def _prune(self):
+        # Closed sessions are kept for a while so that chunks of producers that are still
+        # running are discarded instead of being queued for a new session.
+        now = time.monotonic()
+        for session_hash, session in list(self._sessions.items()):
+            if session.closed and now - session.closed_at > self.unclaimed_timeout:
+                del self._sessions[session_hash]
+
+    def put(self, stream_id: str, chunk: Buffer | None):
+        """
+        Queues a chunk of the stream `stream_id` ("session/run/component"). None ends the stream.
+        """
+        session = self._session(stream_id.split("/")[0])
+        if (
+            not session.attached
+            and time.monotonic() - session.created_at > self.unclaimed_timeout
+        ):
+            session.close()
+        session.put(stream_id, chunk)
+
+    def pending(self, stream_id: str) -> list[Buffer | None] | None:
+        """
+        Returns the queue of chunks of `stream_id` that have not been sent yet, or None if there is none.
+        """
+        with self._lock:
+            session = self._sessions.get(stream_id.split("/")[0])
+        if session is None:
+            return None
+        return session.streams.get(stream_id)
+
+    async def frames(self, session_hash: str) -> AsyncIterator[bytes | Buffer]:
+        """
+        Yields the framed chunks of every stream of `session_hash` until the connection is closed.
+        """
+        session = self._session(session_hash)
+        wakeup = asyncio.Event()
+        session.attach(asyncio.get_running_loop(), wakeup)
+        try:
+            while True:
+                item = session.pop()
+                if item is None:
+                    wakeup.clear()
+                    # A chunk may have arrived between popping and clearing.
+                    item = session.pop()
+                if item is None:
+                    await wakeup.wait()
+                    continue
+                stream_id, chunk = item
+                if chunk is None:
+                    yield encode_frame_header(FRAME_END, stream_id, 0)
+                    continue
+                yield encode_frame_header(
+                    FRAME_DATA, stream_id, memoryview(chunk).nbytes
+                )
+                yield chunk
+        finally:
+            session.close(wakeup)
+
+    def stats(self) -> dict[str, int]:
+        """
+        Returns the number of sessions, connected sessions and open streams.
+        """
+        with self._lock:
+            sessions = [s for s in self._sessions.values() if not s.closed]
+        return {
+            "sessions": len(sessions),
+            "connected": sum(session.attached for session in sessions),
+            "streams": sum(len(session.streams) for session in sessions),
+        }
+
+
+multiplex_hub = MultiplexHub()
+_install_lock = threading.Lock()
+
+
+def install_multiplex(app: Any, hub: MultiplexHub | None = None):
+    """
+    Adds the route that serves multiplexed streams to the FastAPI app of a Gradio demo.
+
+    `Rerun(multiplex=True)` installs the route on the app of its Blocks automatically when its
+    first stream starts. Call this yourself if that app is not reachable, e.g. when the demo is
+    served by a custom FastAPI app. The route uses the same authentication as Gradio's own
+    stream route.
+
+    Parameters:
+        app: The FastAPI app created by Gradio for the demo.
+        hub: The hub to serve. If None, the hub used by `Rerun` components is served.
+    """
+    from fastapi.responses import StreamingResponse
+
+    hub = hub or multiplex_hub
+    with _install_lock:
+        if getattr(app.state, "gradio_rerun_multiplex", False):
+            return
+        app.state.gradio_rerun_multiplex = True
+
+    dependencies = []
+    for route in app.routes:
+        if getattr(route, "path", "").startswith("/stream/"):
+            dependencies = list(getattr(route, "dependencies", []))
+            break
+
+    async def multiplexed_stream(session_hash: str):
+        return StreamingResponse(
+            hub.frames(session_hash),
+            media_type="application/octet-stream",
+            headers={"Cache-Control": "no-store", "X-Accel-Buffering": "no"},
+        )
+
+    app.add_api_route(
+        MULTIPLEX_ROUTE,
+        multiplexed_stream,
+        methods=["GET"],
+        dependencies=dependencies,
+    )
+
+
+def _install_for_current_app(blocks: Any):
+    from gradio.context import LocalContext
+
+    # The app serving the current request is also the right one when the demo is mounted
+    # into another FastAPI app, where `blocks.server_app` is not set.
+    request = LocalContext.request.get()
+    app = getattr(getattr(request, "request", None), "app", None)
+    if app is None:
+        app = getattr(blocks, "server_app", None)
+    if app is not None:
+        install_multiplex(app)
@@ -0,0 +1,344 @@
+"""Run CPU-heavy streaming producers in worker processes."""
+
+from __future__ import annotations
+
+import asyncio
+import functools
+import importlib
+import inspect
+import multiprocessing
+import os
+import pickle
+import queue
+import sys
+import threading
+import traceback
+from multiprocessing import resource_tracker
+from multiprocessing.connection import Connection
+from multiprocessing.shared_memory import SharedMemory
+from typing import Any, Callable, Iterator
+
+from .streaming import Buffer, Producer, byte_view
+
+
+class _RemoteTraceback(Exception):
+    def __init__(self, tb: str):
+        self.tb = tb
+
+    def __str__(self):
+        return self.tb
+
+
+def _create_shared_memory(size: int) -> SharedMemory:
+    if sys.version_info >= (3, 13):
+        return SharedMemory(create=True, size=size, track=False)
+    shm = SharedMemory(create=True, size=size)
+    # The consumer unlinks the segment; without this the worker's resource tracker would warn
+    # about (and eventually remove) segments it no longer owns.
+    resource_tracker.unregister(shm._name, "shared_memory")
+    return shm
+
+
+def _resolve(module_name: str, qualname: str) -> Callable:
+    """
+    Finds the producer wrapped by `in_process_pool`, looking through any decorators applied on top of it.
+    """
+    module = importlib.import_module(module_name)
+    obj: Any = module
+    for part in qualname.split("."):
+        obj = getattr(obj, part)
+    while obj is not None:
+        target = getattr(obj, "_process_pool_target", None)
+        if target is not None:
+            return target
+        obj = getattr(obj, "__wrapped__", None)
+    raise LookupError(f"{module_name}.{qualname} is not decorated with in_process_pool")
+
+
+def _iter_async(chunks) -> Iterator[bytes]:
+    loop = asyncio.new_event_loop()
+    try:
+        while True:
+            try:
+                yield loop.run_until_complete(chunks.__anext__())
+            except StopAsyncIteration:
+                return
+    finally:
+        loop.run_until_complete(chunks.aclose())
+        loop.close()
+
+
+def _send_chunk(conn: Connection, chunk: Buffer, shm_threshold: int):
+    chunk = byte_view(chunk)
+    if len(chunk) < shm_threshold:
+        conn.send(("chunk", bytes(chunk)))
+        return
+    shm = _create_shared_memory(len(chunk))
+    try:
+        shm.buf[: len(chunk)] = chunk
+    except BaseException:
+        shm.close()
+        shm.unlink()
+        raise
+    conn.send(("shm", shm.name, len(chunk)))
+    shm.close()
+
+
+def _run_task(conn: Connection, task: tuple, shm_threshold: int, max_inflight: int):
+    module_name, qualname, args, kwargs = task
+    try:
+        chunks = _resolve(module_name, qualname)(*args, **kwargs)
+        if inspect.isasyncgen(chunks):
+            chunks = _iter_async(chunks)
+        inflight = 0
+        try:
+            for chunk in chunks:
+                if chunk is None:
+                    continue
+                chunk = byte_view(chunk)
+                if len(chunk) == 0:
+                    continue
+                _send_chunk(conn, chunk, shm_threshold)
+                inflight += 1
+                # Keep at most `max_inflight` chunks ahead of the consumer, and notice
+                # cancellation between chunks.
+                while inflight >= max_inflight or conn.poll():
+                    if conn.recv() == "cancel":
+                        conn.send(("cancelled",))
+                        return
+                    inflight -= 1
+        finally:
+            chunks.close()
+    except Exception as e:
+        tb = traceback.format_exc()
+        try:
+            pickle.dumps(e)
+        except Exception:
+            e = RuntimeError(f"{type(e).__name__}: {e}")
+        conn.send(("error", e, tb))
+        return
+    conn.send(("done",))
+
+
+def _worker_main(conn: Connection, shm_threshold: int, max_inflight: int):
+    while True:
+        try:
+            task = conn.recv()
+        except EOFError:
+            return
+        if task is None:
+            return
+        if isinstance(task, str):
+            # An acknowledgement or cancellation that arrived after the last task finished.
+            continue
+        _run_task(conn, task, shm_threshold, max_inflight)
+
+
+class _Worker:
+    def __init__(self, context, shm_threshold: int, max_inflight: int):
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(
+            target=_worker_main,
+            args=(child_conn, shm_threshold, max_inflight),
+            name="gradio_rerun-producer",
+            daemon=True,
+        )
+        self.process.start()
+        child_conn.close()
+
+    def kill(self):
+        self.process.kill()
+        self.conn.close()
+
+
+def _read_message(message: tuple) -> bytes | None:
+    kind = message[0]
+    if kind == "chunk":
+        return message[1]
+    if kind == "shm":
+        _, name, size = message
+        shm = SharedMemory(name=name)
+        try:
+            return bytes(shm.buf[:size])
+        finally:
+            shm.close()
+            shm.unlink()
+    return None
+
+
+class ProducerPool:
+    """
+    A pool of worker processes that run streaming producers and send their chunks back.
+
+    Chunks smaller than `shm_threshold` are sent through a pipe. Larger chunks are written to a
+    shared memory segment, and only its name goes through the pipe. A worker runs one producer
+    at a time. When every worker is busy, further producers wait for one to become free.
+    """
+
+    def __init__(
+        self,
+        processes: int | None = None,
+        *,
+        shm_threshold: int = 256 * 1024,
+        max_inflight: int = 4,
+        start_method: str = "spawn",
+    ):
+        """
+        Parameters:
+            processes: Maximum number of worker processes. If None, the number of CPUs is used. Workers are started on demand.
+            shm_threshold: Chunks of at least this many bytes are transferred through shared memory.
+            max_inflight: Number of chunks a worker may produce ahead of the consumer before it pauses.
+            start_method: The multiprocessing start method. "spawn" avoids forking a process that runs Gradio's threads.
+        """
+        self.processes = processes or os.cpu_count() or 1
+        self.shm_threshold = shm_threshold
+        self.max_inflight = max_inflight
+        self._context = multiprocessing.get_context(start_method)
+        self._idle: queue.SimpleQueue[_Worker] = queue.SimpleQueue()
+        self._lock = threading.Lock()
+        self._slots = threading.Semaphore(self.processes)
+        self._closed = False
+
+    def _acquire(self) -> _Worker:
+        self._slots.acquire()
+        try:
+            while True:
+                try:
+                    worker = self._idle.get_nowait()
+                except queue.Empty:
+                    break
+                if worker.process.is_alive():
+                    return worker
+                worker.kill()
+            with self._lock:
+                if self._closed:
+                    raise RuntimeError("ProducerPool has been shut down")
+            return _Worker(self._context, self.shm_threshold, self.max_inflight)
+        except BaseException:
+            self._slots.release()
+            raise
+
+    def _release(self, worker: _Worker):
+        self._idle.put(worker)
+        self._slots.release()
+
+    def _discard(self, worker: _Worker):
+        worker.kill()
+        self._slots.release()
+
+    def run(
+        self, module_name: str, qualname: str, args: tuple, kwargs: dict
+    ) -> Iterator[bytes]:
+        """
+        Runs the producer `module_name.qualname` in a worker and yields its chunks.
+        """
+        worker = self._acquire()
+        finished = False
+        try:
+            worker.conn.send((module_name, qualname, args, kwargs))
+            while True:
+                message = worker.conn.recv()
+                if message[0] == "done":
+                    finished = True
+                    return
+                if message[0] == "error":
+                    finished = True
+                    _, error, tb = message
+                    raise error from _RemoteTraceback(tb)
+                data = _read_message(message)
+                worker.conn.send("ack")
+                yield data
+        except (EOFError, OSError) as e:
+            self._discard(worker)
+            worker = None
+            raise RuntimeError("Producer process exited unexpectedly") from e
+        finally:
+            if worker is not None:
+                if finished or self._cancel(worker):
+                    self._release(worker)
+                else:
+                    self._discard(worker)
+
+    def _cancel(self, worker: _Worker) -> bool:
+        # Stop the producer and drain chunks that were already on their way.
+        try:
+            worker.conn.send("cancel")
+            while True:
+                message = worker.conn.recv()
+                if message[0] in ("done", "cancelled", "error"):
+                    return True
+                _read_message(message)
+                worker.conn.send("ack")
+        except (EOFError, OSError):
+            return False
+
+    def shutdown(self):
+        """
+        Stops all idle workers. Workers running a producer stop once it finishes.
+        """
+        with self._lock:
+            self._closed = True
+        while True:
+            try:
+                worker = self._idle.get_nowait()
+            except queue.Empty:
+                return
+            try:
+                worker.conn.send(None)
+            except OSError:
+                pass
+            worker.process.join(timeout=5)
+            if worker.process.is_alive():
+                worker.kill()
+
+
+_default_pool: ProducerPool | None = None
+_default_pool_lock = threading.Lock()
+
+
+def _get_default_pool() -> ProducerPool:
+    global _default_pool
+    with _default_pool_lock:
+        if _default_pool is None:
+            _default_pool = ProducerPool()
+        return _default_pool
+
+
+def in_process_pool(pool: ProducerPool | None = None) -> Callable[[Producer], Producer]:
+    """
+    Decorates a streaming producer so it runs in a worker process instead of the Gradio worker thread.
+
+    CPU-heavy producers, e.g. ones that run OpenCV filters and encode images with `rr.log`, hold
+    the GIL, so a few concurrent users saturate one core. With this decorator every call runs in
+    a process from `pool` and its chunks are streamed back, so concurrent streams use every
+    core. The producer itself does not change:
+
+        @in_process_pool()
+        @rr.thread_local_stream("rerun_example_streaming_blur")
+        def streaming_repeated_blur(img):
+            ...
+
+    The producer must be defined at module level so workers can import it, and its arguments and
+    exceptions must be picklable. Decorators that need the Gradio request, such as
+    `backpressure`, must be applied on top of this one.
+
+    Parameters:
+        pool: The pool to run the producer in. If None, a process-wide pool with one process per CPU is used.
+    """
+
+    def decorator(fn: Producer) -> Producer:
+        module_name, qualname = fn.__module__, fn.__qualname__
+        if "<locals>" in qualname:
+            raise ValueError(
+                f"{qualname} must be defined at module level to run in a process pool"
+            )
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            target = pool or _get_default_pool()
+            yield from target.run(module_name, qualname, args, kwargs)
+
+        wrapper._process_pool_target = fn  # type: ignore[attr-defined]
+        return wrapper
+
+    return decorator
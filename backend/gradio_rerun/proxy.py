@@ -0,0 +1,215 @@
+"""Server-side cache for hosted RRD files, so each URL is downloaded from its origin only once."""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import Future
+from dataclasses import asdict, dataclass
+from pathlib import Path
+
+import httpx
+
+from .cache import RrdCache
+
+
+@dataclass
+class _Validator:
+    etag: str | None = None
+    last_modified: str | None = None
+    checked_at: float = 0.0
+
+
+class UrlProxy:
+    """
+    Downloads hosted RRD files into an `RrdCache` and serves them from there.
+
+    A cached file is used as-is for `revalidate_after` seconds. After that, the next request for
+    it sends a conditional request (`If-None-Match` / `If-Modified-Since`) to the origin, and
+    the file is only downloaded again if it has changed. Concurrent requests for the same URL
+    share a single upstream request. If the origin cannot be reached, a cached copy is served
+    even if it is stale.
+
+    The ETags are stored next to the cached files, so revalidation also works after a restart.
+
+    `fetch` downloads synchronously: it returns once the whole file is in the cache, so the
+    first viewer of an uncached URL waits for the full download before anything is shown.
+    `Rerun` calls it on a worker thread, and serves the cached file from the cache directory
+    without another copy into Gradio's cache.
+    """
+
+    def __init__(
+        self,
+        cache: RrdCache | str | Path,
+        *,
+        revalidate_after: float = 60.0,
+        timeout: float = 30.0,
+        client: httpx.Client | None = None,
+    ):
+        """
+        Parameters:
+            cache: The cache to store downloaded files in, or the directory of a new `RrdCache` with the default budgets.
+            revalidate_after: Seconds a cached file is served without asking the origin whether it changed. Use 0 to revalidate on every request.
+            timeout: Timeout in seconds for connecting to and reading from the origin.
+            client: The HTTP client to use. If None, a client that follows redirects is created.
+        """
+        self.cache = cache if isinstance(cache, RrdCache) else RrdCache(cache)
+        self.revalidate_after = revalidate_after
+        self.client = client or httpx.Client(follow_redirects=True, timeout=timeout)
+        self.hits = 0
+        self.revalidations = 0
+        self.downloads = 0
+        self.coalesced = 0
+        self.stale = 0
+        self._validators: dict[str, _Validator] = {}
+        self._inflight: dict[str, Future[str]] = {}
+        self._lock = threading.Lock()
+        self._load_validators()
+
+    @property
+    def _validators_path(self) -> Path:
+        return self.cache.cache_dir / "validators.json"
+
+    def _load_validators(self):
+        try:
+            data = json.loads(self._validators_path.read_text())
+        except (FileNotFoundError, ValueError):
+            return
+        for key, validator in data.items():
+            if key in self.cache:
+                # Unknown age after a restart, so revalidate before the first use.
+                self._validators[key] = _Validator(
+                    etag=validator.get("etag"),
+                    last_modified=validator.get("last_modified"),
+                )
+
+    def _save_validators(self):
+        # Drop validators of files the cache has evicted in the meantime.
+        data = {
+            key: asdict(validator)
+            for key, validator in self._validators.items()
+            if key in self.cache
+        }
+        fd, tmp_name = tempfile.mkstemp(dir=self.cache.cache_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump(data, f)
+            os.replace(tmp_name, self._validators_path)
+        except BaseException:
+            Path(tmp_name).unlink(missing_ok=True)
+            raise
+
+    @staticmethod
+    def key_for(url: str) -> str:
+        return hashlib.sha256(f"url:{url}".encode()).hexdigest()
+
+    def cached(self, url: str) -> str | None:
+        """
+        Returns the path of the cached copy of `url` if it can be used without asking the origin, or None.
+        """
+        key = self.key_for(url)
+        with self._lock:
+            return self._fresh(key)
+
+    def _fresh(self, key: str) -> str | None:
+        validator = self._validators.get(key)
+        if (
+            validator is None
+            or time.time() - validator.checked_at >= self.revalidate_after
+        ):
+            return None
+        path = self.cache.get(key)
+        if path is not None:
+            self.hits += 1
+        return path
+
+    def fetch(self, url: str) -> str:
+        """
+        Returns the path of a cached copy of `url`, downloading or revalidating it if needed.
+
+        Blocks until the file is in the cache, so it must not be called on an event loop.
+        """
+        key = self.key_for(url)
+        with self._lock:
+            path = self._fresh(key)
+            if path is not None:
+                return path
+            flight = self._inflight.get(key)
+            leader = flight is None
+            if flight is None:
+                flight = self._inflight[key] = Future()
+            else:
+                self.coalesced += 1
+        if not leader:
+            return flight.result()
+        try:
+            path = self._refresh(url, key)
+        except BaseException as e:
+            flight.set_exception(e)
+            raise
+        else:
+            flight.set_result(path)
+            return path
+        finally:
+            with self._lock:
+                del self._inflight[key]
+
+    def _refresh(self, url: str, key: str) -> str:
+        cached = self.cache.get(key)
+        validator = self._validators.get(key) if cached is not None else None
+        headers = {}
+        if validator is not None:
+            if validator.etag is not None:
+                headers["If-None-Match"] = validator.etag
+            if validator.last_modified is not None:
+                headers["If-Modified-Since"] = validator.last_modified
+        try:
+            with self.client.stream("GET", url, headers=headers) as response:
+                if response.status_code == 304 and cached is not None:
+                    previous = validator or _Validator()
+                    with self._lock:
+                        self.revalidations += 1
+                        self._validators[key] = _Validator(
+                            etag=response.headers.get("ETag", previous.etag),
+                            last_modified=response.headers.get(
+                                "Last-Modified", previous.last_modified
+                            ),
+                            checked_at=time.time(),
+                        )
+                    return cached
+                response.raise_for_status()
+                path = self.cache.put_stream(response.iter_bytes(), key, replace=True)
+                new_validator = _Validator(
+                    etag=response.headers.get("ETag"),
+                    last_modified=response.headers.get("Last-Modified"),
+                    checked_at=time.time(),
+                )
+        except httpx.HTTPError:
+            if cached is None or not Path(cached).exists():
+                raise
+            with self._lock:
+                self.stale += 1
+            return cached
+        with self._lock:
+            self.downloads += 1
+            self._validators[key] = new_validator
+            self._save_validators()
+        return path
+
+    def stats(self) -> dict[str, int]:
+        """
+        Returns how requests were served, together with the statistics of the underlying cache.
+        """
+        return {
+            "hits": self.hits,
+            "revalidations": self.revalidations,
+            "downloads": self.downloads,
+            "coalesced": self.coalesced,
+            "stale": self.stale,
+            "entries": len(self.cache),
+            "bytes": self.cache.size_bytes,
+        }
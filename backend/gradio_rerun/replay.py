@@ -0,0 +1,150 @@
+"""Bounded replay buffer that lets late joiners catch up with a live stream."""
+
+from __future__ import annotations
+
+import itertools
+import threading
+from collections import OrderedDict, deque
+
+from .streaming import Buffer, LatestChunk, StaticChunk, byte_view
+
+
+class ReplayBuffer:
+    """
+    Retains enough of a live RRD stream to give a viewer that joins late a consistent view.
+
+    Chunks are sorted into four groups as they are appended:
+
+    - the first `keep_first` chunks, which hold the stream header, store info and usually the blueprint;
+    - `StaticChunk`s, e.g. from `static(...)`, which are kept for the lifetime of the stream;
+    - `LatestChunk`s, of which only the newest per key is kept, so "latest value wins" entities are compacted to a snapshot;
+    - all other chunks, which form a rolling history of at most `max_history_bytes`.
+
+    `snapshot()` returns the retained chunks in the order they were appended, which is itself a
+    valid RRD stream. Whenever more than `max_bytes` are retained, history is evicted first,
+    then the least recently updated `LatestChunk`s. The first and static chunks are never
+    evicted.
+    """
+
+    def __init__(
+        self,
+        max_bytes: int | None = 32 * 1024 * 1024,
+        max_history_bytes: int | None = 8 * 1024 * 1024,
+        keep_first: int = 1,
+    ):
+        """
+        Parameters:
+            max_bytes: Maximum number of bytes retained in total. If None, only `max_history_bytes` limits the buffer.
+            max_history_bytes: Maximum number of bytes of plain chunks retained. Use 0 to only keep the first, static and latest chunks. If None, the history is only limited by `max_bytes`.
+            keep_first: Number of chunks at the start of the stream that are always retained.
+        """
+        self.max_bytes = max_bytes
+        self.max_history_bytes = max_history_bytes
+        self.keep_first = keep_first
+        self.evicted_chunks = 0
+        self.evicted_bytes = 0
+        self._sequence = itertools.count()
+        self._first: list[tuple[int, bytes]] = []
+        self._static: list[tuple[int, bytes]] = []
+        self._latest: OrderedDict[str, tuple[int, bytes]] = OrderedDict()
+        self._history: deque[tuple[int, bytes]] = deque()
+        self._pinned_bytes = 0
+        self._latest_bytes = 0
+        self._history_bytes = 0
+        self._lock = threading.Lock()
+
+    def append(self, chunk: Buffer | None):
+        """
+        Adds the next chunk of the stream. Empty chunks are ignored.
+        """
+        if chunk is None:
+            return
+        if not isinstance(chunk, bytes):
+            # Retained for later, so take a copy the producer cannot modify.
+            chunk = bytes(byte_view(chunk))
+        if len(chunk) == 0:
+            return
+        with self._lock:
+            entry = (next(self._sequence), chunk)
+            if len(self._first) < self.keep_first:
+                self._first.append(entry)
+                self._pinned_bytes += len(chunk)
+            elif isinstance(chunk, StaticChunk):
+                self._static.append(entry)
+                self._pinned_bytes += len(chunk)
+            elif isinstance(chunk, LatestChunk):
+                replaced = self._latest.pop(chunk.key, None)
+                if replaced is not None:
+                    self._latest_bytes -= len(replaced[1])
+                self._latest[chunk.key] = entry
+                self._latest_bytes += len(chunk)
+            else:
+                self._history.append(entry)
+                self._history_bytes += len(chunk)
+            self._evict()
+
+    def _evict(self):
+        while self._history and (
+            (
+                self.max_history_bytes is not None
+                and self._history_bytes > self.max_history_bytes
+            )
+            or self._over_budget()
+        ):
+            _, chunk = self._history.popleft()
+            self._history_bytes -= len(chunk)
+            self._evicted(chunk)
+        while self._latest and self._over_budget():
+            _, (_, chunk) = self._latest.popitem(last=False)
+            self._latest_bytes -= len(chunk)
+            self._evicted(chunk)
+
+    def _over_budget(self) -> bool:
+        return self.max_bytes is not None and self.size_bytes > self.max_bytes
+
+    def _evicted(self, chunk: bytes):
+        self.evicted_chunks += 1
+        self.evicted_bytes += len(chunk)
+
+    @property
+    def size_bytes(self) -> int:
+        return self._pinned_bytes + self._latest_bytes + self._history_bytes
+
+    def __len__(self) -> int:
+        return (
+            len(self._first) + len(self._static) + len(self._latest) + len(self._history)
+        )
+
+    def snapshot(self) -> list[bytes]:
+        """
+        Returns the retained chunks in stream order.
+        """
+        with self._lock:
+            entries = [
+                *self._first,
+                *self._static,
+                *self._latest.values(),
+                *self._history,
+            ]
+        return [chunk for _, chunk in sorted(entries, key=lambda entry: entry[0])]
+
+    def clear(self):
+        with self._lock:
+            self._first.clear()
+            self._static.clear()
+            self._latest.clear()
+            self._history.clear()
+            self._pinned_bytes = self._latest_bytes = self._history_bytes = 0
+
+    def stats(self) -> dict[str, int]:
+        """
+        Returns the number of retained chunks and bytes per group together with the eviction counters.
+        """
+        return {
+            "chunks": len(self),
+            "bytes": self.size_bytes,
+            "latest_keys": len(self._latest),
+            "history_bytes": self._history_bytes,
+            "evicted_chunks": self.evicted_chunks,
+            "evicted_bytes": self.evicted_bytes,
+        }
@@ -0,0 +1,643 @@
+"""gr.SimpleImage() component."""
+
+from __future__ import annotations
+
+import functools
+import hashlib
+import time
+from pathlib import Path
+from urllib.parse import urlparse
+from typing import Any, Callable, Literal
+
+from gradio_client import file
+from gradio.components.base import Component, StreamingOutput
+from gradio.data_classes import GradioRootModel, FileData
+from gradio.events import Events
+
+from .cache import RrdCache
+from .compression import COMPRESSION_FORMATS, CompressionStats, StreamCompressor
+from .filtering import RrdFilter, filter_rrd
+from .incremental import _serve_in_place
+from .metrics import (
+    StreamHooks,
+    StreamInfo,
+    _enable_producer_timing,
+    _pop_producer_start,
+)
+from .multiplex import _install_for_current_app, multiplex_hub
+from .proxy import UrlProxy
+from .rrd import RrdIndex, RrdSlice
+from .streaming import (
+    Buffer,
+    SendBuffer,
+    byte_view,
+    is_buffer,
+    register_send_buffer,
+    release_send_buffer,
+)
+from .tee import RrdTee
+from .tempfiles import _mark_delivered
+
+
+@functools.lru_cache(maxsize=None)
+def _default_rrd_cache(gradio_cache: str) -> RrdCache:
+    # Shared between all components so the budget applies to the whole cache directory.
+    return RrdCache(Path(gradio_cache) / "rrd")
+
+
+@functools.lru_cache(maxsize=None)
+def _default_url_proxy(gradio_cache: str) -> UrlProxy:
+    return UrlProxy(Path(gradio_cache) / "rrd_proxy")
+
+
+class RerunData(GradioRootModel):
+    """
+    Data model for Rerun component is a list of data sources.
+
+    `FileData` is used for data served from Gradio, while `str` is used for URLs Rerun will open from a remote server.
+    """
+
+    root: list[FileData | str]
+
+
+def append_sources(
+    value: RerunData | list[FileData | Path | str | RrdSlice] | None,
+    *sources: FileData | Path | str | RrdSlice,
+) -> list[FileData | Path | str | RrdSlice]:
+    """
+    Returns the sources of `value` followed by `sources`.
+
+    Pass the viewer as an input of the event and return the result to it. The viewer only opens
+    the new sources instead of reloading the ones it already shows:
+
+        def add_rrd(current, path):
+            return append_sources(current, path)
+
+        button.click(add_rrd, inputs=[viewer, path], outputs=[viewer])
+
+    Sources that are already part of `value` are not added twice.
+    """
+    if value is None:
+        current: list[FileData | Path | str | RrdSlice] = []
+    elif isinstance(value, RerunData):
+        current = list(value.root)
+    else:
+        current = list(value)
+    for source in sources:
+        if source not in current:
+            current.append(source)
+    return current
+
+from gradio.events import Dependency
+
+class Rerun(Component, StreamingOutput):
+    """
+    Creates a Rerun viewer component that can be used to display the output of a Rerun stream.
+    """
+
+    EVENTS: list[Events] = []
+
+    data_model = RerunData
+
+    def __init__(
+        self,
+        value: list[Path | str] | Path | str | Buffer | Callable | None = None,
+        *,
+        label: str | None = None,
+        every: float | None = None,
+        show_label: bool | None = None,
+        container: bool = True,
+        scale: int | None = None,
+        min_width: int = 160,
+        height: int | str = 640,
+        visible: bool = True,
+        streaming: bool = False,
+        elem_id: str | None = None,
+        elem_classes: list[str] | str | None = None,
+        render: bool = True,
+        panel_states: dict[str, Any] | None = None,
+        rrd_cache: RrdCache | None = None,
+        max_buffer_bytes: int | None = None,
+        overflow: Literal["block", "drop"] = "block",
+        compression: Literal["gzip", "deflate"] | None = None,
+        compression_level: int = 6,
+        source_filter: RrdFilter | None = None,
+        metrics: StreamHooks | None = None,
+        incremental: bool = False,
+        proxy: bool | UrlProxy = False,
+        multiplex: bool = False,
+        tee: RrdTee | None = None,
+    ):
+        """
+        Parameters:
+            value: Takes a singular or list of RRD resources. Each RRD can be a Path, a string containing a url, an `RrdSlice` selecting a range of messages of a local file, or a binary blob containing encoded RRD data. Blobs may be any object supporting the buffer protocol, e.g. `bytes`, `bytearray`, `memoryview` or a NumPy array, and are used without being copied. If callable, the function will be called whenever the app loads to set the initial value of the component.
+            label: The label for this component. Appears above the component and is also used as the header if there are a table of examples for this component. If None and used in a `gr.Interface`, the label will be the name of the parameter this component is assigned to.
+            every: If `value` is a callable, run the function 'every' number of seconds while the client connection is open. Has no effect otherwise. Queue must be enabled. The event can be accessed (e.g. to cancel it) via this component's .load_event attribute.
+            show_label: if True, will display label.
+            container: If True, will place the component in a container - providing some extra padding around the border.
+            scale: relative size compared to adjacent Components. For example if Components A and B are in a Row, and A has scale=2, and B has scale=1, A will be twice as wide as B. Should be an integer. scale applies in Rows, and to top-level Components in Blocks where fill_height=True.
+            min_width: minimum pixel width, will wrap if not sufficient screen space to satisfy this value. If a certain scale value results in this Component being narrower than min_width, the min_width parameter will be respected first.
+            height: height of component in pixels. If a string is provided, will be interpreted as a CSS value. If None, will be set to 640px.
+            visible: If False, component will be hidden.
+            streaming: If True, the data should be incrementally yielded from the source as `bytes` returned by calling `.read()` on an `rr.binary_stream()`. The producer may be a generator or an async generator; async producers should log through an `AsyncRecordingStream`. Decorate the producer with `coalesce_chunks` to merge small reads into fewer chunks. Chunks may also be `bytearray`, `memoryview` or any other buffer; they are streamed without being copied, so they must not be modified after being yielded.
+            elem_id: An optional string that is assigned as the id of this component in the HTML DOM. Can be used for targeting CSS styles.
+            elem_classes: An optional list of strings that are assigned as the classes of this component in the HTML DOM. Can be used for targeting CSS styles.
+            render: If False, component will not render be rendered in the Blocks context. Should be used if the intention is to assign event listeners now but render the component later.
+            panel_states: Force viewer panels to a specific state. Any panels set cannot be toggled by the user in the viewer. Panel names are "top", "blueprint", "selection", and "time". States are "hidden", "collapsed", and "expanded".
+            rrd_cache: The cache used to store binary blobs returned in non-streaming mode, as well as filtered files and slices. Its files are served in place rather than copied into Gradio's cache, so its budget bounds the disk space they use. If None, a cache bounded to 1 GiB and 256 recordings is created in the Gradio cache directory.
+            max_buffer_bytes: In streaming mode, the number of bytes that may be queued for a slow viewer before `overflow` applies. If None, the queue is unbounded.
+            overflow: What to do when more than `max_buffer_bytes` are queued. "block" pauses producers decorated with `backpressure` until the viewer catches up; "drop" discards queued chunks marked with `latest` once a newer chunk with the same key arrives. Producers without `backpressure` are not paused and chunks without `latest` are never dropped, so a warning is logged when a stream exceeds the limit anyway.
+            compression: In streaming mode, compress chunks on the wire with "gzip" or "deflate". The viewer decodes them with the browser's `DecompressionStream`. Ratio and CPU cost are available from `compression_stats`.
+            compression_level: zlib compression level from 0 (fastest) to 9 (smallest) used when `compression` is set.
+            source_filter: If set, local files and binary blobs are decoded on the server and only the entities and time range selected by the filter are sent to the viewer. URLs are passed through unfiltered unless `proxy` is set. Files returned by an event are filtered on a worker thread once the viewer requests them, and the result is cached.
+            metrics: Hooks called for every streamed chunk, at the start and end of every stream, and after every non-streaming value is processed. Pass a `MetricsRegistry` to aggregate them and export them in the Prometheus format. If None, no instrumentation runs.
+            incremental: If True, local files are treated as recordings that only grow, e.g. the path returned by `IncrementalRecording.flush()`. When the same file is returned again, for example by an `every=` callable, the viewer only downloads and appends the bytes added since it last loaded it instead of reopening the whole file.
+            proxy: If set, http(s) URLs are downloaded by the server and served from a local cache instead of being opened by each browser from the origin. Cached files are revalidated with their ETag, and concurrent requests for the same URL share one download. During an event, a file that is not cached or needs revalidation is downloaded once the viewer requests it, on a worker thread, and the viewer starts loading it once the server has all of it; cached files are served in place without being copied again. If True, a cache bounded to 1 GiB and 256 recordings is created in the Gradio cache directory; pass a `UrlProxy` to use other settings.
+            multiplex: In streaming mode, send the streams of all multiplexed viewers on a page over one shared connection instead of one connection per viewer, so that pages with many viewers do not run into the browser's limit on connections per host. Streams are interleaved chunk by chunk. Cannot be combined with `compression`.
+            tee: In streaming mode, every chunk is also written to an RRD file on disk by this `RrdTee`, in the background. Once a stream has ended, its recording can be returned to any `Rerun` component to replay it without running the producer again.
+        """
+        if overflow not in ("block", "drop"):
+            raise ValueError(f'overflow must be "block" or "drop", got {overflow!r}')
+        if compression is not None and compression not in COMPRESSION_FORMATS:
+            raise ValueError(
+                f"compression must be one of {COMPRESSION_FORMATS}, got {compression!r}"
+            )
+        if compression is not None and overflow == "drop":
+            # Dropping part of a compressed stream would corrupt everything after it.
+            raise ValueError('overflow="drop" cannot be combined with compression')
+        if multiplex and compression is not None:
+            # Each compressed stream needs its own decoder in the browser.
+            raise ValueError("multiplex cannot be combined with compression")
+        if incremental and source_filter is not None:
+            # A filtered file is re-encoded from scratch, so it does not only grow.
+            raise ValueError("incremental cannot be combined with source_filter")
+        self.height = height
+        self.streaming = streaming
+        self.panel_states = panel_states
+        self._rrd_cache = rrd_cache
+        self.max_buffer_bytes = max_buffer_bytes
+        self.overflow = overflow
+        self._send_buffers: dict[str, SendBuffer] = {}
+        self.compression = compression
+        self.compression_level = compression_level
+        self.compression_stats = CompressionStats()
+        self._compressors: dict[str, StreamCompressor] = {}
+        self._source_filter = source_filter
+        self._metrics = metrics
+        self._streams: dict[str, StreamInfo] = {}
+        # Last chunk time of every stream that has not ended, and streams ended by a timeout.
+        self._open_streams: dict[str, float] = {}
+        self._expired_streams: deque[str] = deque(maxlen=256)
+        self.incremental = incremental
+        self._url_proxy = proxy if isinstance(proxy, UrlProxy) else None
+        self.proxy = bool(proxy)
+        self.multiplex = multiplex
+        self._tee = tee
+        if metrics is not None:
+            _enable_producer_timing()
+        super().__init__(
+            label=label,
+            every=every,
+            show_label=show_label,
+            container=container,
+            scale=scale,
+            min_width=min_width,
+            interactive=False,  # Rerun is an output-component only
+            visible=visible,
+            elem_id=elem_id,
+            elem_classes=elem_classes,
+            render=render,
+            value=value,
+        )
+
+    # Not properties: Gradio's `get_config` reads those named after `__init__` parameters and
+    # would send the cache object to the frontend, and `Component.__init__` reads all of them
+    # before the component is set up.
+    def _get_rrd_cache(self) -> RrdCache:
+        if self._rrd_cache is None:
+            self._rrd_cache = _default_rrd_cache(self.GRADIO_CACHE)
+        # Files are served from the cache directory, so Gradio does not keep a second copy of
+        # every recording that eviction would never remove.
+        _serve_in_place(self._rrd_cache.cache_dir)
+        return self._rrd_cache
+
+    def _get_url_proxy(self) -> UrlProxy:
+        if self._url_proxy is None:
+            self._url_proxy = _default_url_proxy(self.GRADIO_CACHE)
+        _serve_in_place(self._url_proxy.cache.cache_dir)
+        return self._url_proxy
+
+    def get_config(self):
+        config = super().get_config()
+        config["panel_states"] = self.panel_states
+        return config
+
+    def preprocess(self, payload: RerunData | None) -> RerunData | None:
+        """
+        This component does not accept input.
+
+        Parameters:
+            payload: A RerunData object.
+        Returns:
+            A RerunData object.
+        """
+        if payload is None:
+            return None
+        return payload
+
+    def postprocess(
+        self,
+        value: RerunData
+        | list[FileData | Path | str | RrdSlice]
+        | Path
+        | str
+        | RrdSlice
+        | Buffer,
+    ) -> RerunData | Buffer:
+        """
+        Parameters:
+            value: Expects
+        Returns:
+            A FileData object containing the image data.
+        """
+        if self._metrics is None or (self.streaming and is_buffer(value)):
+            return self._postprocess(value)
+        start = time.perf_counter()
+        result = self._postprocess(value)
+        if is_buffer(value):
+            kind, nbytes = "bytes", memoryview(value).nbytes
+        else:
+            kind = "sources"
+            nbytes = sum(
+                source.size or 0 for source in result.root if isinstance(source, FileData)
+            )
+        self._metrics.postprocessed(
+            self._get_metrics_name(), kind, nbytes, time.perf_counter() - start
+        )
+        return result
+
+    def _postprocess(
+        self,
+        value: RerunData
+        | list[FileData | Path | str | RrdSlice]
+        | Path
+        | str
+        | RrdSlice
+        | Buffer
+        | None,
+    ) -> RerunData | Buffer:
+        if value is None:
+            return RerunData(root=[])
+
+        if isinstance(value, RerunData):
+            value = value.root
+
+        if is_buffer(value):
+            if self.streaming:
+                # Passed through as-is (or as a flat view of the same memory) to `stream_output`.
+                return byte_view(value)
+            file_path = self._get_rrd_cache().put(value)
+            if self._source_filter is not None:
+                return RerunData(root=[self._serve_filtered(file_path)])
+            return RerunData(root=[FileData(path=file_path)])
+
+        if not isinstance(value, list):
+            value = [value]
+
+        def is_url(input: Path | str) -> bool:
+            if isinstance(input, Path):
+                return False
+            return input.startswith("http://") or input.startswith("https://")
+
+        root: list[FileData | str] = []
+        for file in value:
+            if isinstance(file, FileData):
+                # Already served, e.g. a source kept by `append_sources`. Reusing it keeps its
+                # URL, so the viewer does not load it again.
+                root.append(file)
+            elif isinstance(file, RrdSlice):
+                root.append(self._serve_slice(file))
+            elif is_url(file) and self.proxy:
+                root.append(self._serve_proxied(file))
+            elif is_url(file):
+                root.append(file)
+            elif self._source_filter is not None:
+                root.append(self._serve_filtered(file))
+            elif self.incremental:
+                # Managed temporary files get new names, so their whole directory is served.
+                _serve_in_place(_managed_directory(file) or file)
+                path = Path(file).resolve()
+                # Served in place, so a managed temporary file must outlive this call; it is
+                # removed once it has not been returned for the manager's grace period.
+                _mark_delivered(file)
+                root.append(
+                    FileData(
+                        path=str(path), orig_name=path.name, size=path.stat().st_size
+                    )
+                )
+            else:
+                # Gradio copies the file into its cache before sending it, after which a
+                # managed temporary file is no longer needed.
+                _mark_delivered(file)
+                root.append(
+                    FileData(
+                        path=str(file),
+                        orig_name=Path(file).name,
+                        size=Path(file).stat().st_size,
+                    )
+                )
+        return RerunData(root=root)
+
+    def _filter_key(self, path: Path) -> str:
+        stat = path.stat()
+        return hashlib.sha256(
+            f"{path}:{stat.st_size}:{stat.st_mtime_ns}:{self._source_filter!r}".encode()
+        ).hexdigest()
+
+    def _serve_filtered(self, file: Path | str) -> FileData:
+        path = Path(file).resolve()
+        if self._filter_key(path) not in self._get_rrd_cache():
+            return self._serve_prepared(
+                functools.partial(self._filter_file, file), path.name
+            )
+        file_path = self._filter_file(file)
+        return FileData(
+            path=file_path,
+            orig_name=path.name,
+            size=Path(file_path).stat().st_size,
+        )
+
+    def _filter_file(self, file: Path | str) -> str:
+        path = Path(file).resolve()
+        key = self._filter_key(path)
+        cache = self._get_rrd_cache()
+        file_path = cache.get(key)
+        if file_path is None:
+            file_path = cache.put(filter_rrd(path, self._source_filter), key)
+        # The filtered copy is served instead, so a managed temporary file is no longer needed.
+        _mark_delivered(file)
+        return file_path
+
+    def _serve_prepared(
+        self, prepare: Callable[[], str], orig_name: str | None
+    ) -> FileData:
+        """
+        Serves the file returned by `prepare`, which may take a while to produce.
+
+        During an event, `prepare` runs once the viewer requests the file, on the worker thread
+        of Gradio's stream route, instead of blocking the event loop.
+        """
+        blocks = self._root_blocks()
+        if blocks is None or not _on_event_loop():
+            file_path = prepare()
+            return FileData(
+                path=file_path,
+                orig_name=orig_name,
+                size=Path(file_path).stat().st_size,
+            )
+        # Served like a streaming output, under a key of its own that cannot be guessed.
+        key = f"rerun-{secrets.token_urlsafe(16)}"
+        source = _DeferredSource(prepare, lambda: blocks.pending_streams.pop(key, None))
+        blocks.pending_streams[key] = {0: {self._id: source}}
+        return FileData(path=f"{key}/0/{self._id}", orig_name=orig_name, is_stream=True)
+
+    def _serve_proxied(self, url: str) -> FileData:
+        proxy = self._get_url_proxy()
+        orig_name = Path(urlparse(url).path).name or None
+        file_path = proxy.cached(url)
+        if file_path is None:
+
+            def prepare() -> str:
+                file_path = proxy.fetch(url)
+                if self._source_filter is not None:
+                    file_path = self._filter_file(file_path)
+                return file_path
+
+            return self._serve_prepared(prepare, orig_name)
+        if self._source_filter is not None:
+            return self._serve_filtered(file_path)
+        return FileData(
+            path=file_path,
+            orig_name=orig_name,
+            size=Path(file_path).stat().st_size,
+        )
+
+    def _serve_slice(self, value: RrdSlice) -> FileData:
+        path = Path(value.path).resolve()
+        stat = path.stat()
+        key = hashlib.sha256(
+            f"{path}:{stat.st_size}:{stat.st_mtime_ns}:"
+            f"{value.start}:{value.stop}:{value.keep_prefix}".encode()
+        ).hexdigest()
+        cache = self._get_rrd_cache()
+        file_path = cache.get(key)
+        if file_path is not None:
+            # The slice is served from the cache, so a managed temporary file is no longer needed.
+            _mark_delivered(value.path)
+            return FileData(
+                path=file_path,
+                orig_name=path.name,
+                size=Path(file_path).stat().st_size,
+            )
+
+        def prepare() -> str:
+            # Indexing a large file reads all of it the first time.
+            index = RrdIndex.load(path)
+            file_path = cache.put_stream(
+                index.iter_slice(value.start, value.stop, value.keep_prefix), key
+            )
+            _mark_delivered(value.path)
+            return file_path
+
+        return self._serve_prepared(prepare, path.name)
+
+    def stream_output(
+        self, value, output_id: str, first_chunk: bool
+    ) -> tuple[bytes | memoryview | None, Any]:
+        output_file = {
+            "path": output_id,
+            "is_stream": True,
+        }
+        if value is None:
+            self._end_stream(output_id)
+            return None, output_file
+        if output_id in self._expired_streams:
+            # Gradio has stopped serving this stream, so its remaining chunks go nowhere.
+            return None, output_file
+        value = byte_view(value)
+        if output_id not in self._open_streams:
+            self._open_stream(output_id)
+        self._open_streams[output_id] = time.monotonic()
+        if self._tee is not None:
+            # Teed before compression, so the files on disk are plain RRD.
+            self._tee.write(output_id, value)
+        if self.compression is not None:
+            value = self._compress(value, output_id)
+        if self.max_buffer_bytes is not None:
+            self._track_send_buffer(value, output_id)
+        if self._metrics is not None:
+            self._record_chunk(value, output_id)
+        if self.multiplex:
+            if first_chunk:
+                _install_for_current_app(self._root_blocks())
+            multiplex_hub.put(output_id, value)
+            # Gradio's own stream for this output is never requested by the viewer. None would
+            # end it, which is reserved for the end of the producer.
+            return b"", output_file
+        return value, output_file
+
+    def _open_stream(self, output_id: str):
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            # Not called by Gradio, so the stream only ends when `stream_output` gets None.
+            return
+        # Gradio only creates the pending list once this chunk has been returned, but before
+        # the viewer is told about the stream.
+        loop.call_soon(self._watch_pending_stream, output_id)
+        loop.call_later(_STREAM_TIMEOUT, self._end_idle_stream, output_id)
+
+    def _watch_pending_stream(self, output_id: str):
+        streams = self._pending_streams(output_id)
+        component_id = int(output_id.split("/")[2])
+        pending = None if streams is None else streams.get(component_id)
+        if (
+            pending is None
+            or isinstance(pending, _PendingStream)
+            or output_id not in self._open_streams
+        ):
+            return
+        streams[component_id] = _PendingStream(
+            pending,
+            functools.partial(self._end_stream, output_id),
+            keep_chunks=not self.multiplex,
+        )
+
+    def _end_idle_stream(self, output_id: str):
+        # A cancelled producer, or one whose session has disconnected, never ends its stream.
+        last_chunk_at = self._open_streams.get(output_id)
+        if last_chunk_at is None:
+            return
+        idle = time.monotonic() - last_chunk_at
+        if idle < _STREAM_TIMEOUT:
+            asyncio.get_running_loop().call_later(
+                _STREAM_TIMEOUT - idle, self._end_idle_stream, output_id
+            )
+            return
+        self._expired_streams.append(output_id)
+        self._end_stream(output_id)
+
+    def _end_stream(self, output_id: str):
+        """
+        Releases everything held for a stream. Called when the producer finishes, raises, or stops sending chunks.
+        """
+        if self._open_streams.pop(output_id, None) is None:
+            return
+        if self._tee is not None:
+            self._tee.write(output_id, None)
+        if self.compression is not None:
+            # The stream is closed without a trailer; the decoder has already seen every byte.
+            self._compressors.pop(output_id, None)
+        if self.max_buffer_bytes is not None:
+            self._send_buffers.pop(output_id, None)
+            release_send_buffer(output_id.split("/")[0], output_id)
+        if self._metrics is not None:
+            self._finish_metrics(output_id)
+        if self.multiplex:
+            multiplex_hub.put(output_id, None)
+
+    # A method, since Gradio looks up every attribute of the class before `elem_id` is set.
+    def _get_metrics_name(self) -> str:
+        return self.elem_id or self.label or f"rerun-{self._id}"
+
+    def _finish_metrics(self, output_id: str):
+        stream = self._streams.pop(output_id, None)
+        if stream is not None:
+            stream.finished_at = time.monotonic()
+            self._metrics.stream_finished(stream)
+
+    def _record_chunk(self, value: bytes | memoryview, output_id: str):
+        now = time.monotonic()
+        stream = self._streams.get(output_id)
+        if stream is None:
+            session_hash = output_id.split("/")[0]
+            started_at = _pop_producer_start(session_hash)
+            stream = StreamInfo(
+                stream_id=output_id,
+                component=self._get_metrics_name(),
+                started_at=now if started_at is None else started_at,
+            )
+            self._streams[output_id] = stream
+            self._metrics.stream_started(stream)
+        interval = None
+        if stream.last_chunk_at is None:
+            stream.first_chunk_at = now
+        else:
+            interval = now - stream.last_chunk_at
+            stream.max_chunk_interval = max(stream.max_chunk_interval, interval)
+        stream.last_chunk_at = now
+        stream.chunks += 1
+        stream.bytes += len(value)
+        stream.max_chunk_bytes = max(stream.max_chunk_bytes, len(value))
+        self._metrics.chunk_sent(stream, len(value), interval)
+
+    def _compress(self, value: bytes | memoryview, output_id: str) -> bytes:
+        compressor = self._compressors.get(output_id)
+        if compressor is None:
+            compressor = StreamCompressor(
+                self.compression, self.compression_level, self.compression_stats
+            )
+            self._compressors[output_id] = compressor
+        return compressor.compress(value)
+
+    def _root_blocks(self):
+        blocks = self.parent
+        while blocks is not None and not hasattr(blocks, "pending_streams"):
+            blocks = blocks.parent
+        return blocks
+
+    def _pending_streams(self, output_id: str) -> dict[int, list] | None:
+        # Gradio keeps the chunks it has not yet sent for each stream in a list on the root
+        # Blocks, by session, run and component.
+        blocks = self._root_blocks()
+        if blocks is None:
+            return None
+        session_hash, run, _ = output_id.split("/")
+        return blocks.pending_streams.get(session_hash, {}).get(int(run))
+
+    def _pending_stream(self, output_id: str) -> list | None:
+        if self.multiplex:
+            return multiplex_hub.pending(output_id)
+        streams = self._pending_streams(output_id)
+        if streams is None:
+            return None
+        return streams.get(int(output_id.split("/")[2]))
+
+    def _track_send_buffer(self, value: bytes | memoryview, output_id: str):
+        session_hash = output_id.split("/")[0]
+        buffer = self._send_buffers.get(output_id)
+        if buffer is None:
+            # Gradio only creates the pending list after the first chunk has been returned.
+            pending = self._pending_stream(output_id)
+            if pending is None:
+                return
+            buffer = SendBuffer(pending, self.max_buffer_bytes, self.overflow)
+            self._send_buffers[output_id] = buffer
+            register_send_buffer(session_hash, output_id, buffer)
+        buffer.admit(value)
+
+    def check_streamable(self):
+        return self.streaming
+
+    def example_payload(self) -> Any:
+        return []
+
+    def example_value(self) -> Any:
+        return [
+            "https://app.rerun.io/version/0.16.0/examples/detect_and_track_objects.rrd",
+            "https://app.rerun.io/version/0.16.0/examples/dna.rrd",
+        ]
+    from typing import Callable, Literal, Sequence, Any, TYPE_CHECKING
+    from gradio.blocks import Block
+    if TYPE_CHECKING:
+        from gradio.components import Timer
\ No newline at end of file
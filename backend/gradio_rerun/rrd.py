@@ -0,0 +1,351 @@
+"""Message framing and offset index for RRD files."""
+
+from __future__ import annotations
+
+import hashlib
+import itertools
+import os
+import struct
+from array import array
+from dataclasses import dataclass
+from pathlib import Path
+from typing import BinaryIO, Iterator
+
+RRD_MAGIC = b"RRF2"
+# Magic, crate version and encoding options.
+FILE_HEADER_SIZE = 12
+# Compressed and uncompressed payload length as little-endian u32. Both are zero at the end of a stream.
+MESSAGE_HEADER_SIZE = 8
+# The serializer byte of the encoding options. Only MsgPack streams use the message framing
+# above; later SDKs write Protobuf streams with a different message header.
+SERIALIZER_MSGPACK = 1
+
+_INDEX_MAGIC = b"RRIX"
+_INDEX_VERSION = 2
+# Magic, version, indexed size, end, message count, header count, then the identity of the
+# indexed file: modification time, inode and hashes of its first and last indexed message.
+_INDEX_HEADER = struct.Struct("<4sIQQQQQQ32s32s")
+# Bytes of a message that are hashed to recognize it.
+_FINGERPRINT_BYTES = 64 * 1024
+
+
+class RrdFormatError(ValueError):
+    pass
+
+
+def check_encoding(header: bytes, offset: int = 0):
+    """
+    Raises `RrdFormatError` if the stream with file header `header` uses a message framing this module cannot read.
+    """
+    serializer = header[9]
+    if serializer != SERIALIZER_MSGPACK:
+        raise RrdFormatError(
+            f"Unsupported RRD serializer {serializer} in the stream header at byte {offset}; "
+            "only MsgPack-encoded recordings (rerun-sdk 0.19 to 0.21) can be indexed"
+        )
+
+
+@dataclass(frozen=True)
+class RrdMessage:
+    """
+    The location of one encoded message in an RRD file.
+
+    `offset` points at the message header and `length` covers header and payload, so
+    `data[offset : offset + length]` is a complete, self-contained message.
+    """
+
+    offset: int
+    length: int
+    header: bytes
+    """The file header of the stream the message belongs to."""
+
+
+def iter_messages(
+    f: BinaryIO, start: int = 0, header: bytes = b""
+) -> Iterator[RrdMessage]:
+    """
+    Yields the messages of the RRD data in `f`, starting at byte `start`.
+
+    If `start` lies inside a stream rather than at a file header, `header` must be the file
+    header of that stream. Streams that are not MsgPack-encoded raise `RrdFormatError`.
+
+    Concatenated streams, as produced by appending the output of several `rr.binary_stream()`
+    reads or recordings, are followed across their end-of-stream markers. A message that is cut
+    off at the end of the file is not yielded, so the index of a file that is still being
+    written only covers complete messages.
+    """
+    size = os.fstat(f.fileno()).st_size
+    f.seek(start)
+    offset = start
+    while True:
+        head = f.read(MESSAGE_HEADER_SIZE)
+        if len(head) < MESSAGE_HEADER_SIZE:
+            return
+        if head[:4] == RRD_MAGIC:
+            rest = f.read(FILE_HEADER_SIZE - MESSAGE_HEADER_SIZE)
+            if len(rest) < FILE_HEADER_SIZE - MESSAGE_HEADER_SIZE:
+                return
+            header = head + rest
+            check_encoding(header, offset)
+            offset += FILE_HEADER_SIZE
+            continue
+        if not header:
+            raise RrdFormatError(f"Missing RRD header at byte {offset}")
+        compressed_len, _ = struct.unpack("<II", head)
+        if compressed_len == 0:
+            # End of stream; another stream may follow.
+            offset += MESSAGE_HEADER_SIZE
+            header = b""
+            continue
+        end = offset + MESSAGE_HEADER_SIZE + compressed_len
+        if end > size:
+            return
+        f.seek(end)
+        yield RrdMessage(offset, MESSAGE_HEADER_SIZE + compressed_len, header)
+        offset = end
+
+
+def _hash_range(f: BinaryIO, offset: int, length: int) -> bytes:
+    f.seek(offset)
+    return hashlib.sha256(f.read(min(length, _FINGERPRINT_BYTES))).digest()
+
+
+@dataclass(frozen=True)
+class RrdSlice:
+    """
+    A range of messages from a local RRD file, returned to a `Rerun` component instead of a path.
+
+    Only the selected messages (plus the first `keep_prefix` messages of the recording) are
+    sent to the viewer, so the tail end of a long recording opens without transferring all of
+    it. For example, `RrdSlice("long.rrd", start=-1000)` serves the last 1000 messages.
+
+    Messages are selected by their position in the file, not by time. To send only a time
+    window of a recording, use `Rerun(source_filter=RrdFilter(...))`, which decodes the file.
+    """
+
+    path: str | Path
+    start: int | None = None
+    """Index of the first message; negative values count from the end."""
+    stop: int | None = None
+    """Index after the last message; negative values count from the end."""
+    keep_prefix: int = 16
+    """Number of messages from the start of the recording to always include, which usually hold the store info and blueprint."""
+
+
+class RrdIndex:
+    """
+    The byte offsets of every message in an RRD file.
+
+    Only the framing of the messages is read; their payloads, and with them the times they
+    were logged at, are not decoded.
+
+    The index is cached on disk next to the file (as `<name>.rrd.idx`) and is extended rather
+    than rebuilt when the file has only grown since it was written. A file counts as grown
+    only if it is the same file (inode) and its first and last indexed messages are unchanged;
+    if it was replaced or rewritten, the index is rebuilt.
+    """
+
+    def __init__(self, path: str | Path):
+        self.path = Path(path)
+        self.offsets = array("Q")
+        self.lengths = array("Q")
+        self.headers: list[bytes] = []
+        # Position of the stream header for each message, as an index into `headers`.
+        self.header_ids = array("I")
+        self.indexed_size = 0
+        self.end = 0
+        self.mtime_ns = 0
+        self.inode = 0
+        self.first_hash = b""
+        self.last_hash = b""
+
+    @property
+    def index_path(self) -> Path:
+        return self.path.with_name(self.path.name + ".idx")
+
+    @classmethod
+    def load(cls, path: str | Path) -> RrdIndex:
+        """
+        Returns the index for `path`, reading the cached index and indexing any new data.
+        """
+        index = cls(path)
+        index._read_cached()
+        index.update()
+        return index
+
+    def update(self) -> bool:
+        """
+        Indexes messages appended since the index was last updated and stores the result on disk.
+
+        Returns:
+            True if new messages were indexed.
+        """
+        stat = self.path.stat()
+        if (
+            stat.st_size == self.indexed_size
+            and stat.st_mtime_ns == self.mtime_ns
+            and stat.st_ino == self.inode
+        ):
+            return False
+        if self.indexed_size and not self._still_prefix(stat):
+            # Truncated, replaced or rewritten; start over.
+            self.__init__(self.path)
+        count = len(self.offsets)
+        with open(self.path, "rb") as f:
+            # `end` is just past the last indexed message, i.e. still inside its stream.
+            header = self.headers[-1] if self.headers else b""
+            for message in iter_messages(f, self.end, header):
+                if not self.headers or message.header != self.headers[-1]:
+                    self.headers.append(message.header)
+                self.offsets.append(message.offset)
+                self.lengths.append(message.length)
+                self.header_ids.append(len(self.headers) - 1)
+                self.end = message.offset + message.length
+            self.first_hash, self.last_hash = self._message_hashes(f)
+        self.indexed_size = stat.st_size
+        self.mtime_ns = stat.st_mtime_ns
+        self.inode = stat.st_ino
+        self._write_cached()
+        return len(self.offsets) != count
+
+    def _still_prefix(self, stat: os.stat_result) -> bool:
+        # Whether the indexed part of the file is unchanged, so only new data needs indexing.
+        if stat.st_ino != self.inode or stat.st_size < self.indexed_size:
+            return False
+        if stat.st_size == self.indexed_size and stat.st_mtime_ns != self.mtime_ns:
+            # Rewritten in place with data of the same size.
+            return False
+        try:
+            with open(self.path, "rb") as f:
+                return self._message_hashes(f) == (self.first_hash, self.last_hash)
+        except OSError:
+            return False
+
+    def _message_hashes(self, f: BinaryIO) -> tuple[bytes, bytes]:
+        if not self.offsets:
+            return b"", b""
+        return (
+            _hash_range(f, self.offsets[0], self.lengths[0]),
+            _hash_range(f, self.offsets[-1], self.lengths[-1]),
+        )
+
+    def __len__(self) -> int:
+        return len(self.offsets)
+
+    def message(self, i: int) -> RrdMessage:
+        return RrdMessage(
+            self.offsets[i], self.lengths[i], self.headers[self.header_ids[i]]
+        )
+
+    def byte_ranges(
+        self, start: int | None = None, stop: int | None = None
+    ) -> list[tuple[int, int]]:
+        """
+        Returns merged `(offset, length)` byte ranges covering messages `start` to `stop`, with Python slice semantics.
+        """
+        ranges: list[tuple[int, int]] = []
+        for i in range(*slice(start, stop).indices(len(self))):
+            offset, length = self.offsets[i], self.lengths[i]
+            if ranges and ranges[-1][0] + ranges[-1][1] == offset:
+                ranges[-1] = (ranges[-1][0], ranges[-1][1] + length)
+            else:
+                ranges.append((offset, length))
+        return ranges
+
+    def iter_slice(
+        self,
+        start: int | None = None,
+        stop: int | None = None,
+        keep_prefix: int = 0,
+        chunk_size: int = 1024 * 1024,
+    ) -> Iterator[bytes]:
+        """
+        Yields a valid RRD stream holding only messages `start` to `stop`.
+
+        Parameters:
+            start: Index of the first message, negative values count from the end.
+            stop: Index after the last message, negative values count from the end.
+            keep_prefix: Number of messages from the start of the recording to always include. These usually hold the store info and blueprint.
+            chunk_size: Maximum number of bytes read from the file at once.
+        """
+        selected = range(*slice(start, stop).indices(len(self)))
+        prefix = range(min(keep_prefix, selected.start if selected else len(self)))
+        with open(self.path, "rb") as f:
+            header = None
+            for i in itertools.chain(prefix, selected):
+                if self.header_ids[i] != header:
+                    if header is not None:
+                        yield struct.pack("<Q", 0)
+                    header = self.header_ids[i]
+                    yield self.headers[header]
+                f.seek(self.offsets[i])
+                remaining = self.lengths[i]
+                while remaining:
+                    data = f.read(min(chunk_size, remaining))
+                    if not data:
+                        raise RrdFormatError(f"{self.path} shrank while reading")
+                    remaining -= len(data)
+                    yield data
+            if header is not None:
+                yield struct.pack("<Q", 0)
+
+    def _read_cached(self):
+        try:
+            with open(self.index_path, "rb") as f:
+                (
+                    magic,
+                    version,
+                    size,
+                    end,
+                    count,
+                    n_headers,
+                    mtime_ns,
+                    inode,
+                    first_hash,
+                    last_hash,
+                ) = _INDEX_HEADER.unpack(f.read(_INDEX_HEADER.size))
+                if magic != _INDEX_MAGIC or version != _INDEX_VERSION:
+                    return
+                headers = [f.read(FILE_HEADER_SIZE) for _ in range(n_headers)]
+                offsets, lengths, header_ids = array("Q"), array("Q"), array("I")
+                offsets.fromfile(f, count)
+                lengths.fromfile(f, count)
+                header_ids.fromfile(f, count)
+        except (FileNotFoundError, EOFError, struct.error):
+            return
+        self.headers = headers
+        self.offsets, self.lengths, self.header_ids = offsets, lengths, header_ids
+        self.indexed_size = size
+        self.end = end
+        self.mtime_ns = mtime_ns
+        self.inode = inode
+        self.first_hash = first_hash if count else b""
+        self.last_hash = last_hash if count else b""
+        # `update` checks that the file is still the one that was indexed.
+
+    def _write_cached(self):
+        tmp_path = self.index_path.with_name(self.index_path.name + ".tmp")
+        try:
+            with open(tmp_path, "wb") as f:
+                f.write(
+                    _INDEX_HEADER.pack(
+                        _INDEX_MAGIC,
+                        _INDEX_VERSION,
+                        self.indexed_size,
+                        self.end,
+                        len(self.offsets),
+                        len(self.headers),
+                        self.mtime_ns,
+                        self.inode,
+                        self.first_hash.ljust(32, b"\0"),
+                        self.last_hash.ljust(32, b"\0"),
+                    )
+                )
+                f.write(b"".join(self.headers))
+                self.offsets.tofile(f)
+                self.lengths.tofile(f)
+                self.header_ids.tofile(f)
+            os.replace(tmp_path, self.index_path)
+        except OSError:
+            # The directory may be read-only; the index is only an optimization.
+            tmp_path.unlink(missing_ok=True)
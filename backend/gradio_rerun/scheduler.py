@@ -0,0 +1,378 @@
+"""Share the bandwidth of the process fairly between the streams of all sessions."""
+
+from __future__ import annotations
+
+import asyncio
+import functools
+import inspect
+import threading
+import time
+from collections import deque
+from typing import Callable
+
+from .streaming import Producer, _current_session_hash
+
+
+class _Bucket:
+    """
+    A token bucket of bytes. Streams waiting for it take turns, one chunk each.
+    """
+
+    def __init__(self, rate: float, burst: float, now: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated_at = now
+        self.turns: deque[_Ticket] = deque()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def delay(self, nbytes: int, now: float) -> float:
+        """Seconds until a chunk of `nbytes` may be sent."""
+        self._refill(now)
+        # A chunk larger than the burst is sent once the bucket is full and leaves it in debt,
+        # so the rate still holds on average.
+        needed = min(nbytes, self.burst)
+        if self.tokens >= needed:
+            return 0.0
+        return (needed - self.tokens) / self.rate
+
+
+class _Ticket:
+    def __init__(self, session_hash: str | None):
+        self.session_hash = session_hash
+        # Index of the next bucket this ticket's current chunk has to pass.
+        self.stage = 0
+
+
+class StreamScheduler:
+    """
+    Limits the number of concurrent streams and the rate at which they send, per session and in total.
+
+    Without limits, every streaming producer forwards chunks as fast as it can, so a single
+    session with a large recording takes the bandwidth of every other stream in the process.
+    Producers decorated with `scheduled` instead ask the scheduler before each chunk:
+
+    - At most `max_streams` producers run at once. Further producers wait in a queue, first
+      come first served, before they are started.
+    - Every session may send at most `session_rate` bytes per second, and all sessions together
+      at most `global_rate`, enforced with token buckets that allow bursts of `burst` seconds.
+    - Streams that are waiting for the same bucket are served round-robin, one chunk at a time,
+      so a producer that yields large chunks quickly cannot starve the others.
+    """
+
+    def __init__(
+        self,
+        *,
+        max_streams: int | None = None,
+        max_waiting: int | None = None,
+        admission_timeout: float | None = None,
+        session_rate: float | None = None,
+        global_rate: float | None = None,
+        burst: float = 1.0,
+        poll_interval: float = 0.01,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """
+        Parameters:
+            max_streams: Maximum number of producers running at the same time. If None, every producer starts right away.
+            max_waiting: Maximum number of producers waiting to start. Further producers fail with a `gr.Error` telling the user to try again later. If None, the queue is unbounded.
+            admission_timeout: Maximum number of seconds a producer waits to start before it fails with a `gr.Error`. If None, it waits until a stream finishes.
+            session_rate: Maximum number of bytes per second sent by all streams of one session. If None, sessions are only limited by `global_rate`.
+            global_rate: Maximum number of bytes per second sent by all streams together. If None, there is no process-wide limit.
+            burst: Number of seconds of `session_rate` and `global_rate` that may be sent at once after a stream was idle.
+            poll_interval: Seconds between checks of async producers waiting for their turn. Synchronous producers are woken as soon as it is their turn.
+            clock: Monotonic clock used for the token buckets, in seconds.
+        """
+        for name, rate in (("session_rate", session_rate), ("global_rate", global_rate)):
+            if rate is not None and rate <= 0:
+                raise ValueError(f"{name} must be positive, got {rate!r}")
+        if max_streams is not None and max_streams < 1:
+            raise ValueError(f"max_streams must be at least 1, got {max_streams!r}")
+        if burst <= 0:
+            raise ValueError(f"burst must be positive, got {burst!r}")
+        self.max_streams = max_streams
+        self.max_waiting = max_waiting
+        self.admission_timeout = admission_timeout
+        self.session_rate = session_rate
+        self.global_rate = global_rate
+        self.burst = burst
+        self.poll_interval = poll_interval
+        self.clock = clock
+        self.admitted = 0
+        self.rejected = 0
+        self.bytes_sent = 0
+        self.admission_wait = 0.0
+        self.throttled = 0.0
+        self._active: set[_Ticket] = set()
+        self._waiting: deque[_Ticket] = deque()
+        self._global = (
+            None
+            if global_rate is None
+            else _Bucket(global_rate, global_rate * burst, clock())
+        )
+        self._sessions: dict[str, _Bucket] = {}
+        self._session_streams: dict[str, int] = {}
+        self._condition = threading.Condition()
+
+    def _buckets(self, ticket: _Ticket) -> list[_Bucket]:
+        buckets = []
+        if ticket.session_hash is not None and ticket.session_hash in self._sessions:
+            buckets.append(self._sessions[ticket.session_hash])
+        if self._global is not None:
+            buckets.append(self._global)
+        return buckets
+
+    def _enqueue(self, session_hash: str | None) -> _Ticket:
+        with self._condition:
+            if self.max_waiting is not None and (
+                len(self._waiting) >= self.max_waiting and not self._can_start()
+            ):
+                self.rejected += 1
+                raise self._busy_error()
+            ticket = _Ticket(session_hash)
+            self._waiting.append(ticket)
+            return ticket
+
+    def _can_start(self) -> bool:
+        return self.max_streams is None or len(self._active) < self.max_streams
+
+    def _busy_error(self) -> Exception:
+        from gradio.exceptions import Error
+
+        return Error("Too many streams are running. Please try again later.")
+
+    def _try_start(self, ticket: _Ticket) -> bool:
+        with self._condition:
+            if self._waiting[0] is not ticket or not self._can_start():
+                return False
+            self._waiting.popleft()
+            self._active.add(ticket)
+            self.admitted += 1
+            session_hash = ticket.session_hash
+            if session_hash is not None and self.session_rate is not None:
+                if session_hash not in self._sessions:
+                    self._sessions[session_hash] = _Bucket(
+                        self.session_rate, self.session_rate * self.burst, self.clock()
+                    )
+                self._session_streams[session_hash] = (
+                    self._session_streams.get(session_hash, 0) + 1
+                )
+            # The next producer in line may be able to start as well.
+            self._condition.notify_all()
+            return True
+
+    def _try_send(self, ticket: _Ticket, nbytes: int) -> float:
+        # Returns 0 once the chunk may be sent, otherwise the number of seconds to wait.
+        with self._condition:
+            buckets = self._buckets(ticket)
+            now = self.clock()
+            while ticket.stage < len(buckets):
+                bucket = buckets[ticket.stage]
+                if ticket not in bucket.turns:
+                    bucket.turns.append(ticket)
+                if bucket.turns[0] is not ticket:
+                    return self.poll_interval
+                delay = bucket.delay(nbytes, now)
+                if delay > 0:
+                    return delay
+                bucket.tokens -= nbytes
+                bucket.turns.popleft()
+                ticket.stage += 1
+                self._condition.notify_all()
+            ticket.stage = 0
+            self.bytes_sent += nbytes
+            return 0.0
+
+    def _finish(self, ticket: _Ticket):
+        with self._condition:
+            if ticket in self._active:
+                self._active.discard(ticket)
+                session_hash = ticket.session_hash
+                if session_hash in self._session_streams:
+                    self._session_streams[session_hash] -= 1
+                    if not self._session_streams[session_hash]:
+                        # The session's bucket would be full again by the time it streams next.
+                        del self._session_streams[session_hash]
+                        del self._sessions[session_hash]
+            else:
+                try:
+                    self._waiting.remove(ticket)
+                except ValueError:
+                    pass
+            for bucket in [self._global, *self._sessions.values()]:
+                if bucket is not None and ticket in bucket.turns:
+                    bucket.turns.remove(ticket)
+            self._condition.notify_all()
+
+    def _timed_out(self, ticket: _Ticket, deadline: float | None) -> Exception | None:
+        if deadline is None or self.clock() < deadline:
+            return None
+        with self._condition:
+            self.rejected += 1
+        self._finish(ticket)
+        return self._busy_error()
+
+    def admit(self, session_hash: str | None = None) -> _Ticket:
+        """
+        Blocks until a stream of `session_hash` may start and returns its ticket.
+
+        Pass the ticket to `send` before each chunk, and to `release` once the stream has ended.
+        Use the `scheduled` decorator instead to do all of this for a producer.
+        """
+        ticket = self._enqueue(session_hash)
+        started = self.clock()
+        deadline = (
+            None if self.admission_timeout is None else started + self.admission_timeout
+        )
+        try:
+            with self._condition:
+                while not self._try_start(ticket):
+                    error = self._timed_out(ticket, deadline)
+                    if error is not None:
+                        raise error
+                    self._condition.wait(
+                        None if deadline is None else max(0.0, deadline - self.clock())
+                    )
+                self.admission_wait += self.clock() - started
+        except BaseException:
+            self._finish(ticket)
+            raise
+        return ticket
+
+    async def async_admit(self, session_hash: str | None = None) -> _Ticket:
+        """
+        Like `admit`, but yields to the event loop instead of blocking the thread.
+        """
+        ticket = self._enqueue(session_hash)
+        started = self.clock()
+        deadline = (
+            None if self.admission_timeout is None else started + self.admission_timeout
+        )
+        try:
+            while not self._try_start(ticket):
+                error = self._timed_out(ticket, deadline)
+                if error is not None:
+                    raise error
+                await asyncio.sleep(self.poll_interval)
+            with self._condition:
+                self.admission_wait += self.clock() - started
+        except BaseException:
+            self._finish(ticket)
+            raise
+        return ticket
+
+    def send(self, ticket: _Ticket, nbytes: int):
+        """
+        Blocks until a chunk of `nbytes` may be sent on the stream of `ticket`.
+        """
+        started = None
+        with self._condition:
+            while True:
+                delay = self._try_send(ticket, nbytes)
+                if delay == 0:
+                    break
+                if started is None:
+                    started = self.clock()
+                self._condition.wait(delay)
+            if started is not None:
+                self.throttled += self.clock() - started
+
+    async def async_send(self, ticket: _Ticket, nbytes: int):
+        """
+        Like `send`, but yields to the event loop instead of blocking the thread.
+        """
+        started = None
+        while True:
+            delay = self._try_send(ticket, nbytes)
+            if delay == 0:
+                break
+            if started is None:
+                started = self.clock()
+            await asyncio.sleep(min(delay, self.poll_interval))
+        if started is not None:
+            with self._condition:
+                self.throttled += self.clock() - started
+
+    def release(self, ticket: _Ticket):
+        """
+        Ends the stream of `ticket`, letting the next waiting producer start.
+        """
+        self._finish(ticket)
+
+    def stats(self) -> dict[str, float]:
+        """
+        Returns the number of running and waiting streams, together with counters of admitted and rejected streams, bytes sent and seconds spent waiting.
+        """
+        with self._condition:
+            return {
+                "active": len(self._active),
+                "waiting": len(self._waiting),
+                "sessions": len({ticket.session_hash for ticket in self._active}),
+                "admitted": self.admitted,
+                "rejected": self.rejected,
+                "bytes_sent": self.bytes_sent,
+                "admission_wait_seconds": self.admission_wait,
+                "throttled_seconds": self.throttled,
+            }
+
+
+def _chunk_size(chunk) -> int:
+    return 0 if chunk is None else memoryview(chunk).nbytes
+
+
+def scheduled(scheduler: StreamScheduler) -> Callable[[Producer], Producer]:
+    """
+    Decorates a streaming producer so that it only starts, and only yields, when `scheduler` allows it.
+
+    The producer is not started until the scheduler admits it, and every chunk is held back
+    until the rate limits of the current session and of the process allow it to be sent.
+    Gradio runs synchronous producers on a worker thread, so only that producer is paused;
+    async producers wait without blocking the event loop. Share one scheduler between all
+    producers whose streams should be limited together:
+
+        scheduler = StreamScheduler(max_streams=8, session_rate=2_000_000, global_rate=20_000_000)
+
+        @scheduled(scheduler)
+        @rr.thread_local_stream("rerun_example_streaming_blur")
+        def streaming_repeated_blur(img):
+            ...
+
+    Apply it on top of decorators that change the chunks, such as `coalesce_chunks`, so the
+    limits apply to the bytes that are actually sent.
+
+    Parameters:
+        scheduler: The scheduler deciding when the producer may run and send.
+    """
+
+    def decorator(fn: Producer) -> Producer:
+        if inspect.isasyncgenfunction(fn):
+
+            @functools.wraps(fn)
+            async def wrapper(*args, **kwargs):
+                ticket = await scheduler.async_admit(_current_session_hash())
+                try:
+                    async for chunk in fn(*args, **kwargs):
+                        await scheduler.async_send(ticket, _chunk_size(chunk))
+                        yield chunk
+                finally:
+                    scheduler.release(ticket)
+
+        else:
+
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                ticket = scheduler.admit(_current_session_hash())
+                try:
+                    for chunk in fn(*args, **kwargs):
+                        scheduler.send(ticket, _chunk_size(chunk))
+                        yield chunk
+                finally:
+                    scheduler.release(ticket)
+
+        wrapper.stream_scheduler = scheduler  # type: ignore[attr-defined]
+        return wrapper
+
+    return decorator
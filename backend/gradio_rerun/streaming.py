@@ -0,0 +1,466 @@
+"""Helpers for producers that stream RRD chunks to a `Rerun` component."""
+
+from __future__ import annotations
+
+import asyncio
+import functools
+import inspect
+import logging
+import threading
+import time
+from typing import Any, AsyncIterator, Callable, Iterator, TypeVar
+
+Producer = TypeVar("Producer", Callable[..., Iterator[bytes]], Callable[..., AsyncIterator[bytes]])
+
+# Objects implementing the buffer protocol that are accepted as RRD data, e.g. a NumPy array too.
+Buffer = bytes | bytearray | memoryview
+
+logger = logging.getLogger(__name__)
+
+
+def is_buffer(value: Any) -> bool:
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return True
+    if isinstance(value, str):
+        return False
+    try:
+        memoryview(value)
+    except TypeError:
+        return False
+    return True
+
+
+def byte_view(value: Buffer) -> bytes | memoryview:
+    """
+    Returns `value` as `bytes` or a flat memoryview of unsigned bytes, copying only if its memory is not contiguous.
+
+    `len()` of the result is always the size in bytes.
+    """
+    if isinstance(value, bytes):
+        return value
+    view = memoryview(value)
+    if view.ndim == 1 and view.format == "B":
+        return view
+    if view.nbytes == 0:
+        # memoryview cannot cast views with a zero in their shape, e.g. an empty image.
+        return b""
+    if not view.c_contiguous:
+        return view.tobytes()
+    return view.cast("B")
+
+
+class CoalescingStats:
+    """
+    Counters describing how many chunks were merged by `coalesce_chunks`.
+    """
+
+    def __init__(self):
+        self.chunks_in = 0
+        self.chunks_out = 0
+        self.empty_skipped = 0
+        self._lock = threading.Lock()
+
+    @property
+    def merged(self) -> int:
+        """Number of non-empty chunks that were folded into another chunk."""
+        return self.chunks_in - self.empty_skipped - self.chunks_out
+
+    def _add(self, chunks_in: int, chunks_out: int, empty_skipped: int):
+        with self._lock:
+            self.chunks_in += chunks_in
+            self.chunks_out += chunks_out
+            self.empty_skipped += empty_skipped
+
+    def as_dict(self) -> dict[str, int]:
+        return {
+            "chunks_in": self.chunks_in,
+            "chunks_out": self.chunks_out,
+            "empty_skipped": self.empty_skipped,
+            "merged": self.merged,
+        }
+
+
+class ChunkCoalescer:
+    """
+    Buffers small RRD chunks and releases them once enough bytes or time have accumulated.
+
+    The first non-empty chunk is always released immediately so coalescing never delays the
+    first frame. Empty chunks are dropped. Chunks may be any buffer; buffers other than `bytes`
+    are copied when they are held back, since the producer may reuse them.
+    """
+
+    def __init__(
+        self,
+        min_bytes: int = 64 * 1024,
+        max_latency: float = 0.1,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """
+        Parameters:
+            min_bytes: Release buffered data once at least this many bytes are pending.
+            max_latency: Release buffered data once the oldest pending chunk is this many seconds old.
+            clock: Monotonic clock used to measure latency, in seconds.
+        """
+        self.min_bytes = min_bytes
+        self.max_latency = max_latency
+        self.clock = clock
+        self.chunks_in = 0
+        self.chunks_out = 0
+        self.empty_skipped = 0
+        self._pending: list[bytes] = []
+        self._pending_bytes = 0
+        self._pending_since = 0.0
+
+    def push(self, chunk: Buffer | None) -> Buffer | None:
+        """
+        Adds a chunk and returns the data that should be sent now, if any.
+        """
+        self.chunks_in += 1
+        if chunk is not None:
+            chunk = byte_view(chunk)
+        if chunk is None or len(chunk) == 0:
+            self.empty_skipped += 1
+            return self._flush_if_due()
+
+        if self.chunks_out == 0 and not self._pending:
+            self.chunks_out += 1
+            return chunk
+
+        if not self._pending:
+            self._pending_since = self.clock()
+        self._pending.append(chunk if isinstance(chunk, bytes) else bytes(chunk))
+        self._pending_bytes += len(chunk)
+        return self._flush_if_due()
+
+    def _flush_if_due(self) -> bytes | None:
+        if not self._pending:
+            return None
+        if (
+            self._pending_bytes >= self.min_bytes
+            or self.clock() - self._pending_since >= self.max_latency
+        ):
+            return self.flush()
+        return None
+
+    def flush(self) -> bytes | None:
+        """
+        Returns all pending data, or None if nothing is pending.
+        """
+        if not self._pending:
+            return None
+        data = (
+            self._pending[0] if len(self._pending) == 1 else b"".join(self._pending)
+        )
+        self._pending = []
+        self._pending_bytes = 0
+        self.chunks_out += 1
+        return data
+
+
+def coalesce_chunks(
+    min_bytes: int = 64 * 1024,
+    max_latency: float = 0.1,
+    stats: CoalescingStats | None = None,
+) -> Callable[[Producer], Producer]:
+    """
+    Decorates a streaming producer so that small reads from `rr.binary_stream()` are merged before
+    they reach the `Rerun` component.
+
+    Every value yielded to Gradio costs a queue message and an HTTP chunk, so a producer that
+    yields after each `rr.log` call spends most of its time on overhead. Wrapped producers skip
+    empty reads, send the first chunk right away, and afterwards only yield once `min_bytes` are
+    buffered or the oldest buffered read is `max_latency` seconds old. Any remaining data is
+    yielded when the producer finishes.
+
+    Both generator and async generator functions can be decorated. Apply it on top of
+    `@rr.thread_local_stream`:
+
+        @coalesce_chunks(min_bytes=256 * 1024)
+        @rr.thread_local_stream("my_app")
+        def producer(img):
+            ...
+
+    Parameters:
+        min_bytes: Yield buffered data once at least this many bytes are pending.
+        max_latency: Yield buffered data once the oldest pending read is this many seconds old. Checked whenever the producer yields.
+        stats: Counters to accumulate into. If None, a new `CoalescingStats` is created. Available as `.coalescing_stats` on the decorated function.
+    """
+    if stats is None:
+        stats = CoalescingStats()
+
+    def decorator(fn: Producer) -> Producer:
+        if inspect.isasyncgenfunction(fn):
+
+            @functools.wraps(fn)
+            async def wrapper(*args, **kwargs):
+                coalescer = ChunkCoalescer(min_bytes=min_bytes, max_latency=max_latency)
+                try:
+                    async for chunk in fn(*args, **kwargs):
+                        data = coalescer.push(chunk)
+                        if data is not None:
+                            yield data
+                    data = coalescer.flush()
+                    if data is not None:
+                        yield data
+                finally:
+                    stats._add(
+                        coalescer.chunks_in, coalescer.chunks_out, coalescer.empty_skipped
+                    )
+
+        else:
+
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                coalescer = ChunkCoalescer(min_bytes=min_bytes, max_latency=max_latency)
+                try:
+                    for chunk in fn(*args, **kwargs):
+                        data = coalescer.push(chunk)
+                        if data is not None:
+                            yield data
+                    data = coalescer.flush()
+                    if data is not None:
+                        yield data
+                finally:
+                    stats._add(
+                        coalescer.chunks_in, coalescer.chunks_out, coalescer.empty_skipped
+                    )
+
+        wrapper.coalescing_stats = stats  # type: ignore[attr-defined]
+        return wrapper
+
+    return decorator
+
+
+class LatestChunk(bytes):
+    """
+    A chunk that only carries the latest value of the entities identified by `key`.
+
+    When a `Rerun` component with `overflow="drop"` falls behind, queued chunks are discarded once
+    a newer chunk with the same key is queued. Chunks that are plain `bytes` are never dropped.
+    """
+
+    key: str
+
+    def __new__(cls, key: str, data: bytes):
+        chunk = super().__new__(cls, data)
+        chunk.key = key
+        return chunk
+
+
+def latest(key: str, data: bytes) -> LatestChunk:
+    """
+    Marks `data` as superseding any earlier, not yet sent chunk with the same `key`.
+
+    Use it for "latest value wins" entities such as a live camera image:
+
+        rr.log("image/blurred", rr.Image(blur))
+        yield latest("image/blurred", stream.read())
+    """
+    return LatestChunk(key, data)
+
+
+class StaticChunk(bytes):
+    """
+    A chunk holding data that stays valid for the whole stream, such as a blueprint or static entities.
+
+    Replay buffers keep static chunks for as long as the stream runs, so viewers that join late
+    still receive them.
+    """
+
+
+def static(data: bytes) -> StaticChunk:
+    """
+    Marks `data` as static, so it is replayed to every viewer that joins a running stream:
+
+        rr.log("world/mesh", mesh, static=True)
+        yield static(stream.read())
+    """
+    return StaticChunk(data)
+
+
+class SendBuffer:
+    """
+    Tracks the chunks Gradio has queued for one stream but not yet sent to the browser.
+    """
+
+    def __init__(self, pending: list, max_bytes: int, overflow: str = "block"):
+        """
+        Parameters:
+            pending: Gradio's queue of chunks for this stream. Chunks are popped from it as the browser consumes them.
+            max_bytes: Number of queued bytes above which the stream is considered backed up.
+            overflow: "block" to pause the producer while the stream is backed up (see `wait_for_capacity`), or "drop" to discard superseded `LatestChunk`s.
+        """
+        if overflow not in ("block", "drop"):
+            raise ValueError(f'overflow must be "block" or "drop", got {overflow!r}')
+        self.pending = pending
+        self.max_bytes = max_bytes
+        self.overflow = overflow
+        self.dropped_chunks = 0
+        self.dropped_bytes = 0
+        self._warned = False
+
+    def queued_bytes(self) -> int:
+        return sum(
+            memoryview(chunk).nbytes for chunk in list(self.pending) if chunk is not None
+        )
+
+    def has_capacity(self) -> bool:
+        return self.queued_bytes() < self.max_bytes
+
+    def admit(self, chunk: bytes | None):
+        """
+        Makes room for `chunk`, which is about to be queued, by dropping superseded chunks.
+
+        Nothing else stops a producer from queueing more than `max_bytes`: in blocking mode the
+        producer has to wait with `backpressure` or `wait_for_capacity`, and in dropping mode only
+        `LatestChunk`s can be discarded. A warning is logged the first time a chunk is queued
+        while the stream is still over budget.
+        """
+        if self.overflow == "drop":
+            self._drop_superseded(chunk)
+        if not self._warned and not self.has_capacity():
+            self._warned = True
+            logger.warning(
+                "More than %d bytes are queued for a slow viewer. %s",
+                self.max_bytes,
+                "Mark chunks that may be skipped with `latest`."
+                if self.overflow == "drop"
+                else "Decorate the producer with `backpressure` to pause it until the viewer catches up.",
+            )
+
+    def _drop_superseded(self, chunk: bytes | None):
+        size = 0 if chunk is None else memoryview(chunk).nbytes
+        if self.queued_bytes() + size <= self.max_bytes:
+            return
+
+        # Walk from newest to oldest so every key keeps only its most recent chunk.
+        seen = {chunk.key} if isinstance(chunk, LatestChunk) else set()
+        for queued in reversed(list(self.pending)):
+            if not isinstance(queued, LatestChunk):
+                continue
+            if queued.key not in seen:
+                seen.add(queued.key)
+                continue
+            try:
+                self.pending.remove(queued)
+            except ValueError:
+                # Already popped by the HTTP response.
+                continue
+            self.dropped_chunks += 1
+            self.dropped_bytes += len(queued)
+
+
+_send_buffers: dict[str, dict[str, SendBuffer]] = {}
+_send_buffers_lock = threading.Lock()
+
+
+def register_send_buffer(session_hash: str, stream_id: str, buffer: SendBuffer):
+    with _send_buffers_lock:
+        _send_buffers.setdefault(session_hash, {})[stream_id] = buffer
+
+
+def release_send_buffer(session_hash: str, stream_id: str):
+    with _send_buffers_lock:
+        buffers = _send_buffers.get(session_hash)
+        if buffers is None:
+            return
+        buffers.pop(stream_id, None)
+        if not buffers:
+            del _send_buffers[session_hash]
+
+
+def _current_session_hash() -> str | None:
+    from gradio.context import LocalContext
+
+    request = LocalContext.request.get()
+    return getattr(request, "session_hash", None)
+
+
+def wait_for_capacity(
+    session_hash: str | None = None,
+    poll_interval: float = 0.01,
+    timeout: float | None = None,
+) -> bool:
+    """
+    Blocks until no blocking-mode `Rerun` stream of the session has more than `max_buffer_bytes` queued.
+
+    Parameters:
+        session_hash: The session to wait for. If None, the session of the current Gradio event is used.
+        poll_interval: Seconds between checks of the queued byte counts.
+        timeout: Maximum number of seconds to wait. If None, waits until there is capacity.
+    Returns:
+        False if the timeout expired while a stream was still backed up, True otherwise.
+    """
+    if session_hash is None:
+        session_hash = _current_session_hash()
+        if session_hash is None:
+            return True
+    deadline = None if timeout is None else time.monotonic() + timeout
+    while not _has_capacity(session_hash):
+        if deadline is not None and time.monotonic() >= deadline:
+            return False
+        time.sleep(poll_interval)
+    return True
+
+
+async def async_wait_for_capacity(
+    session_hash: str | None = None,
+    poll_interval: float = 0.01,
+    timeout: float | None = None,
+) -> bool:
+    """
+    Like `wait_for_capacity`, but yields to the event loop instead of blocking the thread.
+    """
+    if session_hash is None:
+        session_hash = _current_session_hash()
+        if session_hash is None:
+            return True
+    deadline = None if timeout is None else time.monotonic() + timeout
+    while not _has_capacity(session_hash):
+        if deadline is not None and time.monotonic() >= deadline:
+            return False
+        await asyncio.sleep(poll_interval)
+    return True
+
+
+def _has_capacity(session_hash: str) -> bool:
+    with _send_buffers_lock:
+        buffers = list(_send_buffers.get(session_hash, {}).values())
+    return all(b.has_capacity() for b in buffers if b.overflow == "block")
+
+
+def backpressure(
+    poll_interval: float = 0.01,
+) -> Callable[[Producer], Producer]:
+    """
+    Decorates a streaming producer so it pauses while the viewer is behind.
+
+    Before resuming the producer, the wrapper waits until every `Rerun(overflow="block")` stream
+    of the current session has fewer than `max_buffer_bytes` queued. Gradio runs synchronous
+    producers on a worker thread, so only that producer is paused; async producers wait without
+    blocking the event loop.
+
+    Parameters:
+        poll_interval: Seconds between checks of the queued byte counts.
+    """
+
+    def decorator(fn: Producer) -> Producer:
+        if inspect.isasyncgenfunction(fn):
+
+            @functools.wraps(fn)
+            async def wrapper(*args, **kwargs):
+                async for chunk in fn(*args, **kwargs):
+                    yield chunk
+                    await async_wait_for_capacity(poll_interval=poll_interval)
+
+        else:
+
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                for chunk in fn(*args, **kwargs):
+                    yield chunk
+                    wait_for_capacity(poll_interval=poll_interval)
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,123 @@
+"""Follow RRD files that are still being written."""
+
+from __future__ import annotations
+
+import asyncio
+import time
+from pathlib import Path
+from typing import AsyncIterator, BinaryIO, Callable, Iterator
+
+
+def _done_check(done: Path | str | Callable[[], bool] | None) -> Callable[[], bool]:
+    if done is None:
+        return lambda: False
+    if callable(done):
+        return done
+    marker = Path(done)
+    return marker.exists
+
+
+class _Follower:
+    def __init__(self, path, idle_timeout, done, chunk_size):
+        self.path = Path(path)
+        self.idle_timeout = idle_timeout
+        self.is_done = _done_check(done)
+        self.chunk_size = chunk_size
+        self.last_data = time.monotonic()
+        self.file: BinaryIO | None = None
+
+    def step(self) -> bytes | None:
+        """
+        Returns the next appended bytes, b"" if the caller should wait and poll again, or None once following should stop.
+        """
+        # Check for completion before reading so bytes written just before the marker are not missed.
+        finished = self.is_done()
+        if self.file is None:
+            try:
+                self.file = open(self.path, "rb")
+            except FileNotFoundError:
+                pass
+        if self.file is not None:
+            data = self.file.read(self.chunk_size)
+            if data:
+                self.last_data = time.monotonic()
+                return data
+        if finished:
+            return None
+        if (
+            self.idle_timeout is not None
+            and time.monotonic() - self.last_data >= self.idle_timeout
+        ):
+            return None
+        return b""
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+
+
+def follow_rrd(
+    path: Path | str,
+    *,
+    poll_interval: float = 0.1,
+    idle_timeout: float | None = 10.0,
+    done: Path | str | Callable[[], bool] | None = None,
+    chunk_size: int = 1024 * 1024,
+) -> Iterator[bytes]:
+    """
+    Yields the contents of an RRD file as it grows, for use in a streaming `Rerun` producer.
+
+    Tools that write RRDs incrementally (e.g. via `rr.save`) can be shown live by yielding
+    from this generator instead of returning the path once the tool has finished:
+
+        def run_tool(args):
+            proc = subprocess.Popen(["my_tool", "--out", "out.rrd", *args])
+            yield from follow_rrd("out.rrd", done=lambda: proc.poll() is not None)
+
+    The file is polled for new data every `poll_interval` seconds. Following stops once `done`
+    signals completion and everything written so far has been yielded, or once no new data has
+    arrived for `idle_timeout` seconds. The file does not need to exist yet when following starts.
+
+    Returning the path of a growing file from a regular event handler does not follow it:
+    Gradio only streams the output of generator functions, so a returned path is sent to the
+    viewer once, as it is at that moment. Yield from `follow_rrd` in a streaming producer instead.
+
+    Parameters:
+        path: The RRD file to follow.
+        poll_interval: Seconds to wait between checks for new data.
+        idle_timeout: Stop after this many seconds without new data. If None, only `done` stops following.
+        done: A marker file whose existence signals the writer has finished, or a callable returning True once it has.
+        chunk_size: Maximum number of bytes yielded at once.
+    """
+    follower = _Follower(path, idle_timeout, done, chunk_size)
+    try:
+        while (data := follower.step()) is not None:
+            if data:
+                yield data
+            else:
+                time.sleep(poll_interval)
+    finally:
+        follower.close()
+
+
+async def async_follow_rrd(
+    path: Path | str,
+    *,
+    poll_interval: float = 0.1,
+    idle_timeout: float | None = 10.0,
+    done: Path | str | Callable[[], bool] | None = None,
+    chunk_size: int = 1024 * 1024,
+) -> AsyncIterator[bytes]:
+    """
+    Like `follow_rrd`, but for async producers. File reads run on the event loop's default executor.
+    """
+    loop = asyncio.get_running_loop()
+    follower = _Follower(path, idle_timeout, done, chunk_size)
+    try:
+        while (data := await loop.run_in_executor(None, follower.step)) is not None:
+            if data:
+                yield data
+            else:
+                await asyncio.sleep(poll_interval)
+    finally:
+        follower.close()
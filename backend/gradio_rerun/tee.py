@@ -0,0 +1,434 @@
+"""Persist live streams to RRD files on disk so they can be replayed without rerunning the producer."""
+
+from __future__ import annotations
+
+import logging
+import os
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import BinaryIO, Literal
+
+from .streaming import Buffer, StaticChunk, byte_view
+
+logger = logging.getLogger(__name__)
+
+# Queued in place of a chunk to stop teeing a stream whose chunks could not be queued.
+_DROP = object()
+
+@dataclass
+class TeeRecording:
+    """
+    The files a teed stream was written to.
+    """
+
+    stream_id: str
+    """The Gradio stream ID, "session/run/component"."""
+    paths: list[Path] = field(default_factory=list)
+    """The segments of the recording, in order. Each one is a valid RRD file on its own."""
+    bytes: int = 0
+    started_at: float = field(default_factory=time.time)
+    finished_at: float | None = None
+    error: str | None = None
+    """Set if writing failed. The recording then ends at the last chunk that was written."""
+
+    @property
+    def session_hash(self) -> str:
+        return self.stream_id.split("/")[0]
+
+    @property
+    def finished(self) -> bool:
+        return self.finished_at is not None
+
+
+class _TeeStream:
+    def __init__(self, recording: TeeRecording):
+        self.recording = recording
+        self.file: BinaryIO | None = None
+        self.segment_bytes = 0
+        self.segment_started = 0.0
+        self.last_fsync = time.monotonic()
+        # The first chunk holds the stream header and store info; together with the static
+        # chunks it is repeated at the start of every segment.
+        self.preamble: list[bytes] = []
+
+
+class RrdTee:
+    """
+    Writes a copy of every chunk of a streaming `Rerun` component to RRD files on disk.
+
+    Chunks are handed to a background thread, so the stream is not slowed down by disk writes
+    unless more than `max_queue_bytes` are waiting to be written. Once a stream has ended, its
+    recording can be returned to any `Rerun` component like a regular file, which replays it
+    without running the producer again:
+
+        tee = RrdTee()
+        live = Rerun(streaming=True, tee=tee)
+        replay = Rerun()
+
+        def replay_last(request: gr.Request):
+            return tee.recordings(request.session_hash)[-1].paths
+
+    A recording can be split into segments by size or age. Each segment starts with the first
+    chunk of the stream and every `StaticChunk` seen so far, so every segment is a valid RRD
+    file on its own.
+
+    `write` never waits for the disk, since it is called from Gradio's event loop. If more
+    than `max_queue_bytes` are waiting to be written, the stream that overflows the queue stops
+    being teed, its recording is marked with an error, and a warning is logged; the live stream
+    is unaffected. Finished recordings are deleted once they are older than `max_age`, and the
+    oldest ones once all recordings together take more than `max_bytes`. Recordings left in
+    the directory by a previous process are picked up and expire the same way.
+    """
+
+    def __init__(
+        self,
+        directory: str | Path | None = None,
+        *,
+        max_segment_bytes: int | None = None,
+        max_segment_seconds: float | None = None,
+        fsync: Literal["never", "segment", "always"] | float = "segment",
+        buffer_size: int = 1024 * 1024,
+        max_queue_bytes: int = 64 * 1024 * 1024,
+        max_age: float | None = 3600.0,
+        max_bytes: int | None = 1024**3,
+    ):
+        """
+        Parameters:
+            directory: Where recordings are written. Created if it does not exist. If None, a subdirectory of the Gradio cache is used.
+            max_segment_bytes: Start a new segment once this many bytes have been written to the current one, not counting the repeated preamble. If None, segments are not split by size.
+            max_segment_seconds: Start a new segment once the current one is this many seconds old. If None, segments are not split by age.
+            fsync: When written data is forced to disk: "never" leaves it to the operating system, "segment" syncs each segment when it is closed, "always" syncs after every write, and a number syncs at most once per that many seconds.
+            buffer_size: Size of the write buffer of each open segment in bytes.
+            max_queue_bytes: Maximum number of bytes waiting to be written. A stream whose chunk does not fit stops being teed.
+            max_age: Seconds after which a finished recording is deleted. If None, recordings are kept until `max_bytes` is exceeded.
+            max_bytes: Maximum total size of all recordings in bytes. The oldest finished recordings are deleted first, then the oldest closed segments of recordings that are still being written. If None, the size is unbounded.
+        """
+        if isinstance(fsync, str) and fsync not in ("never", "segment", "always"):
+            raise ValueError(
+                f'fsync must be "never", "segment", "always" or a number, got {fsync!r}'
+            )
+        if directory is None:
+            from gradio.utils import get_upload_folder
+
+            directory = Path(get_upload_folder()) / "rrd_tee"
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_segment_bytes = max_segment_bytes
+        self.max_segment_seconds = max_segment_seconds
+        self.fsync = fsync
+        self.buffer_size = buffer_size
+        self.max_queue_bytes = max_queue_bytes
+        self.max_age = max_age
+        self.max_bytes = max_bytes
+        self.dropped_streams = 0
+        self.deleted_files = 0
+        self.deleted_bytes = 0
+        self._queue: deque[tuple[str, Buffer | object | None]] = deque()
+        self._queued_bytes = 0
+        self._busy = False
+        self._condition = threading.Condition()
+        self._streams: dict[str, _TeeStream] = {}
+        self._failed: set[str] = set()
+        # Streams dropped by `write`, whose chunks are ignored until they end.
+        self._dropped: set[str] = set()
+        self._recordings: list[TeeRecording] = []
+        self._writer: threading.Thread | None = None
+        self._closed = False
+        self._last_prune = 0.0
+        self._load()
+
+    def _load(self):
+        # Segments are named "<session>-<run>-<component>[-<n>].rrd".
+        leftovers: dict[str, list[Path]] = {}
+        for path in sorted(self.directory.glob("*.rrd")):
+            parts = path.stem.split("-")
+            stream_id = "/".join(parts[:3]) if len(parts) >= 3 else path.stem
+            leftovers.setdefault(stream_id, []).append(path)
+        for stream_id, paths in leftovers.items():
+            try:
+                stats = [path.stat() for path in paths]
+            except FileNotFoundError:
+                continue
+            finished_at = max(stat.st_mtime for stat in stats)
+            self._recordings.append(
+                TeeRecording(
+                    stream_id,
+                    paths=paths,
+                    bytes=sum(stat.st_size for stat in stats),
+                    started_at=min(stat.st_mtime for stat in stats),
+                    finished_at=finished_at,
+                )
+            )
+        self._recordings.sort(key=lambda recording: recording.started_at)
+
+    def write(self, stream_id: str, chunk: Buffer | None):
+        """
+        Queues a chunk of the stream `stream_id` for writing. None ends the stream.
+
+        Never blocks. If the chunk does not fit into `max_queue_bytes`, the rest of the stream
+        is not teed.
+        """
+        size = 0 if chunk is None else memoryview(chunk).nbytes
+        with self._condition:
+            if self._closed:
+                raise RuntimeError("RrdTee has been closed")
+            if stream_id in self._dropped:
+                if chunk is None:
+                    self._dropped.discard(stream_id)
+                    self._queue.append((stream_id, None))
+                    self._condition.notify_all()
+                return
+            if self._queue and self._queued_bytes + size > self.max_queue_bytes:
+                self._dropped.add(stream_id)
+                self.dropped_streams += 1
+                self._queue.append((stream_id, _DROP))
+                self._condition.notify_all()
+                logger.warning(
+                    "Stopped teeing stream %s: more than %d bytes are waiting to be written to %s",
+                    stream_id,
+                    self.max_queue_bytes,
+                    self.directory,
+                )
+                return
+            self._queue.append((stream_id, chunk))
+            self._queued_bytes += size
+            if self._writer is None:
+                self._writer = threading.Thread(
+                    target=self._run, name="gradio_rerun-tee", daemon=True
+                )
+                self._writer.start()
+            self._condition.notify_all()
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._queue and not self._closed:
+                    self._condition.wait()
+                if not self._queue:
+                    return
+                stream_id, chunk = self._queue.popleft()
+                self._busy = True
+            try:
+                if chunk is _DROP:
+                    self._fail(stream_id, "the disk could not keep up with the stream")
+                elif stream_id not in self._failed:
+                    self._write(stream_id, chunk)
+                elif chunk is None:
+                    self._failed.discard(stream_id)
+            except OSError as e:
+                self._fail(stream_id, str(e))
+            finally:
+                with self._condition:
+                    if chunk is not None and chunk is not _DROP:
+                        self._queued_bytes -= memoryview(chunk).nbytes
+                    self._busy = False
+                    self._condition.notify_all()
+            if chunk is None or time.monotonic() - self._last_prune >= 1.0:
+                self._last_prune = time.monotonic()
+                self.prune()
+
+    def _write(self, stream_id: str, chunk: Buffer | None):
+        stream = self._streams.get(stream_id)
+        if chunk is None:
+            if stream is not None:
+                del self._streams[stream_id]
+                self._close_segment(stream)
+                stream.recording.finished_at = time.time()
+            return
+        if stream is None:
+            recording = TeeRecording(stream_id)
+            with self._condition:
+                self._recordings.append(recording)
+            stream = self._streams[stream_id] = _TeeStream(recording)
+        data = byte_view(chunk)
+        first = not stream.preamble
+        if first or isinstance(chunk, StaticChunk):
+            stream.preamble.append(bytes(data))
+        if stream.file is not None and self._should_rotate(stream):
+            self._close_segment(stream)
+        if stream.file is None:
+            self._open_segment(stream)
+            if not first:
+                # Later segments start with the preamble, which already ends with this chunk
+                # if it is static.
+                for part in stream.preamble:
+                    self._append(stream, part)
+                # Only new data counts towards the size of a segment.
+                stream.segment_bytes = 0
+                if isinstance(chunk, StaticChunk):
+                    data = b""
+        if data:
+            self._append(stream, data)
+        self._sync(stream, segment_closed=False)
+
+    def _fail(self, stream_id: str, error: str):
+        # Stop teeing this stream, e.g. because the disk is full; the live stream is unaffected.
+        self._failed.add(stream_id)
+        stream = self._streams.pop(stream_id, None)
+        if stream is None:
+            return
+        stream.recording.error = error
+        stream.recording.finished_at = time.time()
+        if stream.file is not None:
+            try:
+                stream.file.close()
+            except OSError:
+                pass
+            stream.file = None
+
+    def _should_rotate(self, stream: _TeeStream) -> bool:
+        if (
+            self.max_segment_bytes is not None
+            and stream.segment_bytes >= self.max_segment_bytes
+        ):
+            return True
+        return (
+            self.max_segment_seconds is not None
+            and time.monotonic() - stream.segment_started >= self.max_segment_seconds
+        )
+
+    def _open_segment(self, stream: _TeeStream):
+        recording = stream.recording
+        name = recording.stream_id.replace("/", "-")
+        if recording.paths:
+            name = f"{name}-{len(recording.paths):03d}"
+        path = self.directory / f"{name}.rrd"
+        stream.file = open(path, "wb", buffering=self.buffer_size)
+        stream.segment_bytes = 0
+        stream.segment_started = time.monotonic()
+        recording.paths.append(path)
+
+    def _append(self, stream: _TeeStream, data: bytes | memoryview):
+        assert stream.file is not None
+        written = stream.file.write(data)
+        stream.segment_bytes += written
+        stream.recording.bytes += written
+
+    def _sync(self, stream: _TeeStream, segment_closed: bool):
+        assert stream.file is not None
+        if self.fsync == "never":
+            return
+        if self.fsync == "segment":
+            if not segment_closed:
+                return
+        elif self.fsync != "always":
+            now = time.monotonic()
+            if not segment_closed and now - stream.last_fsync < self.fsync:
+                return
+            stream.last_fsync = now
+        stream.file.flush()
+        os.fsync(stream.file.fileno())
+
+    def _close_segment(self, stream: _TeeStream):
+        if stream.file is None:
+            return
+        try:
+            self._sync(stream, segment_closed=True)
+        finally:
+            stream.file.close()
+            stream.file = None
+
+    def prune(self, now: float | None = None) -> int:
+        """
+        Deletes recordings older than `max_age` and the oldest ones beyond `max_bytes`.
+
+        Runs on the writer thread after every stream ends and at most once per second otherwise.
+
+        Returns:
+            The number of files deleted.
+        """
+        now = time.time() if now is None else now
+        with self._condition:
+            recordings = list(self._recordings)
+        total = sum(recording.bytes for recording in recordings)
+        doomed: list[Path] = []
+        expired: list[TeeRecording] = []
+        for recording in recordings:
+            if not recording.finished:
+                continue
+            too_old = (
+                self.max_age is not None and now - recording.finished_at > self.max_age
+            )
+            if too_old or (self.max_bytes is not None and total > self.max_bytes):
+                expired.append(recording)
+                doomed.extend(recording.paths)
+                total -= recording.bytes
+        if self.max_bytes is not None and total > self.max_bytes:
+            # Recordings that are still being written lose their oldest closed segments; each
+            # remaining segment is still a valid recording on its own.
+            for recording in recordings:
+                while (
+                    total > self.max_bytes
+                    and not recording.finished
+                    and len(recording.paths) > 1
+                ):
+                    path = recording.paths.pop(0)
+                    try:
+                        size = path.stat().st_size
+                    except FileNotFoundError:
+                        size = 0
+                    recording.bytes -= size
+                    total -= size
+                    doomed.append(path)
+        with self._condition:
+            self._recordings = [
+                recording
+                for recording in self._recordings
+                if not any(recording is e for e in expired)
+            ]
+        removed = 0
+        for path in doomed:
+            try:
+                size = path.stat().st_size
+                path.unlink()
+            except FileNotFoundError:
+                continue
+            removed += 1
+            self.deleted_files += 1
+            self.deleted_bytes += size
+        return removed
+
+    def recordings(
+        self, session_hash: str | None = None, *, finished: bool = True
+    ) -> list[TeeRecording]:
+        """
+        Returns the recordings written so far, oldest first.
+
+        Parameters:
+            session_hash: Only return the recordings of this Gradio session. If None, recordings of all sessions are returned.
+            finished: If True, only return recordings whose stream has ended.
+        """
+        with self._condition:
+            recordings = list(self._recordings)
+        return [
+            recording
+            for recording in recordings
+            if (session_hash is None or recording.session_hash == session_hash)
+            and (recording.finished or not finished)
+        ]
+
+    def flush(self, timeout: float | None = None) -> bool:
+        """
+        Waits until every queued chunk has been written. Returns False if `timeout` expired first.
+        """
+        with self._condition:
+            return self._condition.wait_for(
+                lambda: not self._queue and not self._busy, timeout
+            )
+
+    def close(self):
+        """
+        Writes the remaining chunks and closes every open segment. Streams that have not ended are left unfinished.
+        """
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+            writer = self._writer
+        if writer is not None:
+            writer.join()
+        for stream in list(self._streams.values()):
+            self._close_segment(stream)
+        self._streams.clear()
@@ -0,0 +1,307 @@
+"""Managed temporary RRD files that are removed once they have been delivered to the viewer."""
+
+from __future__ import annotations
+
+import itertools
+import os
+import threading
+import time
+import uuid
+import weakref
+from dataclasses import dataclass
+from pathlib import Path
+
+
+@dataclass
+class _TempFile:
+    created_at: float
+    refs: int = 1
+    released_at: float | None = None
+
+
+class TempRrdManager:
+    """
+    Allocates temporary RRD files and removes them once nothing needs them anymore.
+
+    Every file returned by `allocate()` starts with one reference, which is released when a
+    `Rerun` component delivers the file to the viewer. Gradio copies the file into its own
+    cache while sending it, so released files are removed after a short `grace` period. Call
+    `acquire()` before returning the same file more than once, and `release()` for a file that
+    ends up not being returned. Files that a `Rerun(incremental=True)` component serves in
+    place are kept for `grace` seconds after they were last returned.
+
+    A background thread sweeps the directory every `sweep_interval` seconds. Besides released
+    files it removes files older than `max_age`, which covers sessions that died before their
+    file was delivered, and evicts the oldest files whenever the directory holds more than
+    `max_bytes`. Files left behind by a previous process are swept as if they had been released.
+    """
+
+    def __init__(
+        self,
+        directory: str | Path | None = None,
+        *,
+        max_age: float | None = 600.0,
+        max_bytes: int | None = 1024**3,
+        grace: float = 30.0,
+        sweep_interval: float = 10.0,
+    ):
+        """
+        Parameters:
+            directory: Where temporary files are created. Created if it does not exist. If None, a subdirectory of the Gradio cache is used.
+            max_age: Seconds after which a file is removed even if it is still referenced. If None, referenced files are only removed to stay within `max_bytes`.
+            max_bytes: Maximum total size of the temporary files in bytes. If None, the size is unbounded.
+            grace: Seconds a released file is kept so that Gradio can finish copying it.
+            sweep_interval: Seconds between two sweeps of the background thread.
+        """
+        if directory is None:
+            from gradio.utils import get_upload_folder
+
+            directory = Path(get_upload_folder()) / "rrd_temp"
+        self.directory = Path(directory)
+        self.max_age = max_age
+        self.max_bytes = max_bytes
+        self.grace = grace
+        self.sweep_interval = sweep_interval
+        self.removed_files = 0
+        self.removed_bytes = 0
+        self._files: dict[Path, _TempFile] = {}
+        self._lock = threading.Lock()
+        self._counter = itertools.count()
+        self._stop = threading.Event()
+        self._sweeper: threading.Thread | None = None
+        self._load()
+        _managers.add(self)
+
+    def _load(self):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        for path in self.directory.glob("*.rrd"):
+            try:
+                mtime = path.stat().st_mtime
+            except FileNotFoundError:
+                continue
+            self._files[path.resolve()] = _TempFile(
+                created_at=mtime, refs=0, released_at=mtime
+            )
+
+    def allocate(self, prefix: str = "", suffix: str = ".rrd") -> Path:
+        """
+        Returns the path of a new, empty temporary file holding one reference.
+        """
+        name = f"{prefix}{uuid.uuid4().hex}-{next(self._counter)}{suffix}"
+        path = (self.directory / name).resolve()
+        path.touch(exist_ok=False)
+        with self._lock:
+            self._files[path] = _TempFile(created_at=time.time())
+        self._start_sweeper()
+        return path
+
+    def acquire(self, path: str | Path):
+        """
+        Adds a reference to a managed file, e.g. before returning it to a second viewer.
+        """
+        with self._lock:
+            entry = self._files.get(Path(path).resolve())
+            if entry is None:
+                raise KeyError(f"{path} is not managed by this TempRrdManager")
+            entry.refs += 1
+            entry.released_at = None
+
+    def release(self, path: str | Path) -> bool:
+        """
+        Drops a reference to a managed file. Returns False if the file is not managed by this manager.
+        """
+        with self._lock:
+            entry = self._files.get(Path(path).resolve())
+            if entry is None:
+                return False
+            if entry.refs > 0:
+                entry.refs -= 1
+                if entry.refs == 0:
+                    entry.released_at = time.time()
+            return True
+
+    def _delivered(self, path: str | Path) -> bool:
+        # Like `release`, but a file that is delivered again after it was released, e.g. a
+        # growing file served in place on every tick, restarts its grace period.
+        with self._lock:
+            entry = self._files.get(Path(path).resolve())
+            if entry is None:
+                return False
+            if entry.refs > 0:
+                entry.refs -= 1
+            if entry.refs == 0:
+                entry.released_at = time.time()
+            return True
+
+    def __contains__(self, path: str | Path) -> bool:
+        return Path(path).resolve() in self._files
+
+    def __len__(self) -> int:
+        return len(self._files)
+
+    def sweep(self, now: float | None = None) -> int:
+        """
+        Removes expired files and evicts the oldest ones until the directory is within budget.
+
+        Returns:
+            The number of files removed.
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            expired = [
+                path
+                for path, entry in self._files.items()
+                if (
+                    entry.released_at is not None
+                    and now - entry.released_at >= self.grace
+                )
+                or (self.max_age is not None and now - entry.created_at >= self.max_age)
+            ]
+            removed = sum(self._remove(path) for path in expired)
+            if self.max_bytes is not None:
+                sizes = {path: _size(path) for path in self._files}
+                total = sum(sizes.values())
+                # Released files go first, then the oldest referenced ones. Files created
+                # within the grace period may still be being written, so they are kept.
+                candidates = sorted(
+                    (
+                        path
+                        for path, entry in self._files.items()
+                        if entry.refs == 0 or now - entry.created_at >= self.grace
+                    ),
+                    key=lambda path: (
+                        self._files[path].refs > 0,
+                        self._files[path].created_at,
+                    ),
+                )
+                for path in candidates:
+                    if total <= self.max_bytes:
+                        break
+                    total -= sizes[path]
+                    removed += self._remove(path)
+        return removed
+
+    def _remove(self, path: Path) -> int:
+        del self._files[path]
+        size = _size(path)
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            return 0
+        # The message index written next to the file when it was sliced or streamed aligned.
+        path.with_name(path.name + ".idx").unlink(missing_ok=True)
+        self.removed_files += 1
+        self.removed_bytes += size
+        return 1
+
+    def _start_sweeper(self):
+        with self._lock:
+            if self._sweeper is not None or self._stop.is_set():
+                return
+            self._sweeper = threading.Thread(
+                target=_sweep_loop,
+                args=(weakref.ref(self), self._stop, self.sweep_interval),
+                name="gradio_rerun-tempfiles",
+                daemon=True,
+            )
+            self._sweeper.start()
+
+    def close(self):
+        """
+        Stops the background thread and removes every managed file.
+        """
+        self._stop.set()
+        with self._lock:
+            for path in list(self._files):
+                self._remove(path)
+
+    @property
+    def size_bytes(self) -> int:
+        with self._lock:
+            return sum(_size(path) for path in self._files)
+
+    def stats(self) -> dict[str, int]:
+        """
+        Returns the number of managed and referenced files, their size, and the removal counters.
+        """
+        with self._lock:
+            referenced = sum(1 for entry in self._files.values() if entry.refs > 0)
+        return {
+            "files": len(self._files),
+            "referenced": referenced,
+            "bytes": self.size_bytes,
+            "removed_files": self.removed_files,
+            "removed_bytes": self.removed_bytes,
+        }
+
+
+def _size(path: Path) -> int:
+    try:
+        return path.stat().st_size
+    except FileNotFoundError:
+        return 0
+
+
+def _sweep_loop(
+    manager_ref: weakref.ref[TempRrdManager], stop: threading.Event, interval: float
+):
+    # Holds only a weak reference so that an unused manager can still be collected.
+    while not stop.wait(interval):
+        manager = manager_ref()
+        if manager is None:
+            return
+        manager.sweep()
+        del manager
+
+
+_managers: weakref.WeakSet[TempRrdManager] = weakref.WeakSet()
+_default_manager: TempRrdManager | None = None
+_default_manager_lock = threading.Lock()
+
+
+def _get_default_manager() -> TempRrdManager:
+    global _default_manager
+    with _default_manager_lock:
+        if _default_manager is None:
+            _default_manager = TempRrdManager()
+        return _default_manager
+
+
+def temp_rrd(prefix: str = "", suffix: str = ".rrd") -> Path:
+    """
+    Returns the path of a new temporary RRD file that is removed after it has been sent to the viewer.
+
+    Write the recording to the path, e.g. with `rr.save`, and return the path from the event
+    handler. There is no need to track or clean up the file:
+
+        def create_rrd():
+            path = temp_rrd(prefix="cube_")
+            rr.save(path)
+            return path
+
+    Files are allocated from a process-wide `TempRrdManager` with the default budgets. Create
+    a manager and call its `allocate()` to use other limits.
+    """
+    return _get_default_manager().allocate(prefix, suffix)
+
+
+def _mark_delivered(path: str | Path) -> bool:
+    """
+    Releases the allocation reference of a managed file that has been handed to Gradio.
+    """
+    if not _managers:
+        return False
+    for manager in list(_managers):
+        if manager._delivered(path):
+            return True
+    return False
+
+
+def _managed_directory(path: str | Path) -> Path | None:
+    """
+    Returns the directory of the manager that allocated `path`, or None if it is not managed.
+    """
+    for manager in list(_managers):
+        if path in manager:
+            return manager.directory
+    return None
@@ -0,0 +1,82 @@
+import os
+
+import numpy as np
+
+from gradio_rerun.cache import RrdCache
+
+
+def test_identical_blobs_are_stored_once(tmp_path):
+    cache = RrdCache(tmp_path)
+
+    first = cache.put(b"data")
+    second = cache.put(bytearray(b"data"))
+
+    assert first == second
+    assert len(cache) == 1
+    assert open(first, "rb").read() == b"data"
+
+
+def test_numpy_arrays_are_stored_by_content(tmp_path):
+    cache = RrdCache(tmp_path)
+    image = np.arange(12, dtype=np.uint8).reshape(3, 4)
+
+    path = cache.put(image)
+
+    assert open(path, "rb").read() == image.tobytes()
+    assert cache.put(image.tobytes()) == path
+    assert cache.size_bytes == image.nbytes
+
+
+def test_least_recently_used_entries_are_evicted_by_size(tmp_path):
+    cache = RrdCache(tmp_path, max_bytes=25, max_entries=None)
+    a = cache.put(b"a" * 10, key="a")
+    cache.put(b"b" * 10, key="b")
+    assert cache.get("a") == a
+
+    cache.put(b"c" * 10, key="c")
+
+    assert "a" in cache and "c" in cache
+    assert "b" not in cache
+    assert not cache.path_for("b").exists()
+    assert cache.size_bytes == 20
+    assert cache.stats()["evictions"] == 1
+
+
+def test_entries_are_evicted_by_count(tmp_path):
+    cache = RrdCache(tmp_path, max_bytes=None, max_entries=2)
+    for key in "abc":
+        cache.put(key.encode(), key=key)
+
+    assert sorted(p.stem for p in tmp_path.glob("*.rrd")) == ["b", "c"]
+    assert len(cache) == 2
+
+
+def test_an_entry_larger_than_the_budget_is_kept(tmp_path):
+    cache = RrdCache(tmp_path, max_bytes=10)
+    cache.put(b"a" * 5, key="a")
+
+    path = cache.put(b"b" * 100, key="b")
+
+    assert os.path.exists(path)
+    assert list(cache._entries) == ["b"]
+
+
+def test_budget_holds_across_restarts(tmp_path):
+    cache = RrdCache(tmp_path, max_bytes=None, max_entries=None)
+    for i, key in enumerate("abc"):
+        path = cache.put(key.encode() * 10, key=key)
+        os.utime(path, (1000 + i, 1000 + i))
+
+    reopened = RrdCache(tmp_path, max_bytes=20)
+
+    assert list(reopened._entries) == ["b", "c"]
+    assert not reopened.path_for("a").exists()
+
+
+def test_files_removed_behind_the_cache_are_misses(tmp_path):
+    cache = RrdCache(tmp_path)
+    os.unlink(cache.put(b"data", key="a"))
+
+    assert cache.get("a") is None
+    assert "a" not in cache
+    assert cache.size_bytes == 0
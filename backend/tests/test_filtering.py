@@ -0,0 +1,75 @@
+import rerun as rr
+import rerun.dataframe as rdf
+
+from gradio_rerun.filtering import RrdFilter, filter_rrd
+
+
+def _recording(path):
+    recording = rr.new_recording("filtering", recording_id="filtering")
+    stream = rr.binary_stream(recording=recording)
+    rr.log("world/origin", rr.Points3D([[0, 0, 0]]), static=True, recording=recording)
+    for frame in range(5):
+        rr.set_time_sequence("frame", frame, recording=recording)
+        rr.log("image/blurred", rr.Scalar(frame), recording=recording)
+        rr.log("image/raw", rr.Scalar(10 * frame), recording=recording)
+    path.write_bytes(stream.read())
+    return path
+
+
+def _load(tmp_path, data: bytes):
+    path = tmp_path / "filtered.rrd"
+    path.write_bytes(data)
+    return rdf.load_recording(path)
+
+
+def _columns(recording) -> set[tuple[str, str, bool]]:
+    return {
+        (column.entity_path, column.component_name.split(".")[-1], column.is_static)
+        for column in recording.schema().component_columns()
+    }
+
+
+def _rows(recording, entity_path: str) -> list:
+    table = recording.view(index="frame", contents=entity_path).select().read_all()
+    return table.column(f"{entity_path}:Scalar").to_pylist()
+
+
+def test_default_filter_keeps_everything(tmp_path):
+    source = _recording(tmp_path / "source.rrd")
+    filtered = _load(tmp_path, filter_rrd(source, RrdFilter()))
+
+    assert _columns(filtered) == _columns(rdf.load_recording(source))
+    assert ("/world/origin", "Position3D", True) in _columns(filtered)
+    assert _rows(filtered, "/image/raw") == [[0.0], [10.0], [20.0], [30.0], [40.0]]
+
+
+def test_entities_and_time_range_are_filtered(tmp_path):
+    source = _recording(tmp_path / "source.rrd")
+    spec = RrdFilter(entities=("image/blurred",), timeline="frame", start=2, end=3)
+    filtered = _load(tmp_path, filter_rrd(source, spec))
+
+    # Indicators are carried over, so the viewer shows the scalars as before.
+    assert _columns(filtered) == {
+        ("/image/blurred", "Scalar", False),
+        ("/image/blurred", "ScalarIndicator", False),
+    }
+    assert _rows(filtered, "/image/blurred") == [[2.0], [3.0]]
+
+
+def test_static_data_stays_static(tmp_path):
+    source = _recording(tmp_path / "source.rrd")
+    filtered = _load(tmp_path, filter_rrd(source, RrdFilter(entities=("world/**",))))
+
+    assert _columns(filtered) == {
+        ("/world/origin", "Position3D", True),
+        ("/world/origin", "Points3DIndicator", True),
+    }
+    table = filtered.view(index="frame", contents="/**").select_static().read_all()
+    assert table.column("/world/origin:Position3D").to_pylist() == [[[0.0, 0.0, 0.0]]]
+
+
+def test_patterns_match_whole_segments():
+    spec = RrdFilter(entities=("image/*",))
+    assert spec.matches("/image/blurred")
+    assert not spec.matches("image/blurred/edges")
+    assert RrdFilter(entities=("image/**",)).matches("image")
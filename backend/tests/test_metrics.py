@@ -0,0 +1,41 @@
+from types import SimpleNamespace
+
+import pytest
+from gradio.context import LocalContext
+
+from gradio_rerun.metrics import (
+    _enable_producer_timing,
+    _pop_producer_start,
+    timed_producer,
+)
+
+
+@pytest.fixture
+def session():
+    _enable_producer_timing()
+    token = LocalContext.request.set(SimpleNamespace(session_hash="session"))
+    yield "session"
+    LocalContext.request.reset(token)
+    while _pop_producer_start("session") is not None:
+        pass
+
+
+def test_start_of_a_streaming_producer_is_recorded(session):
+    @timed_producer
+    def producer():
+        yield b"chunk"
+
+    assert next(producer()) == b"chunk"
+    assert _pop_producer_start(session) is not None
+
+
+def test_producer_that_fails_before_its_first_chunk_leaves_no_start(session):
+    @timed_producer
+    def failing():
+        raise RuntimeError("no data")
+        yield b"chunk"
+
+    with pytest.raises(RuntimeError):
+        next(failing())
+    # Otherwise the next stream of the session would be timed from this producer's start.
+    assert _pop_producer_start(session) is None
@@ -0,0 +1,33 @@
+import asyncio
+
+from gradio_rerun.multiplex import FRAME_DATA, MultiplexHub, encode_frame_header
+
+
+async def _next(frames):
+    return await asyncio.wait_for(anext(frames), timeout=5)
+
+
+def test_reconnect_keeps_the_new_connection_open():
+    hub = MultiplexHub()
+
+    async def run():
+        old = hub.frames("session")
+        hub.put("session/1/2", b"a")
+        assert await _next(old) == encode_frame_header(FRAME_DATA, "session/1/2", 1)
+        assert await _next(old) == b"a"
+
+        # The page reconnects before the old response has been torn down.
+        new = hub.frames("session")
+        hub.put("session/1/2", b"b")
+        assert await _next(new) == encode_frame_header(FRAME_DATA, "session/1/2", 1)
+        await old.aclose()
+
+        hub.put("session/1/2", b"c")
+        assert await _next(new) == b"b"
+        assert await _next(new) == encode_frame_header(FRAME_DATA, "session/1/2", 1)
+        assert await _next(new) == b"c"
+        assert hub.stats()["connected"] == 1
+        await new.aclose()
+
+    asyncio.run(run())
+    assert hub.stats()["sessions"] == 0
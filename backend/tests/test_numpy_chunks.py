@@ -0,0 +1,99 @@
+"""Producers may yield NumPy arrays, or any other buffer, instead of `bytes`."""
+
+import numpy as np
+
+from gradio_rerun.broadcast import Broadcaster
+from gradio_rerun.cache import RrdCache
+from gradio_rerun.memoize import memoize_rrd
+from gradio_rerun.pool import ProducerPool, in_process_pool
+from gradio_rerun.replay import ReplayBuffer
+
+
+def _frames() -> list[np.ndarray]:
+    image = np.arange(4 * 8 * 3, dtype=np.uint8).reshape(4, 8, 3)
+    return [
+        np.empty(0, dtype=np.uint8),
+        image,
+        # Not contiguous.
+        image[:, ::2],
+        np.full(64 * 1024, 7, dtype=np.uint16),
+    ]
+
+
+def _expected() -> bytes:
+    return b"".join(frame.tobytes() for frame in _frames())
+
+
+def numpy_producer():
+    yield from _frames()
+
+
+@in_process_pool()
+def pooled_numpy_producer():
+    yield from _frames()
+
+
+def test_broadcast_publishes_numpy_chunks():
+    broadcaster = Broadcaster()
+
+    chunks = list(broadcaster.subscribe("camera", numpy_producer))
+
+    assert all(isinstance(chunk, bytes) for chunk in chunks)
+    # The empty array is skipped.
+    assert len(chunks) == 3
+    assert b"".join(chunks) == _expected()
+
+
+def test_replay_buffer_copies_numpy_chunks():
+    replay = ReplayBuffer(max_history_bytes=None)
+    frame = np.zeros(16, dtype=np.uint8)
+
+    replay.append(np.empty((0, 3), dtype=np.uint8))
+    replay.append(frame)
+    frame[:] = 1
+
+    assert replay.snapshot() == [bytes(16)]
+    assert replay.size_bytes == 16
+
+
+def test_pool_sends_numpy_chunks():
+    # The largest frame goes through shared memory, the others through the pipe.
+    pool = ProducerPool(1, shm_threshold=64 * 1024)
+    try:
+        chunks = list(
+            pool.run(__name__, pooled_numpy_producer.__qualname__, (), {})
+        )
+    finally:
+        pool.shutdown()
+
+    assert len(chunks) == 3
+    assert b"".join(chunks) == _expected()
+
+
+def test_memoize_stores_numpy_chunks(tmp_path):
+    produced = []
+
+    @memoize_rrd(RrdCache(tmp_path))
+    def producer(image):
+        produced.append(image)
+        yield from _frames()
+
+    image = np.ones((2, 2), dtype=np.uint8)
+    first = b"".join(bytes(chunk) for chunk in producer(image))
+    second = b"".join(bytes(chunk) for chunk in producer(image.copy()))
+
+    assert first == second == _expected()
+    assert len(produced) == 1
+    assert producer.memo_stats.hits == 1
+
+
+def test_memoize_stores_returned_numpy_array(tmp_path):
+    @memoize_rrd(RrdCache(tmp_path))
+    def create(n):
+        return np.full(n, 3, dtype=np.uint32)
+
+    path = create(4)
+
+    assert create(4) == path
+    assert open(path, "rb").read() == np.full(4, 3, dtype=np.uint32).tobytes()
+    assert create.memo_stats.as_dict()["bytes_stored"] == 16
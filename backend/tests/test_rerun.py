@@ -0,0 +1,224 @@
+import asyncio
+from pathlib import Path
+from types import SimpleNamespace
+
+import gradio as gr
+import httpx
+import rerun.dataframe as rdf
+from fastapi.testclient import TestClient
+from gradio.data_classes import _StaticFiles
+
+from gradio_rerun import Rerun
+from gradio_rerun.cache import RrdCache
+from gradio_rerun.filtering import RrdFilter
+from gradio_rerun.metrics import MetricsRegistry
+from gradio_rerun.multiplex import multiplex_hub
+from gradio_rerun.proxy import UrlProxy
+from gradio_rerun.rrd import RrdIndex, RrdSlice
+from gradio_rerun.tee import RrdTee
+from gradio_rerun.tempfiles import TempRrdManager
+
+from .test_filtering import _recording
+
+
+async def _send(demo: gr.Blocks, viewer: Rerun, chunks: list, run: int = 1):
+    # Runs the chunks through Gradio's own handling of streaming outputs.
+    block_fn = SimpleNamespace(outputs=[viewer])
+    for chunk in chunks:
+        await demo.handle_streaming_outputs(block_fn, [chunk], "session", run)
+        await asyncio.sleep(0)
+
+
+def _abort(demo: gr.Blocks, run: int = 1):
+    # What Gradio does when a producer raises: its streams are ended without `stream_output`.
+    for stream in demo.pending_streams["session"].get(run, {}).values():
+        stream.append(None)
+
+
+def test_aborted_producer_finishes_its_tee_recording(tmp_path):
+    tee = RrdTee(tmp_path, fsync="never")
+    with gr.Blocks() as demo:
+        viewer = Rerun(streaming=True, tee=tee)
+
+    async def run():
+        await _send(demo, viewer, [b"header", b"data"])
+        assert tee.flush(timeout=5)
+        assert tee.recordings("session") == []
+        _abort(demo)
+
+    asyncio.run(run())
+    assert tee.flush(timeout=5)
+
+    [recording] = tee.recordings("session")
+    assert [path.read_bytes() for path in recording.paths] == [b"headerdata"]
+    # The viewer still receives every chunk and then the end of the stream.
+    assert demo.pending_streams["session"][1][viewer._id] == [b"header", b"data", None]
+    tee.close()
+
+
+def test_completed_producer_finishes_its_tee_recording_once(tmp_path):
+    tee = RrdTee(tmp_path, fsync="never")
+    with gr.Blocks() as demo:
+        viewer = Rerun(streaming=True, tee=tee)
+
+    asyncio.run(_send(demo, viewer, [b"header", b"data", None]))
+    assert tee.flush(timeout=5)
+
+    [recording] = tee.recordings("session")
+    assert recording.finished
+    assert demo.pending_streams["session"][1][viewer._id] == [b"header", b"data", None]
+    tee.close()
+
+
+def test_idle_stream_is_ended(tmp_path, monkeypatch):
+    monkeypatch.setattr("gradio_rerun.rerun._STREAM_TIMEOUT", 0.05)
+    tee = RrdTee(tmp_path, fsync="never")
+    with gr.Blocks() as demo:
+        viewer = Rerun(streaming=True, tee=tee)
+
+    async def run():
+        # A cancelled producer stops without Gradio ending its streams.
+        await _send(demo, viewer, [b"header"])
+        await asyncio.sleep(0.2)
+        # Chunks that arrive after the stream has timed out are not sent or teed.
+        await _send(demo, viewer, [b"late"])
+
+    asyncio.run(run())
+    assert tee.flush(timeout=5)
+
+    [recording] = tee.recordings("session")
+    assert [path.read_bytes() for path in recording.paths] == [b"header"]
+    assert demo.pending_streams["session"][1][viewer._id] == [b"header", None]
+    tee.close()
+
+
+def test_aborted_producer_finishes_its_metrics():
+    registry = MetricsRegistry()
+    with gr.Blocks() as demo:
+        viewer = Rerun(streaming=True, metrics=registry)
+
+    async def run():
+        await _send(demo, viewer, [b"header", b"data"])
+        assert len(registry.active_streams()) == 1
+        _abort(demo)
+
+    asyncio.run(run())
+    assert registry.active_streams() == []
+    label = f'{{component="{viewer._get_metrics_name()}"}}'
+    assert f"gradio_rerun_active_streams{label} 0" in registry.export()
+    assert f"gradio_rerun_streams_finished_total{label} 1" in registry.export()
+
+
+def test_aborted_multiplexed_producer_ends_its_stream():
+    with gr.Blocks() as demo:
+        viewer = Rerun(streaming=True, multiplex=True)
+
+    async def run():
+        await _send(demo, viewer, [b"header", b"data"])
+        _abort(demo)
+
+    asyncio.run(run())
+    # The shared connection sends the end of the stream, so the viewer stops loading.
+    assert multiplex_hub.pending(f"session/1/{viewer._id}") == [b"header", b"data", None]
+    # Gradio's own stream is never read, so it does not keep the chunks.
+    assert demo.pending_streams["session"][1][viewer._id] == [None]
+
+
+def test_filtering_during_an_event_runs_when_the_viewer_requests_the_file(tmp_path):
+    source = _recording(tmp_path / "source.rrd")
+    cache = RrdCache(tmp_path / "cache")
+    with gr.Blocks() as demo:
+        viewer = Rerun(
+            source_filter=RrdFilter(entities=("image/blurred",)), rrd_cache=cache
+        )
+
+    async def event():
+        # Gradio postprocesses the values returned by an event on its event loop.
+        return viewer.postprocess(source)
+
+    [file] = asyncio.run(event()).root
+    assert file.is_stream
+    assert len(cache) == 0
+
+    with TestClient(gr.routes.App.create_app(demo)) as client:
+        response = client.get(f"/stream/{file.path}")
+        assert response.status_code == 200
+        # Each returned file is sent once.
+        assert client.get(f"/stream/{file.path}").status_code == 404
+
+    filtered = tmp_path / "filtered.rrd"
+    filtered.write_bytes(response.content)
+    entities = {
+        column.entity_path
+        for column in rdf.load_recording(filtered).schema().component_columns()
+    }
+    assert entities == {"/image/blurred"}
+    assert len(cache) == 1
+
+
+def test_slice_is_built_when_the_viewer_requests_it(tmp_path):
+    source = _recording(tmp_path / "source.rrd")
+    with gr.Blocks() as demo:
+        viewer = Rerun(rrd_cache=RrdCache(tmp_path / "cache"))
+
+    async def event():
+        return viewer.postprocess(RrdSlice(source, start=-2, keep_prefix=1))
+
+    [file] = asyncio.run(event()).root
+    assert file.is_stream
+    # The file has not been indexed on the event loop.
+    assert not RrdIndex(source).index_path.exists()
+
+    with TestClient(gr.routes.App.create_app(demo)) as client:
+        response = client.get(f"/stream/{file.path}")
+
+    expected = RrdIndex.load(source).iter_slice(start=-2, keep_prefix=1)
+    assert response.content == b"".join(expected)
+
+
+def test_proxied_url_is_downloaded_when_the_viewer_requests_it(tmp_path):
+    requests = []
+
+    def origin(request: httpx.Request) -> httpx.Response:
+        requests.append(request.url)
+        return httpx.Response(200, content=b"recording", headers={"ETag": '"v1"'})
+
+    proxy = UrlProxy(
+        tmp_path / "cache", client=httpx.Client(transport=httpx.MockTransport(origin))
+    )
+    with gr.Blocks() as demo:
+        viewer = Rerun(proxy=proxy)
+
+    async def event():
+        return viewer.postprocess("https://example.com/data/run.rrd")
+
+    [file] = asyncio.run(event()).root
+    assert file.is_stream
+    assert file.orig_name == "run.rrd"
+    # Nothing is downloaded on the event loop.
+    assert requests == []
+
+    with TestClient(gr.routes.App.create_app(demo)) as client:
+        response = client.get(f"/stream/{file.path}")
+    assert response.content == b"recording"
+    assert proxy.stats()["downloads"] == 1
+
+    # Once cached, the file is served in place.
+    [file] = asyncio.run(event()).root
+    assert not file.is_stream
+    assert Path(file.path).read_bytes() == b"recording"
+    assert len(requests) == 1
+
+
+def test_incremental_files_of_a_manager_register_its_directory_once(tmp_path):
+    manager = TempRrdManager(tmp_path / "temp")
+    viewer = Rerun(incremental=True)
+    before = len(_StaticFiles.all_paths)
+
+    for _ in range(3):
+        path = manager.allocate()
+        [file] = viewer.postprocess(path).root
+        assert file.path == str(path)
+
+    assert _StaticFiles.all_paths[before:] == [manager.directory.resolve()]
+    manager.close()
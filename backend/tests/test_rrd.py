@@ -0,0 +1,144 @@
+import os
+import struct
+
+import pytest
+
+from gradio_rerun.rrd import RrdFormatError, RrdIndex
+
+
+def _header(serializer: int = 1) -> bytes:
+    # Magic, crate version, then compression (off) and serializer.
+    return b"RRF2" + bytes([0, 0, 20, 0]) + bytes([0, serializer, 0, 0])
+
+
+def _message(payload: bytes) -> bytes:
+    return struct.pack("<II", len(payload), len(payload)) + payload
+
+
+def _stream(*payloads: bytes, serializer: int = 1) -> bytes:
+    return (
+        _header(serializer)
+        + b"".join(_message(payload) for payload in payloads)
+        + struct.pack("<Q", 0)
+    )
+
+
+def _payloads(data: bytes) -> list[bytes]:
+    # Decodes the messages of a (possibly concatenated) stream.
+    payloads, offset = [], 0
+    while offset < len(data):
+        if data[offset : offset + 4] == b"RRF2":
+            offset += 12
+            continue
+        length, _ = struct.unpack_from("<II", data, offset)
+        offset += 8
+        if length:
+            payloads.append(data[offset : offset + length])
+            offset += length
+    return payloads
+
+
+def test_index_counts_messages_across_streams(tmp_path):
+    path = tmp_path / "a.rrd"
+    path.write_bytes(_stream(b"info", b"one") + _stream(b"two", b"three"))
+
+    index = RrdIndex.load(path)
+
+    assert len(index) == 4
+    assert len(index.headers) == 1
+    assert index.byte_ranges(0, 2) == [(12, 8 + 4 + 8 + 3)]
+
+
+def test_slice_keeps_prefix_and_is_a_valid_stream(tmp_path):
+    path = tmp_path / "a.rrd"
+    payloads = [b"info", *(f"message {i}".encode() for i in range(10))]
+    path.write_bytes(_stream(*payloads))
+
+    data = b"".join(RrdIndex.load(path).iter_slice(start=-3, keep_prefix=1))
+
+    assert data.startswith(_header())
+    assert data.endswith(struct.pack("<Q", 0))
+    assert _payloads(data) == [b"info", *payloads[-3:]]
+
+
+def test_partial_message_is_not_indexed(tmp_path):
+    path = tmp_path / "a.rrd"
+    path.write_bytes(_header() + _message(b"complete") + _message(b"partial")[:-2])
+
+    assert len(RrdIndex.load(path)) == 1
+
+
+def test_appended_messages_extend_the_cached_index(tmp_path):
+    path = tmp_path / "a.rrd"
+    path.write_bytes(_header() + _message(b"one") + _message(b"two"))
+    index = RrdIndex.load(path)
+    assert index.index_path.exists()
+
+    with open(path, "ab") as f:
+        f.write(_message(b"three"))
+
+    reloaded = RrdIndex.load(path)
+    assert len(reloaded) == 3
+    assert reloaded.offsets[:2] == index.offsets
+    assert not reloaded.update()
+
+
+def test_rewritten_file_of_the_same_size_is_reindexed(tmp_path):
+    path = tmp_path / "a.rrd"
+    path.write_bytes(_stream(b"aaaa", b"bbbb"))
+    RrdIndex.load(path)
+    mtime_ns = path.stat().st_mtime_ns
+
+    path.write_bytes(_stream(b"cccccccc"))
+    os.utime(path, ns=(mtime_ns + 1_000_000_000, mtime_ns + 1_000_000_000))
+
+    index = RrdIndex.load(path)
+    assert len(index) == 1
+    assert _payloads(b"".join(index.iter_slice())) == [b"cccccccc"]
+
+
+def test_truncated_file_is_reindexed(tmp_path):
+    path = tmp_path / "a.rrd"
+    path.write_bytes(_header() + _message(b"one") + _message(b"two"))
+    RrdIndex.load(path)
+
+    path.write_bytes(_header() + _message(b"x"))
+
+    assert len(RrdIndex.load(path)) == 1
+
+
+def test_replaced_file_is_reindexed(tmp_path):
+    path = tmp_path / "a.rrd"
+    path.write_bytes(_header() + _message(b"one"))
+    RrdIndex.load(path)
+
+    # A new file with the old one as a prefix, moved into place.
+    replacement = tmp_path / "b.rrd"
+    replacement.write_bytes(_header() + _message(b"one") + _message(b"two"))
+    os.replace(replacement, path)
+
+    index = RrdIndex.load(path)
+    assert len(index) == 2
+    assert index.inode == path.stat().st_ino
+
+
+def test_grown_file_with_a_changed_prefix_is_reindexed(tmp_path):
+    path = tmp_path / "a.rrd"
+    path.write_bytes(_header() + _message(b"one"))
+    RrdIndex.load(path)
+
+    # Larger and in place, but the indexed message was rewritten as well, so the old
+    # offsets point into the middle of a message.
+    path.write_bytes(_header() + _message(b"a longer message") + _message(b"two"))
+
+    index = RrdIndex.load(path)
+    assert len(index) == 2
+    assert _payloads(b"".join(index.iter_slice())) == [b"a longer message", b"two"]
+
+
+def test_protobuf_streams_are_rejected(tmp_path):
+    path = tmp_path / "a.rrd"
+    path.write_bytes(_stream(b"one", serializer=2))
+
+    with pytest.raises(RrdFormatError):
+        RrdIndex.load(path)
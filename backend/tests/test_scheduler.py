@@ -0,0 +1,174 @@
+import threading
+import time
+
+import pytest
+from gradio.exceptions import Error
+
+from gradio_rerun.scheduler import StreamScheduler, scheduled
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_producers_beyond_the_queue_are_rejected():
+    scheduler = StreamScheduler(max_streams=1, max_waiting=0)
+    ticket = scheduler.admit("a")
+
+    with pytest.raises(Error):
+        scheduler.admit("b")
+    assert scheduler.stats()["rejected"] == 1
+
+    scheduler.release(ticket)
+    scheduler.release(scheduler.admit("b"))
+    assert scheduler.stats()["admitted"] == 2
+
+
+def test_admission_times_out():
+    scheduler = StreamScheduler(max_streams=1, admission_timeout=0.05)
+    scheduler.admit("a")
+
+    with pytest.raises(Error):
+        scheduler.admit("b")
+
+    stats = scheduler.stats()
+    assert stats["rejected"] == 1
+    assert stats["active"] == 1
+    assert stats["waiting"] == 0
+
+
+def test_waiting_producers_start_in_order():
+    scheduler = StreamScheduler(max_streams=1)
+    first = scheduler.admit("a")
+    started = []
+
+    def wait(name):
+        ticket = scheduler.admit(name)
+        started.append(name)
+        scheduler.release(ticket)
+
+    threads = []
+    for name in ["b", "c"]:
+        thread = threading.Thread(target=wait, args=(name,))
+        thread.start()
+        threads.append(thread)
+        # Queue them one after the other.
+        while scheduler.stats()["waiting"] < len(threads):
+            time.sleep(0.001)
+    assert started == []
+
+    scheduler.release(first)
+    for thread in threads:
+        thread.join(timeout=5)
+    assert started == ["b", "c"]
+
+
+def test_session_rate_is_limited_per_session():
+    clock = FakeClock()
+    scheduler = StreamScheduler(session_rate=100, burst=1.0, clock=clock)
+    a = scheduler.admit("a")
+    b = scheduler.admit("b")
+
+    assert scheduler._try_send(a, 100) == 0
+    assert scheduler._try_send(a, 50) == pytest.approx(0.5)
+    # Other sessions have their own budget.
+    assert scheduler._try_send(b, 100) == 0
+
+    clock.now = 0.5
+    assert scheduler._try_send(a, 50) == 0
+    assert scheduler.stats()["bytes_sent"] == 250
+
+
+def test_global_rate_is_shared_by_all_sessions():
+    clock = FakeClock()
+    scheduler = StreamScheduler(global_rate=100, burst=1.0, clock=clock)
+    a = scheduler.admit("a")
+    b = scheduler.admit("b")
+
+    assert scheduler._try_send(a, 100) == 0
+    assert scheduler._try_send(b, 10) == pytest.approx(0.1)
+
+    clock.now = 0.1
+    assert scheduler._try_send(b, 10) == 0
+
+
+def test_chunks_larger_than_the_burst_are_sent_on_credit():
+    clock = FakeClock()
+    scheduler = StreamScheduler(session_rate=100, burst=1.0, clock=clock)
+    a = scheduler.admit("a")
+
+    assert scheduler._try_send(a, 300) == 0
+    # The bucket is 200 bytes in debt, and the next chunk needs it back at 100.
+    assert scheduler._try_send(a, 100) == pytest.approx(3.0)
+
+
+def test_waiting_streams_take_turns():
+    clock = FakeClock()
+    scheduler = StreamScheduler(global_rate=100, burst=1.0, clock=clock)
+    a = scheduler.admit("a")
+    b = scheduler.admit("b")
+    assert scheduler._try_send(a, 100) == 0
+
+    # Both wait for the empty bucket, `a` first.
+    assert scheduler._try_send(a, 100) == pytest.approx(1.0)
+    assert scheduler._try_send(b, 10) == scheduler.poll_interval
+
+    clock.now = 1.0
+    assert scheduler._try_send(a, 100) == 0
+    # `a` is ready again right away, but it is `b`'s turn.
+    assert scheduler._try_send(a, 100) == scheduler.poll_interval
+    assert scheduler._try_send(b, 10) == pytest.approx(0.1)
+
+    clock.now = 1.1
+    assert scheduler._try_send(b, 10) == 0
+    assert scheduler._try_send(a, 100) > 0
+
+
+def test_round_robin_between_producers():
+    scheduler = StreamScheduler(global_rate=10_000, burst=0.01)
+    sent = []
+    lock = threading.Lock()
+
+    def stream(name):
+        ticket = scheduler.admit(name)
+        try:
+            for _ in range(10):
+                scheduler.send(ticket, 100)
+                with lock:
+                    sent.append(name)
+        finally:
+            scheduler.release(ticket)
+
+    threads = [threading.Thread(target=stream, args=(name,)) for name in "ab"]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=10)
+
+    # Each chunk empties the bucket, so once both streams wait they alternate.
+    assert sorted(sent) == ["a"] * 10 + ["b"] * 10
+    middle = sent[4:16]
+    assert all(x != y for x, y in zip(middle, middle[1:]))
+
+
+def test_scheduled_producer_releases_its_stream():
+    scheduler = StreamScheduler(max_streams=1, max_waiting=0)
+
+    @scheduled(scheduler)
+    def producer():
+        yield b"a"
+        yield b"b"
+
+    chunks = producer()
+    assert next(chunks) == b"a"
+    assert scheduler.stats()["active"] == 1
+    with pytest.raises(Error):
+        next(producer())
+
+    chunks.close()
+    assert list(producer()) == [b"a", b"b"]
+    assert scheduler.stats()["active"] == 0
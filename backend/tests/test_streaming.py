@@ -0,0 +1,167 @@
+import logging
+
+import numpy as np
+
+from gradio_rerun.streaming import (
+    ChunkCoalescer,
+    LatestChunk,
+    SendBuffer,
+    byte_view,
+    register_send_buffer,
+    release_send_buffer,
+    wait_for_capacity,
+)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+def test_coalescer_sends_first_chunk_right_away():
+    coalescer = ChunkCoalescer(min_bytes=100, max_latency=1.0, clock=FakeClock())
+
+    assert coalescer.push(b"header") == b"header"
+    assert coalescer.push(b"a") is None
+    assert coalescer.push(None) is None
+    assert coalescer.push(b"") is None
+    assert coalescer.flush() == b"a"
+    assert coalescer.empty_skipped == 2
+
+
+def test_coalescer_flushes_on_size():
+    coalescer = ChunkCoalescer(min_bytes=10, max_latency=1.0, clock=FakeClock())
+    coalescer.push(b"header")
+
+    assert coalescer.push(b"12345") is None
+    assert coalescer.push(np.frombuffer(b"67890", dtype=np.uint8)) == b"1234567890"
+
+
+def test_coalescer_flushes_on_latency():
+    clock = FakeClock()
+    coalescer = ChunkCoalescer(min_bytes=1024, max_latency=1.0, clock=clock)
+    coalescer.push(b"header")
+
+    assert coalescer.push(b"a") is None
+    clock.now = 0.5
+    assert coalescer.push(b"b") is None
+    # The latency counts from the oldest pending chunk, and empty reads also flush.
+    clock.now = 1.0
+    assert coalescer.push(b"") == b"ab"
+
+    clock.now = 1.5
+    assert coalescer.push(b"c") is None
+    clock.now = 2.0
+    assert coalescer.push(b"d") is None
+    clock.now = 2.5
+    assert coalescer.push(b"e") == b"cde"
+    assert coalescer.chunks_out == 3
+
+
+def test_coalescer_copies_held_back_buffers():
+    coalescer = ChunkCoalescer(min_bytes=1024, max_latency=1.0, clock=FakeClock())
+    coalescer.push(b"header")
+    frame = np.zeros(4, dtype=np.uint8)
+
+    coalescer.push(frame)
+    frame[:] = 1
+
+    assert coalescer.flush() == bytes(4)
+
+def test_send_buffer_drops_superseded_latest_chunks():
+    pending = [
+        b"header",
+        LatestChunk("image", b"1" * 10),
+        LatestChunk("points", b"2" * 10),
+        LatestChunk("image", b"3" * 10),
+    ]
+    buffer = SendBuffer(pending, max_bytes=30, overflow="drop")
+
+    buffer.admit(LatestChunk("image", b"4" * 10))
+
+    assert pending == [b"header", b"2" * 10]
+    assert buffer.dropped_chunks == 2
+    assert buffer.dropped_bytes == 20
+
+
+def test_send_buffer_keeps_newest_chunk_per_key_and_plain_chunks():
+    pending = [
+        b"x" * 20,
+        LatestChunk("image", b"1" * 10),
+        LatestChunk("image", b"2" * 10),
+    ]
+    buffer = SendBuffer(pending, max_bytes=30, overflow="drop")
+
+    buffer.admit(b"y" * 10)
+
+    assert pending == [b"x" * 20, b"2" * 10]
+    assert buffer.dropped_chunks == 1
+
+
+def test_send_buffer_does_not_drop_within_budget_or_when_blocking():
+    pending = [LatestChunk("image", b"1" * 10), LatestChunk("image", b"2" * 10)]
+
+    SendBuffer(pending, max_bytes=100, overflow="drop").admit(b"3" * 10)
+    SendBuffer(pending, max_bytes=10, overflow="block").admit(b"3" * 10)
+
+    assert len(pending) == 2
+
+
+def test_send_buffer_blocks_producer_until_drained():
+    pending = [np.zeros(64, dtype=np.uint8), None]
+    buffer = SendBuffer(pending, max_bytes=64, overflow="block")
+    assert buffer.queued_bytes() == 64
+    assert not buffer.has_capacity()
+
+    register_send_buffer("session", "stream", buffer)
+    try:
+        assert not wait_for_capacity("session", poll_interval=0.001, timeout=0.01)
+        pending.pop(0)
+        assert wait_for_capacity("session", poll_interval=0.001, timeout=0.01)
+    finally:
+        release_send_buffer("session", "stream")
+
+    # Streams that have been released no longer hold the session back.
+    pending.append(b"x" * 100)
+    assert wait_for_capacity("session", timeout=0)
+
+
+def test_byte_view_of_numpy_arrays():
+    image = np.arange(24, dtype=np.uint16).reshape(2, 3, 4)
+
+    view = byte_view(image)
+    assert len(view) == image.nbytes
+    assert bytes(view) == image.tobytes()
+
+    # Not contiguous, so it is copied.
+    column = image[:, :, 0]
+    assert bytes(byte_view(column)) == column.tobytes()
+
+    assert len(byte_view(np.empty(0, dtype=np.uint8))) == 0
+    assert len(byte_view(np.empty((0, 3), dtype=np.float32))) == 0
+
+
+def test_send_buffer_warns_once_when_over_budget(caplog):
+    pending = [b"x" * 10]
+    buffer = SendBuffer(pending, max_bytes=10, overflow="block")
+
+    with caplog.at_level(logging.WARNING, logger="gradio_rerun.streaming"):
+        buffer.admit(b"y" * 10)
+        pending.append(b"y" * 10)
+        buffer.admit(b"z" * 10)
+
+    [record] = caplog.records
+    assert "backpressure" in record.getMessage()
+
+
+def test_send_buffer_does_not_warn_when_dropping_keeps_it_within_budget(caplog):
+    pending = [LatestChunk("image", b"1" * 10)]
+    buffer = SendBuffer(pending, max_bytes=15, overflow="drop")
+
+    with caplog.at_level(logging.WARNING, logger="gradio_rerun.streaming"):
+        buffer.admit(LatestChunk("image", b"2" * 10))
+
+    assert pending == []
+    assert caplog.records == []
@@ -0,0 +1,138 @@
+import threading
+
+import numpy as np
+
+from gradio_rerun.streaming import StaticChunk
+from gradio_rerun.tee import RrdTee
+
+
+def _blocked(tee: RrdTee) -> tuple[threading.Event, threading.Event]:
+    # Holds the writer thread inside its first write until `release` is set.
+    entered, release = threading.Event(), threading.Event()
+    write = tee._write
+
+    def slow_write(stream_id, chunk):
+        entered.set()
+        release.wait()
+        write(stream_id, chunk)
+
+    tee._write = slow_write
+    return entered, release
+
+
+def test_recording_is_written_to_disk(tmp_path):
+    tee = RrdTee(tmp_path, fsync="never")
+    tee.write("session/1/viewer", b"header")
+    tee.write("session/1/viewer", np.frombuffer(b"data", dtype=np.uint8))
+    tee.write("session/1/viewer", None)
+    assert tee.flush(timeout=5)
+
+    [recording] = tee.recordings("session")
+    assert recording.error is None
+    assert [path.read_bytes() for path in recording.paths] == [b"headerdata"]
+    tee.close()
+
+
+def test_segments_repeat_the_preamble(tmp_path):
+    tee = RrdTee(tmp_path, fsync="never", max_segment_bytes=4)
+    # The first segment is full before the static chunk arrives, so the second segment
+    # starts with the whole preamble.
+    for chunk in [b"head", StaticChunk(b"blue"), b"1234", b"5678", None]:
+        tee.write("session/1/viewer", chunk)
+    assert tee.flush(timeout=5)
+
+    [recording] = tee.recordings()
+    assert [path.read_bytes() for path in recording.paths] == [
+        b"head",
+        b"headblue1234",
+        b"headblue5678",
+    ]
+    tee.close()
+
+
+def test_full_queue_drops_the_stream_without_blocking(tmp_path):
+    tee = RrdTee(tmp_path, fsync="never", max_queue_bytes=16)
+    entered, release = _blocked(tee)
+    tee.write("session/1/viewer", b"x" * 10)
+    assert entered.wait(timeout=5)
+
+    # The writer is stuck, so the queue fills up; `write` returns right away regardless.
+    tee.write("session/1/viewer", b"y" * 10)
+    tee.write("session/1/viewer", b"z" * 10)
+    tee.write("session/1/viewer", b"ignored")
+    assert tee.dropped_streams == 1
+
+    tee.write("session/1/viewer", None)
+    release.set()
+    assert tee.flush(timeout=5)
+
+    [recording] = tee.recordings()
+    assert recording.finished
+    assert "could not keep up" in recording.error
+    data = b"".join(path.read_bytes() for path in recording.paths)
+    assert data == b"x" * 10 + b"y" * 10
+    tee.close()
+
+
+def test_other_streams_are_teed_after_a_drop(tmp_path):
+    tee = RrdTee(tmp_path, fsync="never", max_queue_bytes=16)
+    entered, release = _blocked(tee)
+    tee.write("session/1/a", b"x" * 10)
+    assert entered.wait(timeout=5)
+    tee.write("session/1/a", b"y" * 10)
+    tee.write("session/1/a", b"z" * 10)
+    tee.write("session/1/a", None)
+    release.set()
+    assert tee.flush(timeout=5)
+
+    tee.write("session/2/b", b"data")
+    tee.write("session/2/b", None)
+    assert tee.flush(timeout=5)
+
+    a, b = tee.recordings()
+    assert a.error is not None
+    assert b.error is None
+    assert b.paths[0].read_bytes() == b"data"
+    tee.close()
+
+
+def test_old_recordings_are_pruned(tmp_path):
+    tee = RrdTee(tmp_path, fsync="never", max_age=60)
+    tee.write("session/1/viewer", b"data")
+    tee.write("session/1/viewer", None)
+    assert tee.flush(timeout=5)
+    [recording] = tee.recordings()
+
+    assert tee.prune(now=recording.finished_at + 30) == 0
+    assert tee.prune(now=recording.finished_at + 61) == 1
+    assert tee.recordings() == []
+    assert not recording.paths[0].exists()
+    tee.close()
+
+
+def test_recordings_over_budget_are_pruned_oldest_first(tmp_path):
+    tee = RrdTee(tmp_path, fsync="never", max_age=None, max_bytes=10)
+    for i in range(3):
+        tee.write(f"session/{i}/viewer", b"x" * 5)
+        tee.write(f"session/{i}/viewer", None)
+        assert tee.flush(timeout=5)
+
+    tee.prune()
+
+    assert [recording.stream_id for recording in tee.recordings()] == [
+        "session/1/viewer",
+        "session/2/viewer",
+    ]
+    tee.close()
+
+
+def test_leftover_recordings_are_adopted(tmp_path):
+    tee = RrdTee(tmp_path, fsync="never")
+    tee.write("session/1/viewer", b"data")
+    tee.write("session/1/viewer", None)
+    assert tee.flush(timeout=5)
+    tee.close()
+
+    [recording] = RrdTee(tmp_path).recordings("session")
+    assert recording.stream_id == "session/1/viewer"
+    assert recording.bytes == 4
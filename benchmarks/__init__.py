@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# The synthetic point clouds come from the demo, which is not an installed package.
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "demo"))
@@ -0,0 +1,15 @@
+"""
+Runs the benchmark suite. From the repository root:
+
+    python -m benchmarks --output baseline.json
+    python -m benchmarks --compare baseline.json --tolerance 0.1
+
+Everything runs offline against synthetic recordings and a scratch cache directory.
+"""
+
+import sys
+
+from . import bench_color_grid, bench_postprocess, bench_streaming  # noqa: F401
+from .harness import main
+
+sys.exit(main())
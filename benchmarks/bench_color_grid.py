@@ -0,0 +1,117 @@
+"""
+Benchmarks for `demo/color_grid.py`, comparing the vectorized generator to the original loop.
+
+Besides being part of `python -m benchmarks`, this module prints a time and peak memory
+comparison when run on its own:
+
+    python -m benchmarks.bench_color_grid
+"""
+
+from __future__ import annotations
+
+import time
+import tracemalloc
+from math import cos, sin
+from pathlib import Path
+
+import numpy as np
+from color_grid import build_color_grid, iter_color_grid
+
+from .harness import benchmark
+
+# Points per axis; 200 is 8 million points.
+SIZES = (50, 100, 200)
+SLAB_POINTS = 1_000_000
+
+
+def legacy_build_color_grid(x_count=10, y_count=10, z_count=10, twist=0):
+    """
+    The implementation `build_color_grid` replaced, kept as the reference point.
+    """
+    grid = np.mgrid[
+        slice(-x_count, x_count, x_count * 1j),
+        slice(-y_count, y_count, y_count * 1j),
+        slice(-z_count, z_count, z_count * 1j),
+    ]
+
+    angle = np.linspace(-float(twist) / 2, float(twist) / 2, z_count)
+    for z in range(z_count):
+        xv, yv, zv = grid[:, :, :, z]
+        rot_xv = xv * cos(angle[z]) - yv * sin(angle[z])
+        rot_yv = xv * sin(angle[z]) + yv * cos(angle[z])
+        grid[:, :, :, z] = [rot_xv, rot_yv, zv]
+
+    positions = np.vstack([xyz.ravel() for xyz in grid])
+
+    colors = np.vstack(
+        [
+            xyz.ravel()
+            for xyz in np.mgrid[
+                slice(0, 255, x_count * 1j),
+                slice(0, 255, y_count * 1j),
+                slice(0, 255, z_count * 1j),
+            ]
+        ]
+    )
+
+    return positions.T, colors.T.astype(np.uint8)
+
+
+def _full(build, count: int):
+    def prepare(workdir: Path):
+        def run():
+            positions, colors = build(count, count, count, twist=1.0)
+            yield positions.nbytes + colors.nbytes
+
+        return run
+
+    return prepare
+
+
+def _slabs(count: int):
+    def prepare(workdir: Path):
+        def run():
+            for slab in iter_color_grid(count, count, count, 1.0, SLAB_POINTS):
+                yield slab.positions.nbytes + slab.colors.nbytes
+
+        return run
+
+    return prepare
+
+
+for count in SIZES:
+    benchmark(f"color_grid/legacy-{count}")(_full(legacy_build_color_grid, count))
+    benchmark(f"color_grid/vectorized-{count}")(_full(build_color_grid, count))
+    benchmark(f"color_grid/slabs-{count}")(_slabs(count))
+
+
+def _measure(fn) -> tuple[float, int]:
+    tracemalloc.start()
+    start = time.perf_counter()
+    fn()
+    seconds = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return seconds, peak
+
+
+def _consume_slabs(count: int):
+    for _ in iter_color_grid(count, count, count, 1.0, SLAB_POINTS):
+        pass
+
+
+def main():
+    print(f"{'points':>12} {'variant':<12} {'seconds':>9} {'peak MiB':>10}")
+    for count in SIZES:
+        variants = {
+            "legacy": lambda: legacy_build_color_grid(count, count, count, 1.0),
+            "vectorized": lambda: build_color_grid(count, count, count, 1.0),
+            "slabs": lambda: _consume_slabs(count),
+        }
+        for name, fn in variants.items():
+            seconds, peak = _measure(fn)
+            print(f"{count**3:>12} {name:<12} {seconds:>9.3f} {peak / 2**20:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""Benchmarks for `Rerun.postprocess`."""
+
+from __future__ import annotations
+
+from pathlib import Path
+
+from gradio_rerun import Rerun, RrdCache
+
+from .harness import benchmark
+from .workloads import GRID_SIZES, IMAGE_SIZES, recording, write_recordings
+
+
+def _component(workdir: Path) -> Rerun:
+    return Rerun(rrd_cache=RrdCache(workdir / "cache", max_bytes=None, max_entries=None))
+
+
+def _bytes_benchmark(kind: str, size: int, frames: int, calls: int = 10):
+    def prepare(workdir: Path):
+        component = _component(workdir)
+        data = b"".join(recording(kind, size, frames))
+        # Distinct blobs, so every call writes a new cache entry.
+        blobs = [data + bytes([i]) for i in range(calls)]
+
+        def run():
+            for blob in blobs:
+                component.postprocess(blob)
+                yield len(blob)
+
+        return run
+
+    return prepare
+
+
+def _paths_benchmark(count: int, url_every: int | None):
+    def prepare(workdir: Path):
+        component = _component(workdir)
+        data = b"".join(recording("color_grid", 10, 1))
+        paths: list[Path | str] = list(write_recordings(workdir / "files", data, count))
+        if url_every is not None:
+            for i in range(0, count, url_every):
+                paths[i] = f"https://example.com/recording_{i}.rrd"
+        size = len(data) * sum(isinstance(p, Path) for p in paths)
+
+        def run():
+            component.postprocess(paths)
+            yield size
+
+        return run
+
+    return prepare
+
+
+# The largest cases get fewer frames and calls, so that no case needs more than a few hundred
+# MiB and the suite runs on CI-sized machines.
+for count in GRID_SIZES:
+    benchmark(f"postprocess/bytes/color_grid-{count}")(
+        _bytes_benchmark(
+            "color_grid",
+            count,
+            frames=20 if count < 100 else 2,
+            calls=10 if count < 100 else 4,
+        )
+    )
+for size in IMAGE_SIZES:
+    benchmark(f"postprocess/bytes/image-{size}")(
+        _bytes_benchmark("image", size, frames=5, calls=10 if size < 2048 else 4)
+    )
+for count in (10, 100, 1000):
+    benchmark(f"postprocess/paths-{count}")(_paths_benchmark(count, None))
+    benchmark(f"postprocess/mixed-{count}")(_paths_benchmark(count, url_every=2))
@@ -0,0 +1,79 @@
+"""Benchmarks for `Rerun.stream_output`, fed by live synthetic producers."""
+
+from __future__ import annotations
+
+from pathlib import Path
+
+from gradio_rerun import Rerun, RrdCache, stream_rrd
+
+from .harness import benchmark
+from .workloads import GRID_SIZES, IMAGE_SIZES, chunks, recording, write_recordings
+
+
+def _stream_benchmark(kind: str, size: int, compression: str | None):
+    def prepare(workdir: Path):
+        component = Rerun(
+            streaming=True,
+            compression=compression,
+            rrd_cache=RrdCache(workdir / "cache"),
+        )
+
+        def run():
+            # The producer runs inside the timed region, so the first chunk includes encoding.
+            output_id = "bench/0/1"
+            first_chunk = True
+            for chunk in chunks(kind, size):
+                component.stream_output(
+                    component.postprocess(chunk), output_id, first_chunk
+                )
+                first_chunk = False
+                yield len(chunk)
+            component.stream_output(None, output_id, first_chunk)
+
+        return run
+
+    return prepare
+
+
+for compression in (None, "gzip"):
+    suffix = "" if compression is None else f"/{compression}"
+    for count in GRID_SIZES:
+        benchmark(f"stream/color_grid-{count}{suffix}")(
+            _stream_benchmark("color_grid", count, compression)
+        )
+    for size in IMAGE_SIZES:
+        benchmark(f"stream/image-{size}{suffix}")(
+            _stream_benchmark("image", size, compression)
+        )
+        benchmark(f"stream/encoded_image-{size}{suffix}")(
+            _stream_benchmark("encoded_image", size, compression)
+        )
+
+
+def _file_stream_benchmark(size: int, align_to_messages: bool):
+    def prepare(workdir: Path):
+        component = Rerun(streaming=True, rrd_cache=RrdCache(workdir / "cache"))
+        data = b"".join(recording("image", size))
+        (path,) = write_recordings(workdir / "files", data, 1)
+
+        def run():
+            output_id = "bench/0/1"
+            first_chunk = True
+            for chunk in stream_rrd(
+                path, chunk_size=1024 * 1024, align_to_messages=align_to_messages
+            ):
+                component.stream_output(
+                    component.postprocess(chunk), output_id, first_chunk
+                )
+                first_chunk = False
+                yield len(chunk)
+            component.stream_output(None, output_id, first_chunk)
+
+        return run
+
+    return prepare
+
+
+for size in IMAGE_SIZES:
+    benchmark(f"stream/file-image-{size}")(_file_stream_benchmark(size, False))
+    benchmark(f"stream/file-image-{size}/aligned")(_file_stream_benchmark(size, True))
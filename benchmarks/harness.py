@@ -0,0 +1,220 @@
+"""Timing, memory and baseline comparison for the benchmark suite."""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import platform
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Callable, Iterable
+
+# A benchmark receives a scratch directory and returns the function that is timed. The timed
+# function yields the number of bytes it processed for every chunk it produced.
+Prepare = Callable[[Path], Callable[[], Iterable[int]]]
+
+REGISTRY: dict[str, Prepare] = {}
+
+
+def benchmark(name: str) -> Callable[[Prepare], Prepare]:
+    """
+    Registers a benchmark under `name`. Everything done by the decorated function itself is setup
+    and is not timed.
+    """
+
+    def decorator(prepare: Prepare) -> Prepare:
+        if name in REGISTRY:
+            raise ValueError(f"Duplicate benchmark {name!r}")
+        REGISTRY[name] = prepare
+        return prepare
+
+    return decorator
+
+
+@dataclass
+class BenchResult:
+    name: str
+    bytes: int
+    chunks: int
+    seconds: float
+    first_chunk_seconds: float
+    peak_rss_bytes: int
+    cache_growth_bytes: int
+
+    @property
+    def mb_per_s(self) -> float:
+        return self.bytes / self.seconds / 1e6 if self.seconds else 0.0
+
+    @property
+    def chunks_per_s(self) -> float:
+        return self.chunks / self.seconds if self.seconds else 0.0
+
+    def as_dict(self) -> dict:
+        return {
+            **asdict(self),
+            "mb_per_s": self.mb_per_s,
+            "chunks_per_s": self.chunks_per_s,
+        }
+
+
+def peak_rss_bytes() -> int:
+    # The peak over the lifetime of the process, which is why every case runs in its own process.
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes.
+    return rss if sys.platform == "darwin" else rss * 1024
+
+
+def dir_size(path: Path) -> int:
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.stat(os.path.join(root, name)).st_size
+            except FileNotFoundError:
+                pass
+    return total
+
+
+def run_once(name: str, prepare: Prepare) -> BenchResult:
+    with tempfile.TemporaryDirectory(prefix="gradio_rerun_bench_") as tmp:
+        workdir = Path(tmp)
+        fn = prepare(workdir)
+        size_before = dir_size(workdir)
+        total = chunks = 0
+        first_chunk = None
+        start = time.perf_counter()
+        for n in fn():
+            if first_chunk is None:
+                first_chunk = time.perf_counter() - start
+            total += n
+            chunks += 1
+        seconds = time.perf_counter() - start
+        return BenchResult(
+            name=name,
+            bytes=total,
+            chunks=chunks,
+            seconds=seconds,
+            first_chunk_seconds=seconds if first_chunk is None else first_chunk,
+            peak_rss_bytes=peak_rss_bytes(),
+            cache_growth_bytes=dir_size(workdir) - size_before,
+        )
+
+
+def run_isolated(name: str) -> BenchResult:
+    """
+    Runs a benchmark once in a fresh interpreter, so its peak RSS is not that of an earlier case.
+    """
+    output = subprocess.run(
+        [sys.executable, "-m", "benchmarks", "--run-one", name],
+        check=True,
+        stdout=subprocess.PIPE,
+        text=True,
+    ).stdout
+    return BenchResult(**json.loads(output.splitlines()[-1]))
+
+
+def run(name: str, repeat: int) -> BenchResult:
+    """
+    Runs a benchmark `repeat` times, each in its own process, and returns the run with the median duration.
+    """
+    results = [run_isolated(name) for _ in range(repeat)]
+    median = statistics.median_low(r.seconds for r in results)
+    return next(r for r in results if r.seconds == median)
+
+
+def compare(
+    results: list[BenchResult], baseline: dict, tolerance: float
+) -> list[str]:
+    """
+    Returns a description of every metric that regressed by more than `tolerance` relative to `baseline`.
+    """
+    previous = {entry["name"]: entry for entry in baseline["results"]}
+    regressions = []
+    for result in results:
+        base = previous.get(result.name)
+        if base is None:
+            continue
+        current = result.as_dict()
+        # Higher is better for throughput, lower is better for everything else.
+        for metric, higher_is_better in (
+            ("mb_per_s", True),
+            ("chunks_per_s", True),
+            ("first_chunk_seconds", False),
+            ("cache_growth_bytes", False),
+        ):
+            old, new = base[metric], current[metric]
+            if not old:
+                continue
+            change = (new - old) / old
+            if (change < -tolerance) if higher_is_better else (change > tolerance):
+                regressions.append(
+                    f"{result.name}: {metric} {old:.4g} -> {new:.4g} ({change:+.1%})"
+                )
+    return regressions
+
+
+def _format(result: BenchResult) -> str:
+    return (
+        f"{result.name:<40} {result.mb_per_s:>10.1f} MB/s {result.chunks_per_s:>10.0f} chunks/s"
+        f" {result.first_chunk_seconds * 1e3:>9.2f} ms first"
+        f" {result.peak_rss_bytes / 2**20:>8.0f} MiB rss"
+        f" {result.cache_growth_bytes / 2**20:>8.1f} MiB cache"
+    )
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks",
+        description="Measures the throughput of the Rerun component's hot paths.",
+    )
+    parser.add_argument("-k", "--filter", help="Only run benchmarks whose name contains this string.")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per benchmark; the median is reported.")
+    parser.add_argument("--output", type=Path, help="Write the results to this JSON file, e.g. to record a baseline.")
+    parser.add_argument("--compare", type=Path, help="Baseline JSON file to compare against. Exits with status 1 on regressions.")
+    parser.add_argument("--tolerance", type=float, default=0.1, help="Allowed relative regression when comparing, e.g. 0.1 for 10%%.")
+    parser.add_argument("--list", action="store_true", help="List the available benchmarks and exit.")
+    parser.add_argument("--run-one", metavar="NAME", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.run_one is not None:
+        # Worker mode of `run_isolated`: the result is the last line of output.
+        print(json.dumps(asdict(run_once(args.run_one, REGISTRY[args.run_one]))))
+        return 0
+
+    names = [name for name in REGISTRY if not args.filter or args.filter in name]
+    if args.list:
+        print("\n".join(names))
+        return 0
+
+    results = []
+    for name in names:
+        result = run(name, args.repeat)
+        print(_format(result), flush=True)
+        results.append(result)
+
+    if args.output is not None:
+        args.output.write_text(
+            json.dumps(
+                {
+                    "python": platform.python_version(),
+                    "platform": platform.platform(),
+                    "results": [r.as_dict() for r in results],
+                },
+                indent=2,
+            )
+        )
+
+    if args.compare is not None:
+        regressions = compare(results, json.loads(args.compare.read_text()), args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            return 1
+    return 0
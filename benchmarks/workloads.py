@@ -0,0 +1,96 @@
+"""Synthetic recordings used as benchmark input."""
+
+from __future__ import annotations
+
+import functools
+from pathlib import Path
+from typing import Iterator
+
+import numpy as np
+import rerun as rr
+
+from gradio_rerun import ImageEncoder
+
+from color_grid import build_color_grid
+
+# Points per axis of the color grid and edge length of the square images.
+GRID_SIZES = (10, 50, 100)
+IMAGE_SIZES = (256, 1024, 2048)
+
+
+def color_grid_chunks(count: int, frames: int = 20) -> Iterator[bytes]:
+    """
+    Yields one chunk per frame of a twisting `count`³ point cloud, as a streaming producer would.
+    """
+    recording = rr.new_recording("gradio_rerun_bench_grid", recording_id="bench")
+    stream = rr.binary_stream(recording=recording)
+    for frame in range(frames):
+        rr.set_time_sequence("frame", frame, recording=recording)
+        grid = build_color_grid(count, count, count, twist=frame / frames)
+        rr.log(
+            "grid",
+            rr.Points3D(grid.positions, colors=grid.colors, radii=0.5),
+            recording=recording,
+        )
+        yield stream.read()
+
+
+def image_chunks(size: int, frames: int = 20) -> Iterator[bytes]:
+    """
+    Yields one chunk per frame of random `size`x`size` RGB images.
+    """
+    rng = np.random.default_rng(0)
+    recording = rr.new_recording("gradio_rerun_bench_image", recording_id="bench")
+    stream = rr.binary_stream(recording=recording)
+    for frame in range(frames):
+        rr.set_time_sequence("frame", frame, recording=recording)
+        image = rng.integers(0, 256, (size, size, 3), dtype=np.uint8)
+        rr.log("image", rr.Image(image), recording=recording)
+        yield stream.read()
+
+
+def encoded_image_chunks(size: int, frames: int = 20) -> Iterator[bytes]:
+    """
+    Yields the frames of `image_chunks` logged as JPEG through an `ImageEncoder`.
+    """
+    rng = np.random.default_rng(0)
+    recording = rr.new_recording("gradio_rerun_bench_encoded", recording_id="bench")
+    stream = rr.binary_stream(recording=recording)
+    encoder = ImageEncoder(quality=85, recording=recording)
+    for frame in range(frames):
+        image = rng.integers(0, 256, (size, size, 3), dtype=np.uint8)
+        encoder.log("image", image, sequence={"frame": frame})
+        yield stream.read()
+    encoder.flush()
+    yield stream.read()
+
+
+def chunks(kind: str, size: int, frames: int = 20) -> Iterator[bytes]:
+    """
+    Returns a generator of the chunks of a "color_grid", "image" or "encoded_image" recording.
+    """
+    if kind == "color_grid":
+        return color_grid_chunks(size, frames)
+    if kind == "image":
+        return image_chunks(size, frames)
+    if kind == "encoded_image":
+        return encoded_image_chunks(size, frames)
+    raise ValueError(f"Unknown workload {kind!r}")
+
+
+@functools.lru_cache(maxsize=None)
+def recording(kind: str, size: int, frames: int = 20) -> tuple[bytes, ...]:
+    """
+    Returns the chunks of a recording, generated once per process so setup stays cheap.
+    """
+    return tuple(chunks(kind, size, frames))
+
+
+def write_recordings(directory: Path, data: bytes, count: int) -> list[Path]:
+    directory.mkdir(parents=True, exist_ok=True)
+    paths = []
+    for i in range(count):
+        path = directory / f"recording_{i}.rrd"
+        path.write_bytes(data)
+        paths.append(path)
+    return paths
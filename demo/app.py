@@ -1,10 +1,8 @@
 import cv2
-import os
-import tempfile
 import time
 
 import gradio as gr
-from gradio_rerun import Rerun
+from gradio_rerun import ImageEncoder, Rerun, memoize_rrd, temp_rrd
 
 import rerun as rr
 import rerun.blueprint as rrb
@@ -45,20 +43,25 @@ def streaming_repeated_blur(img):
 
     blur = img
 
-    for i in range(100):
-        rr.set_time_sequence("iteration", i)
+    # The blurred frames are encoded as JPEG on a thread pool while the next one is computed,
+    # which makes each chunk a fraction of the size of the raw pixels.
+    encoder = ImageEncoder(quality=85)
 
+    for i in range(100):
         # Pretend blurring takes a while so we can see streaming in action.
         time.sleep(0.1)
         blur = cv2.GaussianBlur(blur, (5, 5), 0)
 
-        rr.log("image/blurred", rr.Image(blur))
+        encoder.log("image/blurred", blur, sequence={"iteration": i})
 
         # Each time we yield bytes from the stream back to Gradio, they
         # are incrementally sent to the viewer. Make sure to yield any time
         # you want the user to be able to see progress.
         yield stream.read()
 
+    encoder.flush()
+    yield stream.read()
+
 
 # However, if you have a workflow that creates an RRD file instead, you can still send it
 # directly to the viewer by simply returning the path to the RRD file.
@@ -66,29 +69,26 @@ def streaming_repeated_blur(img):
 # This may be helpful if you need to execute a helper tool written in C++ or Rust that can't
 # be easily modified to stream data directly via Gradio.
 #
-# In this case you may want to clean up the RRD file after it's sent to the viewer so that you
-# don't accumulate too many  temporary files.
+# In this case you don't want to accumulate temporary files. `temp_rrd` returns a managed
+# path that is removed shortly after the viewer received it, and a background sweeper
+# bounds the age and total size of the files that never get delivered.
+#
+# `memoize_rrd` keeps the resulting recording in a cache keyed by the slider values, so
+# requesting the same cube again returns the cached file without logging it again.
+@memoize_rrd()
 @rr.thread_local_stream("rerun_example_cube_rrd")
-def create_cube_rrd(x, y, z, pending_cleanup):
+def create_cube_rrd(x, y, z):
     cube = build_color_grid(int(x), int(y), int(z), twist=0)
     rr.log("cube", rr.Points3D(cube.positions, colors=cube.colors, radii=0.5))
 
-    # We eventually want to clean up the RRD file after it's sent to the viewer, so tracking
-    # any pending files to be cleaned up when the state is deleted.
-    temp = tempfile.NamedTemporaryFile(prefix="cube_", suffix=".rrd", delete=False)
-    pending_cleanup.append(temp.name)
+    path = temp_rrd(prefix="cube_")
 
     blueprint = rrb.Spatial3DView(origin="cube")
-    rr.save(temp.name, default_blueprint=blueprint)
+    rr.save(path, default_blueprint=blueprint)
 
-    # Just return the name of the file -- Gradio will convert it to a FileData object
+    # Just return the path of the file -- Gradio will convert it to a FileData object
     # and send it to the viewer.
-    return temp.name
-
-
-def cleanup_cube_rrds(pending_cleanup):
-    for f in pending_cleanup:
-        os.unlink(f)
+    return path
 
 
 with gr.Blocks() as demo:
@@ -109,9 +109,6 @@ with gr.Blocks() as demo:
         stream_blur.click(streaming_repeated_blur, inputs=[img], outputs=[viewer])
 
     with gr.Tab("Dynamic RRD"):
-        pending_cleanup = gr.State(
-            [], time_to_live=10, delete_callback=cleanup_cube_rrds
-        )
         with gr.Row():
             x_count = gr.Number(
                 minimum=1, maximum=10, value=5, precision=0, label="X Count"
@@ -135,7 +132,7 @@ with gr.Blocks() as demo:
             )
         create_rrd.click(
             create_cube_rrd,
-            inputs=[x_count, y_count, z_count, pending_cleanup],
+            inputs=[x_count, y_count, z_count],
             outputs=[viewer],
         )
 
@@ -143,6 +140,8 @@ with gr.Blocks() as demo:
         with gr.Row():
             # It may be helpful to point the viewer to a hosted RRD file on another server.
             # If an RRD file is hosted via http, you can just return a URL to the file.
+            # With `proxy=True` the server downloads it once and every client loads it from
+            # the server's cache instead of from the origin.
             choose_rrd = gr.Dropdown(
                 label="RRD",
                 choices=[
@@ -154,6 +153,7 @@ with gr.Blocks() as demo:
         with gr.Row():
             viewer = Rerun(
                 streaming=True,
+                proxy=True,
                 panel_states={
                     "time": "collapsed",
                     "blueprint": "hidden",
@@ -1,6 +1,6 @@
 import numpy as np
-from math import cos, sin
 from collections import namedtuple
+from typing import Iterator
 
 ColorGrid = namedtuple("ColorGrid", ["positions", "colors"])
 
@@ -19,31 +19,61 @@ def build_color_grid(x_count=10, y_count=10, z_count=10, twist=0):
         Angle to twist from bottom to top of the cube
 
     """
+    return _color_grid_slab(x_count, y_count, z_count, twist, 0, x_count)
 
-    grid = np.mgrid[
-        slice(-x_count, x_count, x_count * 1j),
-        slice(-y_count, y_count, y_count * 1j),
-        slice(-z_count, z_count, z_count * 1j),
-    ]
 
+def iter_color_grid(x_count=10, y_count=10, z_count=10, twist=0, max_points=1_000_000) -> Iterator[ColorGrid]:
+    """
+    Create the same cube of points as `build_color_grid`, in slabs of at most `max_points` points.
+
+    Concatenating the slabs gives the full grid, but only one slab is held in memory at a time,
+    so large clouds can be logged incrementally with one `rr.Points3D` per slab.
+
+    Parameters
+    ----------
+    x_count, y_count, z_count:
+        Number of points in each dimension.
+    twist:
+        Angle to twist from bottom to top of the cube
+    max_points:
+        Maximum number of points per slab. Slabs always contain at least one full y-z plane.
+
+    """
+    plane = y_count * z_count
+    step = max(1, max_points // plane) if plane else x_count
+    for start in range(0, x_count, step):
+        yield _color_grid_slab(x_count, y_count, z_count, twist, start, min(start + step, x_count))
+
+
+def _axis(start, stop, count):
+    # The sample points of `np.mgrid[start:stop:count * 1j]`, without materializing the full
+    # index grid. Computed the same way so colors truncate to the same uint8 values.
+    if count < 2:
+        return np.full(count, start, dtype=np.float64)
+    return np.arange(count) * ((stop - start) / (count - 1)) + start
+
+
+def _color_grid_slab(x_count, y_count, z_count, twist, x_start, x_stop):
+    xs = _axis(-x_count, x_count, x_count)[x_start:x_stop].astype(np.float32)
+    ys = _axis(-y_count, y_count, y_count).astype(np.float32)
+    zs = _axis(-z_count, z_count, z_count).astype(np.float32)
+
+    # Each z layer is rotated around the z axis by its own angle.
     angle = np.linspace(-float(twist) / 2, float(twist) / 2, z_count)
-    for z in range(z_count):
-        xv, yv, zv = grid[:, :, :, z]
-        rot_xv = xv * cos(angle[z]) - yv * sin(angle[z])
-        rot_yv = xv * sin(angle[z]) + yv * cos(angle[z])
-        grid[:, :, :, z] = [rot_xv, rot_yv, zv]
-
-    positions = np.vstack([xyz.ravel() for xyz in grid])
-
-    colors = np.vstack(
-        [
-            xyz.ravel()
-            for xyz in np.mgrid[
-                slice(0, 255, x_count * 1j),
-                slice(0, 255, y_count * 1j),
-                slice(0, 255, z_count * 1j),
-            ]
-        ]
-    )
-
-    return ColorGrid(positions.T, colors.T.astype(np.uint8))
+    cos = np.cos(angle).astype(np.float32)
+    sin = np.sin(angle).astype(np.float32)
+
+    shape = (len(xs), y_count, z_count)
+    positions = np.empty((*shape, 3), dtype=np.float32)
+    x = xs[:, None, None]
+    y = ys[None, :, None]
+    positions[..., 0] = x * cos - y * sin
+    positions[..., 1] = x * sin + y * cos
+    positions[..., 2] = zs
+
+    colors = np.empty((*shape, 3), dtype=np.uint8)
+    colors[..., 0] = _axis(0, 255, x_count).astype(np.uint8)[x_start:x_stop, None, None]
+    colors[..., 1] = _axis(0, 255, y_count).astype(np.uint8)[:, None]
+    colors[..., 2] = _axis(0, 255, z_count).astype(np.uint8)
+
+    return ColorGrid(positions.reshape(-1, 3), colors.reshape(-1, 3))